@@ -0,0 +1,340 @@
+# a2c_workers.py
+"""
+A2C 롤아웃 수집 (단일 프로세스 / 동기식 멀티프로세스).
+
+- make_vec_env: config.yaml의 env_backend에 따라 VecTradingEnv(NumPy) / TorchTradingEnv(텐서) 생성
+- collect_vec_episodes: 배치 환경 하나로 에피소드 N개를 진행하며 agent.rollout을 채운다.
+  (rollout_len마다 끊어서 업데이트할 때는 collect_vec_rollout을 반복)
+  TorchTradingEnv면 행동 / 보상이 device를 떠나지 않고 다음 관측값을 저장소 states[t + 1] 자리에
+  바로 쓴다. (step(..., out=...), 호스트 동기화는 롤아웃마다 한 번)
+- RolloutWorkers: 워커 프로세스 K개가 각자 VecTradingEnv(envs_per_worker개)와
+  ActorCriticNet 사본을 들고 동시에 롤아웃을 수집한다. (config.yaml의 num_workers)
+    1. 학습 프로세스가 업데이트된 가중치를 공유 메모리 벡터에 한 번 쓰고 (broadcast)
+    2. 워커들은 그 가중치로 각자 맡은 환경 열 구간(RolloutStorage.shard)에 롤아웃을 쓴 뒤
+       (저장소가 차거나 에피소드가 끝날 때까지, 환경 상태는 다음 라운드로 이어짐)
+    3. 학습 프로세스가 전체 (T, K * envs_per_worker) 저장소로 train_step 한 번.
+  롤아웃은 공유 메모리로 주고받으므로 파이프로는 명령 / 요약 값만 오간다.
+  워커 프로세스는 torch 스레드 1개 (코어 수만큼 워커를 두는 용도).
+"""
+
+import traceback
+from typing import Callable, List, Optional, Union
+
+import torch
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from ac_model import A2CAgent
+from episode_sampler import EpisodeSampler, make_episode_sampler
+from rollout_storage import RolloutStorage
+from torch_trading_env import TorchTradingEnv
+from vec_trading_env import VecTradingEnv
+
+ENV_BACKENDS = ("numpy", "torch")
+
+
+def make_vec_env(
+    env_config: dict, num_envs: int, backend: str = "numpy", device: str = "cpu", **kwargs
+) -> Union[VecTradingEnv, TorchTradingEnv]:
+    """
+    환경 N개 배치 환경 생성.
+    backend: "numpy" → VecTradingEnv, "torch" → TorchTradingEnv (상태 / 관측값이 device 위의 텐서)
+    kwargs: starts / random_start / episode_len / seed
+    """
+    if backend == "numpy":
+        return VecTradingEnv(**env_config, num_envs=num_envs, **kwargs)
+    if backend == "torch":
+        return TorchTradingEnv(**env_config, num_envs=num_envs, device=device, **kwargs)
+    raise ValueError(f"env_backend는 {ENV_BACKENDS} 중 하나여야 합니다: {backend}")
+
+
+# ---------------------------------------------------
+# 환경 N개 동시 진행 (VecTradingEnv / TorchTradingEnv 하나)
+# ---------------------------------------------------
+def collect_vec_rollout(agent: A2CAgent, venv: Union[VecTradingEnv, TorchTradingEnv], states, dbg_acc: dict):
+    """
+    현재 states에서 롤아웃 저장소(agent.rollout, (T, N))가 차거나 모든 환경이 끝날 때까지 진행.
+    (저장소 길이 = rollout_len이면 에피소드 중간에서 끊긴다 → 이어서 다시 호출)
+    틱마다 정책 forward는 (N, state_dim) 배치 한 번 (act_batch: 행동 + log_prob + V(s)),
+    저장은 틱마다 [t] 자리에 한 번. 먼저 끝난 환경의 칸은 mask로 제외된다.
+    TorchTradingEnv는 _collect_torch_rollout (틱마다 호스트 동기화 없음)
+    dbg_acc에 info 합계를 더한다.
+    return: (마지막 관측값, 진행한 환경-스텝 수)
+    """
+    if isinstance(venv, TorchTradingEnv):
+        return _collect_torch_rollout(agent, venv, states, dbg_acc)
+
+    ro = agent.rollout
+    ro.reset(states)
+    steps = 0
+
+    while not venv.done.all() and ro.step < ro.num_steps:
+        actions, log_probs, values = agent.act_batch(states, deterministic=False, return_tensors=True)
+        states, rewards, dones, infos = venv.step(actions.cpu().numpy())
+        active = infos["active"]
+        ro.insert(states, actions, rewards, dones, log_probs, values, active=active)
+
+        for k in dbg_acc.keys():
+            if k in infos:
+                dbg_acc[k] += float(infos[k][active].sum())
+        steps += int(active.sum())
+
+    return states, steps
+
+
+def _collect_torch_rollout(agent: A2CAgent, venv: TorchTradingEnv, states, dbg_acc: dict):
+    """
+    collect_vec_rollout의 TorchTradingEnv 경로. 행동 / 보상 / done / info가 모두 device 위의 텐서이고
+    다음 관측값은 step(..., out=ro.states[t + 1])으로 저장소 자리에 바로 쓴다.
+    틱마다 .cpu() / .item() 같은 호스트 동기화가 없다:
+      - 진행할 틱 수는 시작할 때 max(end_step - current_step)으로 한 번만 읽고
+        (에피소드는 end_step에서만 끝나므로 while not done.all()과 같은 횟수)
+      - info 합계 / 환경-스텝 수는 device 텐서에 모았다가 마지막에 한 번 꺼낸다
+    """
+    ro = agent.rollout
+    ro.reset(states)
+    n_ticks = min(ro.num_steps, int((venv.end_step - venv.current_step).clamp(min=0).max()))
+
+    acc = {k: torch.zeros((), dtype=torch.float64, device=venv.device) for k in dbg_acc}
+    steps = torch.zeros((), dtype=torch.long, device=venv.device)
+    for _ in range(n_ticks):
+        actions, log_probs, values = agent.act_batch(states, deterministic=False, return_tensors=True)
+        states, rewards, dones, infos = venv.step(actions, out=ro.states[ro.step + 1])
+        active = infos["active"]
+        ro.insert(None, actions, rewards, dones, log_probs, values, active=active)
+
+        for k in acc:
+            if k in infos:
+                acc[k] += torch.where(active, infos[k], 0.0).sum()
+        steps += active.sum()
+
+    for k, v in acc.items():
+        dbg_acc[k] += float(v)
+    return states, int(steps)
+
+
+def collect_vec_episodes(
+    agent: A2CAgent,
+    venv: Union[VecTradingEnv, TorchTradingEnv],
+    dbg_keys,
+    sampler: EpisodeSampler = None,
+    update: Optional[Callable[[], None]] = None,
+):
+    """
+    배치 환경(VecTradingEnv / TorchTradingEnv)으로 에피소드 N개를 끝까지 진행한다.
+    sampler가 있으면 에피소드마다 시작점을 sampler.sample(N)으로 새로 뽑는다.
+    저장소가 에피소드 도중에 차면 update()(train_step)를 부르고 이어서 진행한다.
+    마지막 롤아웃의 업데이트는 호출하는 쪽에서.
+    return: (환경 평균 에피소드 보상, info 합계 dict, 진행한 환경-스텝 수)
+    """
+    states = venv.reset(starts=sampler.sample(venv.num_envs) if sampler is not None else None)
+    dbg_acc = {k: 0.0 for k in dbg_keys}
+    steps = 0
+
+    while True:
+        states, n = collect_vec_rollout(agent, venv, states, dbg_acc)
+        steps += n
+        if venv.done.all():
+            break
+        if update is None:
+            raise ValueError(
+                f"롤아웃 저장소(num_steps={agent.rollout.num_steps})가 에피소드보다 짧은데 update가 없습니다."
+            )
+        update()
+
+    return float(venv.total_reward.mean()), dbg_acc, steps
+
+
+# ---------------------------------------------------
+# 워커 프로세스
+# ---------------------------------------------------
+def _worker_main(
+    rank: int,
+    conn,
+    env_config: dict,
+    envs_per_worker: int,
+    sampler_cfg: Optional[dict],
+    hidden_dims: List[int],
+    seed: int,
+    storage: RolloutStorage,
+    weights: torch.Tensor,
+    env_backend: str = "numpy",
+):
+    """
+    명령 루프: ("rollout", new_episode) → 공유 가중치 적재 후 롤아웃 하나 수집
+    (new_episode면 환경 reset 후 시작), "close" → 종료.
+    응답: ("ok", (평균 보상, info 합계, 환경-스텝 수, 틱 수, 에피소드 종료 여부))
+          / ("error", traceback 문자열)
+    """
+    torch.set_num_threads(1)
+    try:
+        worker_seed = seed + rank
+        sampler = None
+        if sampler_cfg and sampler_cfg.get("enabled", False):
+            sampler = make_episode_sampler(
+                env_config["data"], env_config["window_size"], env_config.get("reward_cfg") or {},
+                sampler_cfg, seed=worker_seed,
+            )
+        # 샘플러가 없으면 시작 위치를 무작위로 (워커 / 환경마다 다른 구간)
+        venv = make_vec_env(
+            env_config,
+            envs_per_worker,
+            env_backend,
+            random_start=sampler is None,
+            episode_len=sampler.episode_len if sampler is not None else None,
+            seed=worker_seed,
+        )
+        agent = A2CAgent(storage.states.shape[-1], hidden_dims=hidden_dims, seed=worker_seed, device="cpu")
+        agent.rollout = storage.shard(rank * envs_per_worker, (rank + 1) * envs_per_worker)
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        conn.close()
+        return
+
+    conn.send(("ok", None))
+    states = None
+    while True:
+        cmd = conn.recv()
+        if cmd == "close":
+            break
+        try:
+            _, new_episode = cmd
+            if new_episode:
+                states = venv.reset(starts=sampler.sample(envs_per_worker) if sampler is not None else None)
+            vector_to_parameters(weights, agent.ac_net.parameters())
+            dbg_acc = {k: 0.0 for k in VecTradingEnv.INFO_KEYS}
+            states, steps = collect_vec_rollout(agent, venv, states, dbg_acc)
+            conn.send(("ok", (float(venv.total_reward.mean()), dbg_acc, steps, agent.rollout.step,
+                              bool(venv.done.all()))))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+class RolloutWorkers:
+    """
+    동기식 멀티프로세스 롤아웃 수집기.
+    - agent.rollout을 (num_steps, num_workers * envs_per_worker) CPU 공유 메모리 저장소로 교체한다.
+      (agent.train_step은 그대로. 학습 device가 GPU여도 저장소는 CPU)
+    - collect()는 VecTradingEnv 경로의 collect_vec_episodes와 같은 값을 돌려준다.
+      (보상 = 전체 환경 평균, info 합계, 환경-스텝 수)
+    - rollout_len이 있으면 저장소 길이 = rollout_len. 에피소드 하나를 여러 라운드로 나눠 수집하고
+      라운드 사이마다 update()
+    - 사용 후 close()
+    """
+
+    def __init__(
+        self,
+        agent: A2CAgent,
+        env_config: dict,
+        num_workers: int,
+        envs_per_worker: int = 1,
+        sampler_cfg: Optional[dict] = None,
+        episode_len: Optional[int] = None,
+        rollout_len: Optional[int] = None,
+        hidden_dims: List[int] = None,
+        seed: int = 42,
+        env_backend: str = "numpy",
+    ):
+        """
+        env_config: VecTradingEnv 생성 인자 (data, window_size, trade_penalty, ...)
+        env_backend: 워커 환경 종류 ("numpy" / "torch", make_vec_env). 저장소가 CPU라 torch도 CPU에서 진행
+        episode_len: 에피소드 최대 길이 (샘플러 사용 시 sampler.episode_len, None이면 학습 구간 전체)
+        rollout_len: 업데이트 한 번의 최대 틱 수 (None이면 에피소드 전체)
+        """
+        if num_workers < 1:
+            raise ValueError(f"num_workers는 1 이상이어야 합니다: {num_workers}")
+        if envs_per_worker < 1:
+            raise ValueError(f"envs_per_worker는 1 이상이어야 합니다: {envs_per_worker}")
+        if env_backend not in ENV_BACKENDS:
+            raise ValueError(f"env_backend는 {ENV_BACKENDS} 중 하나여야 합니다: {env_backend}")
+
+        self.agent = agent
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+
+        num_steps = episode_len or len(env_config["data"]) - env_config["window_size"]
+        if rollout_len:
+            num_steps = min(rollout_len, num_steps)
+        agent.rollout = RolloutStorage(
+            num_steps, num_workers * envs_per_worker, agent.state_dim, device="cpu"
+        ).share_memory_()
+        self.weights = self._flat_weights().share_memory_()
+
+        # fork는 torch / 스레드 상태를 그대로 복사하므로 spawn (train_a2c는 __main__ 가드 필요)
+        ctx = mp.get_context("spawn")
+        self.conns = []
+        self.procs = []
+        for rank in range(num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(rank, child_conn, env_config, envs_per_worker, sampler_cfg,
+                      hidden_dims or [128, 128], seed, agent.rollout, self.weights, env_backend),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.procs.append(proc)
+
+        # 워커 초기화(환경 / 샘플러 생성) 실패는 여기서 바로 알린다
+        for conn in self.conns:
+            self._recv(conn)
+
+    def _flat_weights(self) -> torch.Tensor:
+        return parameters_to_vector(self.agent.ac_net.parameters()).detach().cpu().clone()
+
+    def _recv(self, conn):
+        status, payload = conn.recv()
+        if status != "ok":
+            self.close()
+            raise RuntimeError(f"롤아웃 워커 오류:\n{payload}")
+        return payload
+
+    def collect(self, update: Optional[Callable[[], None]] = None):
+        """
+        에피소드 한 번: 라운드마다 현재 가중치를 워커에 broadcast하고 모든 워커의 롤아웃을 기다린다.
+        모든 워커의 에피소드가 끝나기 전에 저장소가 차면 update()(train_step) 후 다음 라운드.
+        마지막 롤아웃의 업데이트는 호출하는 쪽에서.
+        return: (환경 평균 에피소드 보상, info 합계 dict, 진행한 환경-스텝 수)
+        """
+        dbg_acc = {}
+        steps = 0
+        new_episode = True
+        while True:
+            self.weights.copy_(self._flat_weights())
+            for conn in self.conns:
+                conn.send(("rollout", new_episode))
+            results = [self._recv(conn) for conn in self.conns]
+            new_episode = False
+
+            # 워커마다 틱 수가 다르면 가장 긴 쪽까지 읽는다 (짧은 쪽 나머지 칸은 mask=0)
+            self.agent.rollout.step = max(r[3] for r in results)
+            for _, dbg, n, _, _ in results:
+                for k, v in dbg.items():
+                    dbg_acc[k] = dbg_acc.get(k, 0.0) + v
+                steps += n
+
+            if all(r[4] for r in results):
+                break
+            if update is None:
+                raise ValueError(
+                    f"롤아웃 저장소(num_steps={self.agent.rollout.num_steps})가 에피소드보다 짧은데 update가 없습니다."
+                )
+            update()
+
+        episode_reward = sum(r[0] for r in results) / len(results)
+        return episode_reward, dbg_acc, steps
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self.conns, self.procs = [], []
@@ -1,7 +1,8 @@
 # ac_model.py
 
+import math
 import random
-from typing import List, Tuple
+from typing import Callable, List, Optional
 
 import numpy as np
 import torch
@@ -9,6 +10,49 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 from torch.distributions import Categorical
+from torch.optim.lr_scheduler import LambdaLR
+
+from advantages import METHODS, compute_advantages
+from feature_store import DTYPE
+from rollout_storage import RolloutStorage
+
+
+def _obs_tensor(x, device) -> torch.Tensor:
+    """
+    관측값(np.ndarray 또는 텐서) → float32 텐서. (CPU float32 배열이면 복사 없음)
+    dtype 규칙(feature_store.DTYPE)상 float32가 아닌 입력은 호출하는 쪽의 버그 → assert
+    """
+    assert x.dtype in (DTYPE, torch.float32), f"관측값 dtype은 float32여야 합니다: {x.dtype}"
+    return torch.as_tensor(x, dtype=torch.float32, device=device)
+
+
+LR_SCHEDULES = ("constant", "linear", "cosine")
+
+
+def make_lr_lambda(
+    kind: str,
+    total_updates: int,
+    warmup_updates: int = 0,
+    final_ratio: float = 0.0,
+) -> Callable[[int], float]:
+    """
+    업데이트 횟수 u → lr 배율 (LambdaLR용, A2CAgent(lr_lambda=...))
+    warmup_updates 동안 선형으로 올린 뒤
+      "constant": 1 유지 / "linear", "cosine": total_updates에서 final_ratio가 되도록 감소 (이후 유지)
+    """
+    if kind not in LR_SCHEDULES:
+        raise ValueError(f"lr_schedule은 {LR_SCHEDULES} 중 하나여야 합니다: {kind}")
+
+    def lr_lambda(u: int) -> float:
+        if u < warmup_updates:
+            return (u + 1) / warmup_updates
+        if kind == "constant":
+            return 1.0
+        p = min(1.0, (u - warmup_updates) / max(1, total_updates - warmup_updates))
+        decay = 1.0 - p if kind == "linear" else 0.5 * (1.0 + math.cos(math.pi * p))
+        return final_ratio + (1.0 - final_ratio) * decay
+
+    return lr_lambda
 
 
 class ActorCriticNet(nn.Module):
@@ -47,8 +91,10 @@ class A2CAgent:
     """
     A2C 에이전트.
     - act(): 정책에 따라 행동 샘플 또는 greedy 행동 선택
-    - remember(): 롤아웃 버퍼에 transition 저장
-    - train_step(): 에피소드 종료 후, 버퍼 기반 업데이트
+    - act_and_value(): 롤아웃용. forward 한 번으로 행동 + log_prob + V(s)
+    - init_rollout(): 롤아웃 저장소(RolloutStorage) 할당 (학습 전에 한 번)
+    - remember(): 롤아웃 저장소에 transition 저장
+    - train_step(): 롤아웃(에피소드 끝 또는 rollout_len 틱)마다 저장소 기반 업데이트
     """
     def __init__(
         self,
@@ -61,14 +107,40 @@ class A2CAgent:
         entropy_coeff: float = 0.01,
         seed: int = 42,
         device: str = "cpu",
+        advantage: str = "mc",
+        n_steps: int = 5,
+        gae_lambda: float = 0.95,
+        update_epochs: int = 1,
+        num_minibatches: int = 1,
+        lr_lambda: Optional[Callable[[int], float]] = None,
     ):
+        """
+        advantage: 어드밴티지 / 리턴 타깃 계산 방식 (advantages.py)
+          "mc"(롤아웃 끝까지 할인 리턴) / "nstep"(n_steps 스텝 리턴) / "gae"(GAE(gae_lambda))
+        update_epochs, num_minibatches: 롤아웃 하나로 epoch마다 무작위 minibatch로 나눠 optimizer step
+          (1, 1이면 기존처럼 전체 배치로 한 번)
+        lr_lambda: 업데이트(train_step) 횟수 → lr 배율 (make_lr_lambda). None이면 lr 고정
+        """
         if hidden_dims is None:
             hidden_dims = [128, 128]
+        if advantage not in METHODS:
+            raise ValueError(f"advantage는 {METHODS} 중 하나여야 합니다: {advantage}")
+        if update_epochs < 1 or num_minibatches < 1:
+            raise ValueError(
+                f"update_epochs, num_minibatches는 1 이상이어야 합니다: {update_epochs}, {num_minibatches}"
+            )
 
         self.device = device
+        self.state_dim = state_dim
         self.gamma = gamma
         self.value_loss_coeff = value_loss_coeff
         self.entropy_coeff = entropy_coeff
+        self.advantage = advantage
+        self.n_steps = n_steps
+        self.gae_lambda = gae_lambda
+        self.update_epochs = update_epochs
+        self.num_minibatches = num_minibatches
+        self.num_updates = 0
 
         torch.manual_seed(seed)
         np.random.seed(seed)
@@ -81,11 +153,10 @@ class A2CAgent:
         ).to(self.device)
 
         self.opt = optim.Adam(self.ac_net.parameters(), lr=lr)
+        self.scheduler = LambdaLR(self.opt, lr_lambda) if lr_lambda is not None else None
 
-        # (s, a, r, ns, done, log_prob, value) 를 저장하는 버퍼
-        self.rollout_buffer: List[
-            Tuple[np.ndarray, int, float, np.ndarray, bool, float, float]
-        ] = []
+        # 롤아웃 저장소 (init_rollout에서 에피소드 최대 길이로 할당)
+        self.rollout: Optional[RolloutStorage] = None
 
     # ---------------------------------------------------
     # 행동 선택: act()
@@ -98,7 +169,7 @@ class A2CAgent:
           - True : argmax 정책 (검증용)
         return: (action, log_prob)
         """
-        state_t = torch.tensor(state, dtype=torch.float32, device=self.device).unsqueeze(0)
+        state_t = _obs_tensor(state, self.device).unsqueeze(0)
         logits, _ = self.ac_net(state_t)
         dist = Categorical(logits=logits)
 
@@ -113,15 +184,67 @@ class A2CAgent:
 
         return int(action.item()), float(log_prob.item())
 
+    @staticmethod
+    def _sample_from_logits(logits: torch.Tensor, deterministic: bool):
+        """
+        Categorical 객체 없이 logits에서 바로 (행동, log_prob).
+        샘플링은 Categorical.sample과 같은 multinomial (같은 torch 난수 흐름)
+        """
+        log_p = F.log_softmax(logits, dim=-1)
+        if deterministic:
+            actions = log_p.argmax(dim=-1)
+        else:
+            actions = torch.multinomial(log_p.exp(), 1).squeeze(-1)
+        return actions, log_p.gather(-1, actions.unsqueeze(-1)).squeeze(-1)
+
+    def act_and_value(self, state: np.ndarray, deterministic: bool = False):
+        """
+        롤아웃용 fused 경로: 한 번의 forward로 (action, log_prob, value)
+        act() + get_value()는 같은 상태로 네트워크를 두 번 돌린다.
+        - torch.inference_mode (autograd 기록 없음)
+        - float32 NumPy 상태는 복사 없이 텐서로 (_obs_tensor)
+        return: (action int, log_prob float, value float)
+        """
+        with torch.inference_mode():
+            logits, value = self.ac_net(_obs_tensor(state, self.device).unsqueeze(0))
+            action, log_prob = self._sample_from_logits(logits, deterministic)
+        return int(action.item()), float(log_prob.item()), float(value.item())
+
+    def act_batch(self, states, deterministic: bool = False, return_tensors: bool = False):
+        """
+        환경 N개의 상태를 한 번의 forward로 처리 (VecTradingEnv / TorchTradingEnv용)
+        states: (N, state_dim) 배열 또는 텐서 (같은 device의 float32 텐서면 복사 없이 그대로 사용)
+        return: (actions (N,) int64, log_probs (N,), values (N,))
+          values는 같은 forward의 크리틱 출력 V(s) (get_value를 따로 부를 필요 없음)
+          return_tensors=True면 device 위의 텐서 그대로, 아니면 np.ndarray
+        """
+        states_t = _obs_tensor(states, self.device)
+        with torch.no_grad():
+            logits, values = self.ac_net(states_t)
+            actions, log_probs = self._sample_from_logits(logits, deterministic)
+            values = values.squeeze(1)
+
+        if return_tensors:
+            return actions, log_probs, values
+        return actions.cpu().numpy(), log_probs.cpu().numpy(), values.cpu().numpy()
+
     def get_value(self, state: np.ndarray) -> float:
         """
         현재 상태의 가치 V(s)를 추정
         """
-        state_t = torch.tensor(state, dtype=torch.float32, device=self.device).unsqueeze(0)
+        state_t = _obs_tensor(state, self.device).unsqueeze(0)
         with torch.no_grad():
             _, value = self.ac_net(state_t)
         return float(value.item())
 
+    def init_rollout(self, num_steps: int, num_envs: int = 1) -> RolloutStorage:
+        """
+        롤아웃 저장소 할당. num_steps = 한 번의 업데이트까지 진행할 최대 스텝(틱) 수,
+        num_envs = 동시에 진행하는 환경 수 (VecTradingEnv면 num_envs, 단일 환경이면 1)
+        """
+        self.rollout = RolloutStorage(num_steps, num_envs, self.state_dim, device=self.device)
+        return self.rollout
+
     def remember(
         self,
         state: np.ndarray,
@@ -133,67 +256,94 @@ class A2CAgent:
         value: float,
     ):
         """
-        한 타임스텝 transition 저장.
-        log_prob, value는 인터페이스 유지용으로 같이 저장하지만
-        실제 train_step에서는 네트워크에서 다시 계산한다.
+        단일 환경 한 타임스텝 transition 저장. (저장소의 [t] 자리에 쓰기만 함)
+        state는 롤아웃의 첫 스텝에서만 쓰인다. (이후 스텝의 state는 직전 next_state와 같음)
+        value(롤아웃 때의 V(s_t))는 train_step에서 그대로 쓰인다:
+          compute_advantages의 어드밴티지 / n-step·GAE 부트스트랩 (mc도 A = G - V(s_t))
+          → act_and_value에서 받은 값을 반드시 넘길 것
+        log_prob는 같이 저장만 하고, 손실의 log π(a|s)는 train_step에서 현재 정책으로 다시 계산한다.
         """
-        self.rollout_buffer.append(
-            (state, action, reward, next_state, done, log_prob, value)
-        )
+        if self.rollout.step == 0:
+            self.rollout.reset(state)
+        self.rollout.insert(next_state, action, reward, done, log_prob, value)
 
     def clear_buffer(self):
-        self.rollout_buffer = []
+        if self.rollout is not None:
+            self.rollout.clear()
 
     # ---------------------------------------------------
     # 학습: train_step()
     # ---------------------------------------------------
     def train_step(self):
         """
-        에피소드 종료 후, rollout buffer를 이용해 A2C 업데이트 수행.
-        반환값: (actor_loss, critic_loss, entropy_loss) / 버퍼 없으면 None
+        롤아웃 저장소를 이용해 A2C 업데이트 수행. (에피소드 끝 또는 rollout_len 틱마다)
+        에피소드 중간에서 끊긴 롤아웃은 마지막 상태의 크리틱 V(s_T)로 부트스트랩된다.
+        반환값: (actor_loss, critic_loss, entropy_loss) minibatch 평균 / 저장된 스텝이 없으면 None
         """
-        if not self.rollout_buffer:
+        ro = self.rollout
+        if ro is None or ro.step == 0:
             return None
+        T = ro.step
 
-        # 1. 버퍼 → 텐서
-        states, actions, rewards, next_states, dones, _, _ = zip(*self.rollout_buffer)
+        # 1~2. 마지막 다음 상태의 V(s_T)로 부트스트랩 → (T, N) 리턴 타깃 / 어드밴티지를 한 번에
+        #      (advantages.compute_advantages: mc / nstep / gae, 롤아웃 때 저장한 V(s_t) 사용)
+        #      (저장소가 CPU 공유 메모리(멀티프로세스 수집)여도 계산은 저장소 device, 학습은 self.device)
+        with torch.no_grad():
+            _, last_value_t = self.ac_net(ro.states[T].to(self.device))  # [N, 1]
+            returns_all, advantages_all = compute_advantages(
+                self.advantage, ro.rewards[:T], ro.values[:T], ro.dones[:T],
+                last_value_t.squeeze(1).to(ro.rewards.device),
+                self.gamma, n_steps=self.n_steps, gae_lambda=self.gae_lambda,
+            )
+
+        # 실제로 진행한 (스텝, 환경) 칸만 모은다
+        valid = ro.masks[:T].reshape(-1) > 0
+        states_t = ro.states[:T].reshape(-1, ro.states.shape[-1])[valid].to(self.device)
+        actions_t = ro.actions[:T].reshape(-1)[valid].to(self.device)
+        returns_t = returns_all.reshape(-1)[valid].to(self.device)
+        advantages_t = advantages_all.reshape(-1)[valid].to(self.device)
+        if advantages_t.numel() == 0:
+            self.clear_buffer()
+            return None
 
-        states_t = torch.tensor(np.array(states), dtype=torch.float32, device=self.device)
-        actions_t = torch.tensor(np.array(actions), dtype=torch.long, device=self.device)
-        rewards_t = torch.tensor(np.array(rewards), dtype=torch.float32, device=self.device)
-        dones_t = torch.tensor(np.array(dones), dtype=torch.float32, device=self.device)
+        # 3. Advantage 정규화 (롤아웃 전체 기준)
+        #    유효 칸이 1개면 표본 표준편차가 NaN → 평균만 빼서 0 (rollout_len으로 끊긴 1스텝 꼬리 등)
+        if advantages_t.numel() > 1:
+            advantages_t = (advantages_t - advantages_t.mean()) / (advantages_t.std() + 1e-8)
+        else:
+            advantages_t = advantages_t - advantages_t.mean()
 
-        # 2. 마지막 next_state의 V(s_T)를 이용해 부트스트랩 리턴 계산
-        with torch.no_grad():
-            last_state = next_states[-1]
-            if last_state is not None:
-                last_state_t = torch.tensor(last_state, dtype=torch.float32, device=self.device).unsqueeze(0)
-                _, last_value_t = self.ac_net(last_state_t)  # [1, 1]
-                last_value = float(last_value_t.squeeze(1).item())
+        # 4. update_epochs x num_minibatches번 optimizer step (기본 1 x 1: 전체 배치로 한 번)
+        losses = []
+        for _ in range(self.update_epochs):
+            if self.num_minibatches > 1:
+                batches = torch.randperm(states_t.shape[0], device=self.device).chunk(self.num_minibatches)
             else:
-                last_value = 0.0
+                batches = [slice(None)]
+            for idx in batches:
+                losses.append(self._optimize(states_t[idx], actions_t[idx], returns_t[idx], advantages_t[idx]))
+
+        # 5. lr 스케줄은 업데이트(롤아웃) 단위
+        self.num_updates += 1
+        if self.scheduler is not None:
+            self.scheduler.step()
 
-        returns = []
-        G = last_value
-        for r, d in reversed(list(zip(rewards, dones))):
-            G = r + self.gamma * G * (1.0 - d)
-            returns.insert(0, G)
+        # 6. 저장소 비우기 (메모리는 그대로 재사용)
+        self.clear_buffer()
 
-        returns_t = torch.tensor(returns, dtype=torch.float32, device=self.device)
+        return tuple(float(np.mean(x)) for x in zip(*losses))
 
-        # 3. 현재 상태들에 대한 policy logits, value 예측
-        policy_logits_t, values_pred_t = self.ac_net(states_t)  # values_pred_t: [T, 1]
-        values_pred_t = values_pred_t.squeeze(1)                # [T]
+    def _optimize(self, states_t, actions_t, returns_t, advantages_t):
+        """minibatch 하나로 손실 계산 + optimizer step. return: (actor, critic, entropy) 손실"""
+        # 현재 상태들에 대한 policy logits, value 예측
+        policy_logits_t, values_pred_t = self.ac_net(states_t)  # values_pred_t: [B, 1]
+        values_pred_t = values_pred_t.squeeze(1)                # [B]
 
         dist = Categorical(logits=policy_logits_t)
-        log_probs_t = dist.log_prob(actions_t)                  # [T]
+        log_probs_t = dist.log_prob(actions_t)                  # [B]
         entropy_t = dist.entropy().mean()                       # 스칼라
 
-        # 4. Advantage 계산 + 정규화
-        advantages_t = returns_t - values_pred_t
-        advantages_t = (advantages_t - advantages_t.mean()) / (advantages_t.std() + 1e-8)
-
-        # 5. 손실 계산
+        # 손실 계산
         # Actor: - E[log pi(a|s) * A]
         actor_loss = -(log_probs_t * advantages_t.detach()).mean()
 
@@ -209,17 +359,17 @@ class A2CAgent:
             + self.entropy_coeff * entropy_loss
         )
 
-        # 6. 역전파 + grad clipping
+        # 역전파 + grad clipping
         self.opt.zero_grad()
         total_loss.backward()
         torch.nn.utils.clip_grad_norm_(self.ac_net.parameters(), max_norm=0.5)
         self.opt.step()
 
-        # 7. 버퍼 초기화
-        self.clear_buffer()
-
         return float(actor_loss.item()), float(critic_loss.item()), float(entropy_loss.item())
 
+    def current_lr(self) -> float:
+        return float(self.opt.param_groups[0]["lr"])
+
     # ---------------------------------------------------
     # 모델 저장/로드
     # ---------------------------------------------------
@@ -0,0 +1,125 @@
+# advantages.py
+"""
+롤아웃 텐서에서 리턴 / 어드밴티지를 한 번에 계산하는 함수들. (A2CAgent.train_step용)
+
+- 모든 함수는 시간 축이 0번: (T,) 단일 환경 또는 (T, N) 병렬 환경 (RolloutStorage 배치).
+  (N, T)로 들고 있으면 .T로 넘기면 된다.
+- 리턴 / GAE는 모두 x_t = b_t + a_t * x_{t+1} 꼴의 선형 점화식이라
+  (a_t, b_t) 쌍의 결합 법칙으로 역방향 스캔(associative scan)을 한다.
+  → 스텝 수 T에 대해 log2(T)번의 텐서 연산. (스텝별 파이썬 루프 없음)
+  곱해지는 계수는 모두 [0, 1]이라 gamma^-t 누적합 방식과 달리 긴 롤아웃에서도 오차가 커지지 않는다.
+- n-step 리턴은 n번의 시프트 합 (n은 작은 상수).
+- done에서 리턴이 끊기므로 여러 에피소드를 이어 붙인 롤아웃에도 그대로 쓴다.
+
+method (config.yaml의 advantage.method):
+    "mc"   : 롤아웃 끝까지의 할인 리턴 (마지막만 V(s_T)로 부트스트랩)
+    "nstep": n스텝 리턴 (n스텝 뒤 V로 부트스트랩)
+    "gae"  : GAE(lambda)
+"""
+
+import torch
+
+METHODS = ("mc", "nstep", "gae")
+
+
+def _reverse_scan(a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    """x_t = b_t + a_t * x_{t+1} (x_T = 0)를 시간 축(0)으로 역방향 스캔. a, b는 덮어쓴다."""
+    # k단계 후: b_t = sum_{j < 2^k} (a_t ... a_{t+j-1}) b_{t+j}, a_t = a_t ... a_{t+2^k-1}
+    T = b.shape[0]
+    k = 1
+    while k < T:
+        b[:-k] = b[:-k] + a[:-k] * b[k:]
+        a[:-k] = a[:-k] * a[k:]
+        k *= 2
+    return b
+
+
+def discounted_returns(
+    rewards: torch.Tensor,
+    dones: torch.Tensor,
+    gamma: float,
+    bootstrap: torch.Tensor,
+) -> torch.Tensor:
+    """
+    G_t = r_t + gamma * (1 - done_t) * G_{t+1},  G_T = bootstrap
+    rewards, dones: (T, ...) float 텐서 (dones는 0/1)
+    bootstrap: (...) 마지막 다음 상태의 가치 V(s_T) (done이면 무시됨)
+    return: (T, ...) 할인 리턴
+    """
+    a = gamma * (1.0 - dones)
+    b = rewards.clone()
+    b[-1] = b[-1] + a[-1] * bootstrap
+    return _reverse_scan(a, b)
+
+
+def n_step_returns(
+    rewards: torch.Tensor,
+    values: torch.Tensor,
+    dones: torch.Tensor,
+    gamma: float,
+    n: int,
+    bootstrap: torch.Tensor,
+) -> torch.Tensor:
+    """
+    G_t = sum_{k < h} gamma^k r_{t+k} + gamma^h V(s_{t+h}),  h = min(n, T - t)
+    (중간에 done이 있으면 거기서 끊김)
+    values: (T, ...) 각 스텝 상태의 V(s_t), bootstrap: V(s_T)
+    return: (T, ...) n스텝 리턴
+    """
+    T = rewards.shape[0]
+    a = gamma * (1.0 - dones)
+    G = torch.zeros_like(rewards)
+    disc = torch.ones_like(rewards)
+    for k in range(min(n, T)):
+        G[:T - k] += disc[:T - k] * rewards[k:]
+        disc[:T - k] *= a[k:]
+
+    values_ext = torch.cat([values, bootstrap.unsqueeze(0)], dim=0)
+    end = (torch.arange(T, device=rewards.device) + n).clamp(max=T)
+    return G + disc * values_ext[end]
+
+
+def gae(
+    rewards: torch.Tensor,
+    values: torch.Tensor,
+    dones: torch.Tensor,
+    gamma: float,
+    lam: float,
+    bootstrap: torch.Tensor,
+) -> torch.Tensor:
+    """
+    GAE(lambda): delta_t = r_t + gamma * (1 - done_t) * V(s_{t+1}) - V(s_t)
+                 A_t = delta_t + gamma * lam * (1 - done_t) * A_{t+1}
+    values: (T, ...) V(s_t), bootstrap: V(s_T)
+    return: (T, ...) 어드밴티지 (리턴 타깃은 A + V)
+    """
+    not_done = 1.0 - dones
+    next_values = torch.cat([values[1:], bootstrap.unsqueeze(0)], dim=0)
+    deltas = rewards + gamma * not_done * next_values - values
+    return _reverse_scan(gamma * lam * not_done, deltas)
+
+
+def compute_advantages(
+    method: str,
+    rewards: torch.Tensor,
+    values: torch.Tensor,
+    dones: torch.Tensor,
+    bootstrap: torch.Tensor,
+    gamma: float,
+    n_steps: int = 5,
+    gae_lambda: float = 0.95,
+):
+    """
+    method에 따라 (리턴 타깃, 어드밴티지)를 (T, ...) 텐서로.
+    values는 롤아웃 때 저장한 V(s_t) (그래디언트 없음)
+    """
+    if method == "mc":
+        returns = discounted_returns(rewards, dones, gamma, bootstrap)
+        return returns, returns - values
+    if method == "nstep":
+        returns = n_step_returns(rewards, values, dones, gamma, n_steps, bootstrap)
+        return returns, returns - values
+    if method == "gae":
+        advantages = gae(rewards, values, dones, gamma, gae_lambda, bootstrap)
+        return advantages + values, advantages
+    raise ValueError(f"advantage method는 {METHODS} 중 하나여야 합니다: {method}")
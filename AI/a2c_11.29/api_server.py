@@ -13,12 +13,13 @@ from pydantic import BaseModel
 
 from data_utils import (
     download_data,
-    add_indicators,
+    load_features,
     train_test_split_by_ratio,
     FEATURES,
     build_state,
 )
-from ac_model import A2CAgent
+from ac_model import A2CAgent, _obs_tensor
+from feature_store import DTYPE
 from explain_a2c import (
     get_feature_names_with_position,
     INDICATOR_DESC_KO,
@@ -42,8 +43,10 @@ RAW = download_data(
     CFG["vix_ticker"],
     CFG["start_date"],
     CFG["end_date"],
+    cache_dir=CFG.get("cache_dir", "data_cache"),
+    source=CFG.get("data_source"),
 )
-DF = add_indicators(RAW)
+DF = load_features(RAW, CFG["ticker"], CFG.get("feature_store_dir", "feature_store"))
 TRAIN_DF, TEST_DF = train_test_split_by_ratio(DF, CFG["train_ratio"])
 
 # 2) 스케일러 & 모델
@@ -76,7 +79,8 @@ bg_states = np.array(bg_states, dtype=np.float32)
 bg_summary = shap.sample(bg_states, 100)
 
 def model_f(x):
-    x_t = torch.tensor(x, dtype=torch.float32, device=CFG.get("device", "cpu"))
+    # SHAP이 만드는 샘플은 float64일 수 있으므로 여기서 float32로 바꾼다
+    x_t = _obs_tensor(np.asarray(x, dtype=DTYPE), CFG.get("device", "cpu"))
     policy_logits, _ = AGENT.ac_net(x_t)
     policy_probs = F.softmax(policy_logits, dim=-1)
     return policy_probs.detach().cpu().numpy()
@@ -122,7 +126,7 @@ def get_recommendation(position: int = 0):
 
     # 2. 정책 확률 & SHAP
     with torch.no_grad():
-        s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+        s_t = _obs_tensor(state, AGENT.device).unsqueeze(0)
         logits, _ = AGENT.ac_net(s_t)
         probs_t = F.softmax(logits, dim=-1).detach().cpu().numpy()[0]
 
@@ -12,11 +12,12 @@ import shap
 from flask import Flask, jsonify, request
 
 from data_utils import (
-    download_data, add_indicators, train_test_split_by_ratio, 
+    download_data, load_features, train_test_split_by_ratio, update_feature_stream,
     build_state, get_feature_names_with_position, FEATURES
 )
 # (수정) A2CAgent, ActorCriticNet 임포트
-from ac_model import A2CAgent, ActorCriticNet 
+from ac_model import A2CAgent, ActorCriticNet, _obs_tensor
+from feature_store import DTYPE
 from sklearn.preprocessing import StandardScaler
 
 # --- 1. 설명 사전 (기존과 동일) ---
@@ -65,8 +66,10 @@ def load_models_and_explainer():
     print("--- 3. SHAP Explainer 준비 중 (A2C Actor 대상) ---")
     # ... (배경 데이터 준비는 기존과 동일) ...
     raw = download_data(cfg["ticker"], cfg["kospi_ticker"], cfg["vix_ticker"],
-                        cfg["start_date"], cfg["end_date"])
-    df  = add_indicators(raw)
+                        cfg["start_date"], cfg["end_date"],
+                        cache_dir=cfg.get("cache_dir", "data_cache"),
+                        source=cfg.get("data_source"))
+    df  = load_features(raw, cfg["ticker"], cfg.get("feature_store_dir", "feature_store"))
     train_df, _ = train_test_split_by_ratio(df, cfg["train_ratio"])
     train_df[FEATURES] = scaler.transform(train_df[FEATURES])
 
@@ -86,7 +89,8 @@ def load_models_and_explainer():
         SHAP을 위한 모델 함수.
         입력(state)을 받아 액터의 출력(정책 확률)을 반환.
         """
-        x_t = torch.tensor(x, dtype=torch.float32, device=cfg.get("device", "cpu"))
+        # SHAP이 만드는 샘플은 float64일 수 있으므로 여기서 float32로 바꾼다
+        x_t = _obs_tensor(np.asarray(x, dtype=DTYPE), cfg.get("device", "cpu"))
         # ac_net(x) -> (policy_logits, value)
         policy_logits, _ = agent.ac_net(x_t)
         policy_probs = F.softmax(policy_logits, dim=-1)
@@ -104,18 +108,16 @@ def get_recommendation():
     try:
         current_position = int(request.args.get('position', 0))
         if current_position not in [0, 1]: current_position = 0
-        window_size = cfg["window_size"]
-            
+
         print("\n[API] 최신 데이터 수집 중...")
-        end_str = datetime.today().strftime("%Y-%m-%d")
-        start_str = (datetime.today() - timedelta(days=100 + window_size)).strftime("%Y-%m-%d")
-        raw_latest = download_data(cfg["ticker"], cfg["kospi_ticker"], cfg["vix_ticker"], start_str, end_str)
-        
-        df_latest = add_indicators(raw_latest)
-        if len(df_latest) < window_size:
+        # 지난번 체크포인트 이후에 나온 봉만 받아서 지표를 증분 갱신
+        stream = update_feature_stream(cfg, path=cfg.get("feature_stream_path"),
+                                       cache_dir=cfg.get("cache_dir", "data_cache"),
+                                       source=cfg.get("data_source"))
+        latest_window_df = stream.window()
+        if latest_window_df is None:
             return jsonify({"status": "error", "message": "데이터가 윈도우 크기보다 부족합니다."}), 500
-            
-        latest_window_df = df_latest.iloc[-window_size:]
+
         latest_window_df_scaled = latest_window_df.copy()
         latest_window_df_scaled[FEATURES] = scaler.transform(latest_window_df[FEATURES])
         
@@ -124,7 +126,7 @@ def get_recommendation():
         # 4. (수정) 행동 추천 (A2C deterministic act)
         print(f"[API] A2C 행동 추천 생성 중 (Position={current_position})...")
         # (수정) A2C 모델은 (logits, value)를 반환함
-        state_t = torch.tensor(state, dtype=torch.float32, device=cfg.get("device", "cpu"))
+        state_t = _obs_tensor(state, cfg.get("device", "cpu")).unsqueeze(0)
         policy_logits, _ = agent.ac_net(state_t)
         policy_probs = F.softmax(policy_logits, dim=-1).detach().cpu().numpy()[0]
         
@@ -154,7 +156,7 @@ def get_recommendation():
         return jsonify({
             "status": "success",
             "predict_for_date": datetime.today().strftime("%Y-%m-%d"),
-            "based_on_data_date": raw_latest.index[-1].strftime("%Y-%m-%d"),
+            "based_on_data_date": stream.last_date.strftime("%Y-%m-%d"),
             "current_position_input": "Holding" if current_position == 1 else "Not Holding",
             "recommendation": recommendation,
             # (수정) Q-value 대신 정책 확률 반환
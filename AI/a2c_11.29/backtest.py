@@ -9,7 +9,7 @@ import warnings
 import joblib
 
 from data_utils import (
-    download_data, add_indicators, train_test_split_by_ratio, 
+    download_data, load_features, train_test_split_by_ratio, 
     build_state, FEATURES
 )
 # (수정) A2CAgent 임포트
@@ -57,8 +57,10 @@ def run_backtest():
     model_cfg = cfg["model_cfg"]
 
     raw = download_data(cfg["ticker"], cfg["kospi_ticker"], cfg["vix_ticker"],
-                        cfg["start_date"], cfg["end_date"])
-    df  = add_indicators(raw)
+                        cfg["start_date"], cfg["end_date"],
+                        cache_dir=cfg.get("cache_dir", "data_cache"),
+                        source=cfg.get("data_source"))
+    df  = load_features(raw, cfg["ticker"], cfg.get("feature_store_dir", "feature_store"))
     df_raw_indexed = raw.loc[df.index] 
     train_df, test_df = train_test_split_by_ratio(df, cfg["train_ratio"])
     
@@ -0,0 +1,245 @@
+# bench_indicators.py
+"""
+indicators.py(NumPy 지표 엔진) 점검 스크립트.
+
+1) pandas-ta가 설치되어 있으면 같은 입력으로 값을 비교한다. (parity)
+   설치된 pandas-ta 버전에 맞는 ta_version("0.3" / "0.4")을 자동으로 고른다.
+2) IndicatorState(스트리밍)를 봉 하나씩 갱신한 값이 배열 계산과 같은지 확인한다.
+   (중간에 to_dict / from_dict로 체크포인트를 저장했다가 이어서 계산)
+3) compute_indicator_panel(종목 x 시간)이 종목별 compute_indicators와 같은지 확인한다.
+   (종목마다 상장일을 다르게 잘라서 워밍업 위치가 다른 경우 포함)
+4) 약 15년치 합성 일봉(market_data.SyntheticSource)으로 계산 시간을 잰다.
+
+    python bench_indicators.py                 # 비교 + 벤치마크
+    python bench_indicators.py --years 30 --repeat 50
+    python bench_indicators.py --tickers 200   # 패널 종목 수 (KOSPI200 규모)
+
+pandas-ta는 실행에 필요하지 않으므로 requirements에는 없다.
+비교까지 하려면 직접 설치: pip install pandas-ta
+(marl_3agent / marl_4agent 도 같은 indicators.py를 쓰므로 여기서 한 번만 점검하면 된다.)
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import (PANDAS_TA_03, PANDAS_TA_04, IndicatorState, compute_indicator_panel,
+                        compute_indicators)
+from market_data import SyntheticSource
+
+try:
+    import pandas_ta as ta
+    _HAS_PANDAS_TA = True
+except Exception:
+    _HAS_PANDAS_TA = False
+
+
+# ============================================================
+# 1. 입력 데이터
+# ============================================================
+
+def make_prices(years: float, seed: int) -> pd.DataFrame:
+    end = pd.Timestamp("2024-12-31")
+    start = end - pd.DateOffset(days=int(years * 365.25))
+    df = SyntheticSource(seed=seed).fetch("005930.KS", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+    return df.astype(np.float64)
+
+
+def make_panel(years: float, seed: int, n_tickers: int) -> dict:
+    """(종목 x 시간) High/Low/Close/Volume. 앞쪽 절반 종목은 상장일을 무작위로 늦춘다."""
+    end = pd.Timestamp("2024-12-31")
+    start = (end - pd.DateOffset(days=int(years * 365.25))).strftime("%Y-%m-%d")
+    src = SyntheticSource(seed=seed)
+    frames = [src.fetch(f"{i:06d}.KS", start, end.strftime("%Y-%m-%d")) for i in range(n_tickers)]
+    panel = {c: np.array([f[c].to_numpy() for f in frames], dtype=np.float64)
+             for c in ("High", "Low", "Close", "Volume")}
+    cols = panel["Close"].shape[1]
+    listed = np.random.default_rng(seed).integers(0, cols, n_tickers)
+    listed[n_tickers // 2:] = 0
+    for arr in panel.values():
+        arr[np.arange(cols)[None, :] < listed[:, None]] = np.nan
+    panel["listed"] = listed
+    return panel
+
+
+# ============================================================
+# 2. pandas-ta 비교
+# ============================================================
+
+def _pandas_ta_version() -> str:
+    ver = str(getattr(ta, "version", getattr(ta, "__version__", "0.4")))
+    return PANDAS_TA_03 if ver.startswith("0.3") else PANDAS_TA_04
+
+
+def pandas_ta_reference(df: pd.DataFrame) -> dict:
+    close, high, low = df["Close"], df["High"], df["Low"]
+    macd = ta.macd(close, fast=12, slow=26, signal=9)
+    stoch = ta.stoch(high=high, low=low, close=close, k=14, d=3)
+    bb = ta.bbands(close, length=20, std=2)
+    ref = {
+        "EMA12": ta.ema(close, length=12),
+        "EMA26": ta.ema(close, length=26),
+        "SMA20": ta.sma(close, length=20),
+        "MACD": macd.filter(like="MACD_").iloc[:, 0],
+        "MACD_Hist": macd.filter(like="MACDh_").iloc[:, 0],
+        "MACD_Signal": macd.filter(like="MACDs_").iloc[:, 0],
+        "RSI": ta.rsi(close, length=14),
+        "STOCH_K": stoch.filter(like="STOCHk_").iloc[:, 0],
+        "STOCH_D": stoch.filter(like="STOCHd_").iloc[:, 0],
+        "ATR": ta.atr(high=high, low=low, close=close, length=14),
+    }
+    for key, prefix in (("BB_Lower", "BBL_"), ("BB_Mid", "BBM_"), ("BB_Upper", "BBU_"),
+                        ("BB_BW", "BBB_"), ("BB_%B", "BBP_")):
+        ref[key] = bb.filter(like=prefix).iloc[:, 0]
+    return {k: v.to_numpy(dtype=np.float64) for k, v in ref.items()}
+
+
+def _compare(name: str, got: np.ndarray, ref: np.ndarray, rtol: float) -> bool:
+    same_nan = np.array_equal(np.isnan(got), np.isnan(ref))
+    valid = ~np.isnan(ref)
+    err = np.max(np.abs(got[valid] - ref[valid]) / np.maximum(1.0, np.abs(ref[valid]))) if valid.any() else 0.0
+    passed = same_nan and err <= rtol
+    print(f"  {name:12s} {'OK  ' if passed else 'FAIL'} NaN 위치 일치={same_nan}  최대 상대오차={err:.2e}")
+    return passed
+
+
+def check_parity(df: pd.DataFrame, rtol: float = 1e-8) -> bool:
+    version = _pandas_ta_version()
+    print(f"[parity] pandas-ta {getattr(ta, 'version', '?')} ↔ indicators(ta_version={version})")
+    ours = compute_indicators(df["High"], df["Low"], df["Close"], ta_version=version)
+    ok = True
+    for name, ref in pandas_ta_reference(df).items():
+        ok &= _compare(name, ours[name], ref, rtol)
+    return ok
+
+
+# ============================================================
+# 3. 스트리밍 상태 비교
+# ============================================================
+
+def check_streaming(df: pd.DataFrame, rtol: float = 1e-9) -> bool:
+    high, low, close, volume = (df[c].to_numpy() for c in ("High", "Low", "Close", "Volume"))
+    ok = True
+    for version in (PANDAS_TA_03, PANDAS_TA_04):
+        print(f"[stream] IndicatorState ↔ compute_indicators (ta_version={version})")
+        batch = compute_indicators(high, low, close, ta_version=version, volume=volume)
+        half = len(close) // 2
+        state = IndicatorState.from_arrays(high[:half], low[:half], close[:half], volume[:half], ta_version=version)
+        state = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+        rows = [state.update(high[i], low[i], close[i], volume[i]) for i in range(half, len(close))]
+        for name, ref in batch.items():
+            ok &= _compare(name, np.array([r[name] for r in rows]), ref[half:], rtol)
+    return ok
+
+
+# ============================================================
+# 4. 패널 비교
+# ============================================================
+
+def check_panel(panel: dict, rtol: float = 1e-12) -> bool:
+    ok = True
+    for version in (PANDAS_TA_03, PANDAS_TA_04):
+        print(f"[panel] compute_indicator_panel ↔ 종목별 compute_indicators (ta_version={version})")
+        got = compute_indicator_panel(panel["High"], panel["Low"], panel["Close"],
+                                      ta_version=version, volume=panel["Volume"])
+        worst: dict = {}
+        for r, s in enumerate(panel["listed"]):
+            ref = compute_indicators(*(panel[c][r, s:] for c in ("High", "Low", "Close")),
+                                     ta_version=version, volume=panel["Volume"][r, s:])
+            for name, v in ref.items():
+                g = got[name][r]
+                ok &= bool(np.isnan(g[:s]).all())
+                worst.setdefault(name, []).append((g[s:], v))
+        for name, pairs in worst.items():
+            ok &= _compare(name, np.concatenate([g for g, _ in pairs]),
+                           np.concatenate([v for _, v in pairs]), rtol)
+    return ok
+
+
+# ============================================================
+# 5. 벤치마크
+# ============================================================
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def benchmark(df: pd.DataFrame, repeat: int) -> None:
+    close, high, low = df["Close"], df["High"], df["Low"]
+    t_np = _best_of(lambda: compute_indicators(high, low, close), repeat)
+    print(f"[bench] {len(df)}행  indicators.compute_indicators: {t_np * 1e3:.2f} ms")
+    state = IndicatorState.from_arrays(high, low, close)
+    h, l, c = float(high.iloc[-1]), float(low.iloc[-1]), float(close.iloc[-1])
+    t_st = _best_of(lambda: state.update(h, l, c), repeat * 50)
+    print(f"[bench] 새 봉 1개  IndicatorState.update:          {t_st * 1e6:.1f} us")
+    if _HAS_PANDAS_TA:
+        def run_pandas_ta():
+            ta.ema(close, length=12)
+            ta.ema(close, length=26)
+            ta.macd(close, fast=12, slow=26, signal=9)
+            ta.sma(close, length=20)
+            ta.rsi(close, length=14)
+            ta.stoch(high=high, low=low, close=close, k=14, d=3)
+            ta.bbands(close, length=20, std=2)
+            ta.atr(high=high, low=low, close=close, length=14)
+        t_pt = _best_of(run_pandas_ta, repeat)
+        print(f"[bench] {len(df)}행  pandas-ta (같은 지표):         {t_pt * 1e3:.2f} ms  (x{t_pt / t_np:.1f})")
+
+
+def benchmark_panel(panel: dict, repeat: int) -> None:
+    h, l, c, v = (panel[k] for k in ("High", "Low", "Close", "Volume"))
+    rows, cols = c.shape
+    t_panel = _best_of(lambda: compute_indicator_panel(h, l, c, volume=v), repeat)
+    t_loop = _best_of(lambda: [compute_indicators(h[r], l[r], c[r], volume=v[r]) for r in range(rows)], repeat)
+    print(f"[bench] {rows}종목 x {cols}행  compute_indicator_panel: {t_panel * 1e3:.1f} ms")
+    print(f"[bench] {rows}종목 x {cols}행  종목별 반복:             {t_loop * 1e3:.1f} ms  (x{t_loop / t_panel:.1f})")
+    if _HAS_PANDAS_TA:
+        frames = [pd.DataFrame({"High": h[r], "Low": l[r], "Close": c[r]}) for r in range(rows)]
+
+        def run_pandas_ta():
+            for f in frames:
+                ta.ema(f["Close"], length=12)
+                ta.ema(f["Close"], length=26)
+                ta.macd(f["Close"], fast=12, slow=26, signal=9)
+                ta.sma(f["Close"], length=20)
+                ta.rsi(f["Close"], length=14)
+                ta.stoch(high=f["High"], low=f["Low"], close=f["Close"], k=14, d=3)
+                ta.bbands(f["Close"], length=20, std=2)
+                ta.atr(high=f["High"], low=f["Low"], close=f["Close"], length=14)
+        t_pt = _best_of(run_pandas_ta, 1)
+        print(f"[bench] {rows}종목 x {cols}행  pandas-ta 종목별 반복:    {t_pt * 1e3:.1f} ms  (x{t_pt / t_panel:.1f})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="indicators.py parity / benchmark")
+    parser.add_argument("--years", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tickers", type=int, default=200)
+    args = parser.parse_args()
+
+    df = make_prices(args.years, args.seed)
+    ok = True
+    if _HAS_PANDAS_TA:
+        ok = check_parity(df)
+    else:
+        print("[parity] pandas-ta가 없어 비교를 건너뜁니다. (pip install pandas-ta)")
+    ok &= check_streaming(df)
+    panel = make_panel(args.years, args.seed, args.tickers)
+    ok &= check_panel(panel)
+    benchmark(df, args.repeat)
+    benchmark_panel(panel, max(1, args.repeat // 10))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# data_cache.py
+"""
+yfinance 일봉 데이터를 티커별 로컬 파일로 보관하는 증분 캐시.
+
+- 티커 하나당 파일 하나(<cache_dir>/<ticker>.parquet)에 지금까지 받은
+  전체 히스토리를 저장하고, 실제로 받아 둔 구간 [start, end)를 사이드카
+  메타 파일(<ticker>.meta.json)에 기록한다.
+- 요청 구간이 캐시 구간 안에 있으면 네트워크 없이 파일만 읽는다.
+- 요청 구간이 캐시 구간 밖으로 나가면 부족한 앞/뒤 구간만 받아서
+  기존 히스토리에 이어 붙인다. (보통은 최근 며칠치 tail만 받게 된다.)
+- 분기 재무제표 / 애널리스트 추천처럼 자주 바뀌지 않는 데이터는
+  load_payload()로 TTL(유효 시간) 동안만 재사용한다.
+
+pyarrow가 없으면 Parquet 대신 pickle로 저장한다.
+(a2c_11.29 / marl_3agent / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except Exception:
+    _HAS_PARQUET = False
+
+
+# fetch_fn(ticker, start, end) -> DataFrame (DatetimeIndex, 단일 레벨 컬럼)
+FetchFn = Callable[[str, str, str], pd.DataFrame]
+
+_DATE_FMT = "%Y-%m-%d"
+
+# 같은 프로세스 안에서 같은 티커 파일을 동시에 갱신하지 않도록 티커별 락 사용
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = threading.Lock()
+        return _locks[path]
+
+
+# ============================================================
+# 1. 경로 / 읽기 / 쓰기
+# ============================================================
+
+def _safe_name(ticker: str) -> str:
+    """'^KS11' -> '_KS11', '005930.KS' -> '005930_KS'"""
+    return re.sub(r"[^0-9A-Za-z_-]", "_", ticker)
+
+
+def _paths(cache_dir: str, ticker: str) -> Tuple[str, str]:
+    ext = "parquet" if _HAS_PARQUET else "pkl"
+    base = os.path.join(cache_dir, _safe_name(ticker))
+    return f"{base}.{ext}", f"{base}.meta.json"
+
+
+def _read(cache_dir: str, ticker: str) -> Tuple[Optional[pd.DataFrame], Optional[dict]]:
+    data_path, meta_path = _paths(cache_dir, ticker)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if _HAS_PARQUET:
+            df = pd.read_parquet(data_path)
+        else:
+            df = pd.read_pickle(data_path)
+    except Exception as e:
+        print(f"[cache] {ticker} 캐시를 읽지 못했습니다({e}). 새로 다운로드합니다.")
+        return None, None
+    return df, meta
+
+
+def _write(cache_dir: str, ticker: str, df: pd.DataFrame, meta: dict) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = _paths(cache_dir, ticker)
+
+    # 쓰는 도중에 다른 프로세스가 깨진 파일을 읽지 않도록 임시 파일 → rename
+    tmp_data = data_path + ".tmp"
+    tmp_meta = meta_path + ".tmp"
+    if _HAS_PARQUET:
+        df.to_parquet(tmp_data)
+    else:
+        df.to_pickle(tmp_data)
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_meta, meta_path)
+
+
+def _normalize_index(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or df.empty:
+        return df
+    idx = pd.to_datetime(df.index)
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+    df.index = idx
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+# ============================================================
+# 2. 캐시 경유 로드
+# ============================================================
+
+# 이 일수보다 오래된 날짜는 봉이 없어도 '받아 둔 구간'으로 기록한다 (거래소 휴장일 등).
+# 최근 며칠은 공급자 반영이 늦을 수 있으므로 실제로 받은 봉까지만.
+SETTLE_DAYS = 3
+
+# end가 오늘 이후인 요청의 tail(아직 확정 안 된 최근 봉)을 다시 받기 전까지 기다리는 시간
+TAIL_RECHECK_MINUTES = 15.0
+
+
+def _covered(
+    df: Optional[pd.DataFrame],
+    lo: pd.Timestamp,
+    hi: pd.Timestamp,
+    today: pd.Timestamp,
+) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    [lo, hi)를 받아 온 결과 df로 '받아 둔 구간'이라고 기록해도 되는 [lo, hi').
+    - today - SETTLE_DAYS 이전은 봉이 없어도 전부 (휴장일 / 상장 전 구간을 매번 다시 받지 않게)
+    - 그 이후는 실제로 받은 마지막 봉까지만
+    - 기록할 구간이 없으면 None
+    fetch_fn이 예외 없이 돌려준 결과만 넘긴다. (일시적인 오류는 market_data에서 예외로 올라옴)
+    """
+    settled = today - timedelta(days=SETTLE_DAYS)
+    after_last = lo if df is None or df.empty else df.index[-1].normalize() + timedelta(days=1)
+    c_hi = min(hi, max(settled, after_last))
+    return (lo, c_hi) if c_hi > lo else None
+
+
+def load_history(
+    ticker: str,
+    start: str,
+    end: Optional[str],
+    fetch_fn: FetchFn,
+    cache_dir: str,
+) -> pd.DataFrame:
+    """
+    [start, end) 구간의 일봉을 반환한다. (end=None이면 오늘까지)
+
+    캐시가 이미 덮고 있는 구간은 파일에서 읽고, 모자란 앞/뒤 구간만
+    fetch_fn으로 받아서 캐시에 합친다.
+    오늘 날짜의 봉은 장중에 바뀔 수 있으므로 '받아 둔 구간'에는
+    어제까지만 기록한다. (_covered: 최근 SETTLE_DAYS일은 받은 봉까지만)
+    아직 확정되지 않은 tail은 TAIL_RECHECK_MINUTES 안에 같은 범위를 다시 요청하면
+    새로 받지 않고 파일의 값을 쓴다. (meta의 checked_end / checked_at)
+    """
+    now = datetime.now()
+    today = pd.Timestamp(now.date())
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end) if end is not None else today + timedelta(days=1)
+    cover_end = min(end_ts, today)
+
+    data_path, _ = _paths(cache_dir, ticker)
+    with _lock_for(data_path):
+        cached, meta = _read(cache_dir, ticker)
+
+        if cached is None:
+            df = _normalize_index(fetch_fn(ticker, start_ts.strftime(_DATE_FMT), end_ts.strftime(_DATE_FMT)))
+            if df is None or df.empty:
+                return df
+            c_start, c_end = _covered(df, start_ts, cover_end, today) or (start_ts, start_ts)
+            _write(cache_dir, ticker, df, {
+                "ticker": ticker,
+                "start": c_start.strftime(_DATE_FMT),
+                "end": c_end.strftime(_DATE_FMT),
+                "checked_end": end_ts.strftime(_DATE_FMT),
+                "checked_at": now.timestamp(),
+            })
+            return df.loc[(df.index >= start_ts) & (df.index < end_ts)].copy()
+
+        c_start = pd.Timestamp(meta["start"])
+        c_end = pd.Timestamp(meta["end"])
+        checked_end = pd.Timestamp(meta.get("checked_end", meta["end"]))
+        checked_at = meta.get("checked_at", 0.0)
+        parts = [cached]
+        changed = False
+
+        # 앞쪽이 모자라면 head 구간만 받기
+        if start_ts < c_start:
+            head = _normalize_index(fetch_fn(ticker, start_ts.strftime(_DATE_FMT), c_start.strftime(_DATE_FMT)))
+            if head is not None and not head.empty:
+                parts.insert(0, head)
+            cov = _covered(head, start_ts, c_start, today)
+            if cov is not None and cov[1] >= c_start:
+                c_start = cov[0]
+            changed = True
+
+        # 뒤쪽이 모자라면 tail 구간만 받기 (방금 확인한 미확정 tail이면 건너뜀)
+        recent = end_ts <= checked_end and now.timestamp() - checked_at < TAIL_RECHECK_MINUTES * 60.0
+        if end_ts > c_end and not recent:
+            tail = _normalize_index(fetch_fn(ticker, c_end.strftime(_DATE_FMT), end_ts.strftime(_DATE_FMT)))
+            if tail is not None and not tail.empty:
+                parts.append(tail)
+            cov = _covered(tail, c_end, cover_end, today)
+            if cov is not None:
+                c_end = max(c_end, cov[1])
+            checked_end, checked_at = end_ts, now.timestamp()
+            changed = True
+
+        if changed:
+            merged = _normalize_index(pd.concat(parts, axis=0))
+            _write(cache_dir, ticker, merged, {
+                "ticker": ticker,
+                "start": c_start.strftime(_DATE_FMT),
+                "end": c_end.strftime(_DATE_FMT),
+                "checked_end": checked_end.strftime(_DATE_FMT),
+                "checked_at": checked_at,
+            })
+        else:
+            merged = cached
+
+    return merged.loc[(merged.index >= start_ts) & (merged.index < end_ts)].copy()
+
+
+# ============================================================
+# 3. TTL 캐시 (재무제표 / 애널리스트 추천 등)
+# ============================================================
+
+def load_payload(
+    key: str,
+    fetch_fn: Callable[[], Any],
+    cache_dir: str,
+    ttl_hours: float,
+) -> Any:
+    """
+    key로 저장된 객체가 ttl_hours 이내에 저장된 것이면 그대로 반환하고,
+    아니면 fetch_fn()을 호출해서 새로 받은 뒤 저장한다.
+
+    새로 받는 데 실패하면(예외) 만료된 캐시라도 있으면 그것을 반환한다.
+    """
+    path = os.path.join(cache_dir, "payloads", _safe_name(key) + ".pkl")
+
+    with _lock_for(path):
+        saved = None
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    saved = pickle.load(f)
+            except Exception:
+                saved = None
+
+        if saved is not None and (time.time() - saved["saved_at"]) < ttl_hours * 3600.0:
+            return saved["value"]
+
+        try:
+            value = fetch_fn()
+        except Exception:
+            if saved is not None:
+                print(f"[cache] {key} 갱신 실패. 만료된 캐시를 사용합니다.")
+                return saved["value"]
+            raise
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"saved_at": time.time(), "value": value}, f)
+        os.replace(tmp, path)
+        return value
@@ -1,81 +1,29 @@
 # data_utils.py
 
+import json
+import os
+from collections import deque
+from datetime import datetime
+
 import numpy as np
 import pandas as pd
-from typing import Tuple, List
-
-import yfinance as yf
-# ---- pandas-ta 호환 래퍼 -----------------------------
-try:
-    import pandas_ta as ta
-    _USING_PANDAS_TA = True
-except Exception:
-    _USING_PANDAS_TA = False
-    try:
-        import ta as _ta
-    except Exception as e:
-        raise RuntimeError(
-            "pandas-ta도, ta도 설치되어 있지 않습니다. 다음 중 하나를 설치하세요:\n"
-            "  pip install pandas-ta  (Python 3.12+)\n"
-            "  pip install ta          (대체 라이브러리)"
-        ) from e
-
-    class _PTAWrapper:
-        @staticmethod
-        def ema(close, length=12):
-            return _ta.trend.EMAIndicator(close=close, window=length).ema_indicator()
-
-        @staticmethod
-        def sma(close, length=20):
-            return _ta.trend.SMAIndicator(close=close, window=length).sma_indicator()
-
-        @staticmethod
-        def macd(close, fast=12, slow=26, signal=9):
-            ind = _ta.trend.MACD(close=close, window_slow=slow, window_fast=fast, window_sign=signal)
-            # pandas_ta returns DataFrame with columns like MACD_12_26_9, MACDs_12_26_9, MACDh_12_26_9
-            # But here we just need the object to access columns later?
-            # data_utils.py uses: macd.iloc[:, 0] (MACD line)
-            return pd.DataFrame({
-                f"MACD_{fast}_{slow}_{signal}": ind.macd(),
-                f"MACDs_{fast}_{slow}_{signal}": ind.macd_signal(),
-                f"MACDh_{fast}_{slow}_{signal}": ind.macd_diff()
-            })
-
-        @staticmethod
-        def rsi(close, length=14):
-            return _ta.momentum.RSIIndicator(close=close, window=length).rsi()
-
-        @staticmethod
-        def stoch(high, low, close, k=14, d=3):
-            ind = _ta.momentum.StochasticOscillator(
-                high=high, low=low, close=close, window=k, smooth_window=3
-            )
-            return pd.DataFrame({
-                f"STOCHk_{k}_{d}_3": ind.stoch(),
-                f"STOCHd_{k}_{d}_3": ind.stoch_signal()
-            })
-
-        @staticmethod
-        def atr(high, low, close, length=14):
-            return _ta.volatility.AverageTrueRange(
-                high=high, low=low, close=close, window=length
-            ).average_true_range()
-
-        @staticmethod
-        def bbands(close, length=20, std=2.0):
-            bb = _ta.volatility.BollingerBands(close=close, window=length, window_dev=std)
-            return pd.DataFrame({
-                f"BBL_{length}_{std}": bb.bollinger_lband(),
-                f"BBM_{length}_{std}": bb.bollinger_mavg(),
-                f"BBU_{length}_{std}": bb.bollinger_hband(),
-                f"BBB_{length}_{std}": bb.bollinger_pband(), # %B
-                f"BBP_{length}_{std}": bb.bollinger_wband()  # Bandwidth? No, wband is bandwidth, pband is %b
-            })
-
-    ta = _PTAWrapper()
-# ------------------------------------------------------------------------------
+from typing import Dict, Iterable, Tuple, List, Optional
+
+from data_cache import load_history
+from feature_store import DTYPE, load_or_build
+from indicators import PANDAS_TA_03, IndicatorState, compute_indicator_panel, compute_indicators
+from market_data import SourceSpec, fetch_many, make_source
+
+
+# 상대 경로 설정(cache_dir, feature_store_dir)의 기준 = 이 프로젝트 폴더 (실행 위치와 무관)
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+def _project_path(path: Optional[str]) -> Optional[str]:
+    if path and not os.path.isabs(path):
+        return os.path.join(_PROJECT_DIR, path)
+    return path
+
 
 # ============================================================
 # 1. 사용할 피처(기술 지표) 정의
@@ -107,18 +55,38 @@ def download_data(
     vix_ticker: str,
     start_date: str,
     end_date: str,
+    cache_dir: Optional[str] = "data_cache",
+    source: SourceSpec = None,
+    max_workers: int = 3,
 ) -> pd.DataFrame:
     """
-    삼성전자, KOSPI, VIX를 yfinance로 받아서
+    삼성전자, KOSPI, VIX를 받아서
     하나의 DataFrame으로 합친 후 반환.
+
+    source는 market_data.make_source에 넘길 공급자 설정
+    (None이면 yfinance, 그 외 snapshot / synthetic → config.yaml의 data_source).
+    cache_dir가 주어지면 data_cache의 티커별 로컬 캐시를 거쳐서,
+    캐시에 없는 앞/뒤 구간만 네트워크로 받는다. (None이면 매번 전체 다운로드)
+    상대 경로 cache_dir는 실행 위치가 아니라 이 프로젝트 폴더 기준.
+    오프라인 공급자(snapshot / synthetic)는 캐시를 거치지 않는다.
+    세 티커는 max_workers개 스레드로 동시에 받는다. (1이면 순서대로)
     
     반환 컬럼:
     - ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'KOSPI', 'VIX']
     """
-    # 개별 다운로드
-    stock = yf.download(ticker, start=start_date, end=end_date, progress=False)
-    kospi = yf.download(kospi_ticker, start=start_date, end=end_date, progress=False)
-    vix = yf.download(vix_ticker, start=start_date, end=end_date, progress=False)
+    src = make_source(source)
+    cache_dir = _project_path(cache_dir)
+
+    def fetch(t: str) -> pd.DataFrame:
+        if cache_dir and src.cacheable:
+            return load_history(t, start_date, end_date, src.fetch, cache_dir)
+        return src.fetch(t, start_date, end_date)
+
+    # 세 티커 동시 다운로드 (재시도 / 속도 제한은 공급자 안에서 처리)
+    frames = fetch_many([ticker, kospi_ticker, vix_ticker], fetch, max_workers=max_workers)
+    stock = frames[ticker]
+    kospi = frames[kospi_ticker]
+    vix = frames[vix_ticker]
 
     if stock.empty:
         raise ValueError(f"{ticker} 데이터가 비어 있습니다. yfinance 또는 티커 설정을 확인하세요.")
@@ -127,14 +95,6 @@ def download_data(
     if vix.empty:
         raise ValueError(f"{vix_ticker} (VIX) 데이터가 비어 있습니다.")
 
-    # 혹시라도 MultiIndex 컬럼이면 평탄화
-    if isinstance(stock.columns, pd.MultiIndex):
-        stock.columns = [c[0] for c in stock.columns]
-    if isinstance(kospi.columns, pd.MultiIndex):
-        kospi.columns = [c[0] for c in kospi.columns]
-    if isinstance(vix.columns, pd.MultiIndex):
-        vix.columns = [c[0] for c in vix.columns]
-
     # 인덱스 공통 구간만 사용
     common_index = stock.index.intersection(kospi.index).intersection(vix.index)
     stock = stock.loc[common_index]
@@ -186,64 +146,25 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     df = df.copy()
 
-    close = df["Close"]
-    high = df["High"]
-    low = df["Low"]
-    volume = df["Volume"]
+    # requirements의 pandas-ta 0.3.14b와 같은 계산식 (indicators.py)
+    ind = compute_indicators(df["High"], df["Low"], df["Close"], ta_version=PANDAS_TA_03)
 
     # --- 이동 평균 계열 ---
-    df["EMA12"] = ta.ema(close, length=12)
-    df["EMA26"] = ta.ema(close, length=26)
-
-    macd = ta.macd(close, fast=12, slow=26, signal=9)
-    if macd is not None and not macd.empty:
-        df["MACD"] = macd.iloc[:, 0]
-    else:
-        df["MACD"] = np.nan
-
-    df["SMA20"] = ta.sma(close, length=20)
+    df["EMA12"] = ind["EMA12"]
+    df["EMA26"] = ind["EMA26"]
+    df["MACD"] = ind["MACD"]
+    df["SMA20"] = ind["SMA20"]
 
     # --- 모멘텀 계열 ---
-    df["RSI"] = ta.rsi(close, length=14)
-
-    stoch = ta.stoch(high=high, low=low, close=close, k=14, d=3)
-    if stoch is not None and not stoch.empty:
-        df["STOCH_%K"] = stoch.iloc[:, 0]
-    else:
-        df["STOCH_%K"] = np.nan
+    df["RSI"] = ind["RSI"]
+    df["STOCH_%K"] = ind["STOCH_K"]
 
     # --- 변동성/심리 계열 ---
-    bbands = ta.bbands(close, length=20, std=2)
-    if bbands is not None and not bbands.empty:
-        bw_col = [c for c in bbands.columns if "BBB_" in c or "BW" in c]
-        bp_col = [c for c in bbands.columns if "BBP_" in c or "%B" in c]
-
-        if bw_col:
-            df["BB_BW"] = bbands[bw_col[0]]
-        else:
-            try:
-                lower = bbands.iloc[:, 0]
-                middle = bbands.iloc[:, 1]
-                upper = bbands.iloc[:, 2]
-                df["BB_BW"] = (upper - lower) / middle.replace(0, np.nan)
-            except Exception:
-                df["BB_BW"] = np.nan
-
-        if bp_col:
-            df["BB_%B"] = bbands[bp_col[0]]
-        else:
-            try:
-                lower = bbands.iloc[:, 0]
-                upper = bbands.iloc[:, 2]
-                df["BB_%B"] = (close - lower) / (upper - lower).replace(0, np.nan)
-            except Exception:
-                df["BB_%B"] = np.nan
-    else:
-        df["BB_BW"] = np.nan
-        df["BB_%B"] = np.nan
+    df["BB_BW"] = ind["BB_BW"]
+    df["BB_%B"] = ind["BB_%B"]
 
     # --- 리스크 계열 ---
-    df["ATR"] = ta.atr(high=high, low=low, close=close, length=14)
+    df["ATR"] = ind["ATR"]
 
     # 최종적으로 FEATURE들에 NaN 있는 행 제거
     df = df.dropna(subset=FEATURES)
@@ -251,6 +172,26 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# add_indicators의 계산 로직을 바꾸면 올린다 (feature_store에 저장된 행렬 무효화)
+INDICATOR_VERSION = 2
+
+
+def load_features(
+    raw: pd.DataFrame,
+    ticker: str,
+    store_dir: Optional[str] = "feature_store",
+) -> pd.DataFrame:
+    """
+    add_indicators(raw)와 같은 결과를 feature_store 캐시를 거쳐서 반환.
+    raw가 지난번과 같으면 지표 계산 없이 float32 memmap을 그대로 연다.
+    (반환값은 읽기 전용 → 스케일링 등은 분할/복사한 DataFrame에서)
+    store_dir가 상대 경로면 실행 위치가 아니라 이 프로젝트 폴더 기준.
+    """
+    return load_or_build(
+        ticker, "a2c", INDICATOR_VERSION, [raw], lambda: add_indicators(raw), _project_path(store_dir)
+    )
+
+
 # ============================================================
 # 4. Train / Test 분할  (기존 + 새로 추가)
 # ============================================================
@@ -306,10 +247,12 @@ def train_test_split_last_10y_and_1y(
 # ============================================================
 
 def build_state(window_df: pd.DataFrame, position_flag: int) -> np.ndarray:
-    feat_mat = window_df[FEATURES].values
-    flat_feats = feat_mat.reshape(-1)
-    state = np.concatenate([flat_feats, np.array([position_flag], dtype=float)], axis=0)
-    return state.astype(np.float32)
+    """창 피처 + 포지션 → DTYPE(float32) 상태 벡터 (float64 중간 배열 없이 바로 채움)"""
+    feat_mat = window_df[FEATURES].to_numpy(dtype=DTYPE)
+    state = np.empty(feat_mat.size + 1, dtype=DTYPE)
+    state[:-1] = feat_mat.reshape(-1)
+    state[-1] = position_flag
+    return state
 
 
 # ============================================================
@@ -323,4 +266,218 @@ def get_feature_names_with_position(window_size: int) -> List[str]:
         for feat in FEATURES:
             names.append(f"{feat}_t-{lag}")
     names.append("Position")
-    return names
\ No newline at end of file
+    return names
+
+# ============================================================
+# 7. 증분 피처 (실시간 추천용)
+# ============================================================
+
+class FeatureStream:
+    """
+    add_indicators() 결과의 마지막 window_size행을 새 봉 하나씩 갱신하며 들고 있는 상태.
+
+    - 지표는 indicators.IndicatorState로 봉마다 O(1) 갱신 (히스토리 전체를 다시 계산하지 않음)
+    - save() / load()로 JSON 체크포인트를 남기면, 다음 추천 때는 그 뒤에 나온 봉만 받으면 된다.
+    - 같은 히스토리를 처음부터 넣으면 add_indicators()의 마지막 행들과 같은 값이 나온다.
+    - key: 체크포인트를 만든 설정(티커, 시작일 등). 설정이 바뀌면 체크포인트를 버린다.
+    """
+
+    def __init__(self, window_size: int, key: Optional[dict] = None):
+        self.window_size = window_size
+        self.key = key or {}
+        self.state = IndicatorState(PANDAS_TA_03)
+        self.last_date: Optional[pd.Timestamp] = None
+        self.rows: deque = deque(maxlen=window_size)  # (날짜, FEATURES 순서의 값)
+
+    def push(self, date, bar) -> None:
+        """download_data 한 행(High/Low/Close/Volume/KOSPI/VIX)을 반영."""
+        ind = self.state.update(bar["High"], bar["Low"], bar["Close"])
+        values = {
+            **ind,
+            "STOCH_%K": ind["STOCH_K"],
+            "Volume": bar["Volume"],
+            "KOSPI": bar["KOSPI"],
+            "VIX": bar["VIX"],
+        }
+        row = [float(values[f]) for f in FEATURES]
+        self.last_date = pd.Timestamp(date)
+        # add_indicators의 dropna(subset=FEATURES)와 같은 규칙
+        if not np.isnan(row).any():
+            self.rows.append((self.last_date, row))
+
+    def extend(self, raw: pd.DataFrame) -> int:
+        """raw 중 last_date 이후의 봉만 순서대로 반영하고, 반영한 봉 수를 반환."""
+        if self.last_date is not None:
+            raw = raw[raw.index > self.last_date]
+        bars = raw[["High", "Low", "Close", "Volume", "KOSPI", "VIX"]].to_dict("records")
+        for date, bar in zip(raw.index, bars):
+            self.push(date, bar)
+        return len(bars)
+
+    def window(self) -> Optional[pd.DataFrame]:
+        """마지막 window_size행 (FEATURES 컬럼). 아직 모자라면 None."""
+        if len(self.rows) < self.window_size:
+            return None
+        dates, values = zip(*self.rows)
+        return pd.DataFrame(list(values), index=pd.DatetimeIndex(dates), columns=FEATURES)
+
+    # ---------- 체크포인트 ----------
+    def to_dict(self) -> dict:
+        return {
+            "window_size": self.window_size,
+            "key": self.key,
+            "state": self.state.to_dict(),
+            "last_date": None if self.last_date is None else self.last_date.strftime("%Y-%m-%d"),
+            "rows": [[d.strftime("%Y-%m-%d"), r] for d, r in self.rows],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureStream":
+        stream = cls(data["window_size"], data.get("key"))
+        stream.state = IndicatorState.from_dict(data["state"])
+        stream.last_date = None if data["last_date"] is None else pd.Timestamp(data["last_date"])
+        for d, r in data["rows"]:
+            stream.rows.append((pd.Timestamp(d), [float(v) for v in r]))
+        return stream
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: Optional[dict] = None) -> Optional["FeatureStream"]:
+        """체크포인트를 읽는다. 없거나, 깨졌거나, key가 다르면 None."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stream = cls.from_dict(json.load(f))
+        except Exception as e:
+            print(f"[stream] 체크포인트를 읽지 못했습니다({e}). 처음부터 다시 만듭니다.")
+            return None
+        if key is not None and stream.key != key:
+            return None
+        return stream
+
+
+def update_feature_stream(
+    cfg: dict,
+    path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    source: SourceSpec = None,
+    end_date: Optional[str] = None,
+) -> FeatureStream:
+    """
+    체크포인트(path)의 FeatureStream에 그 뒤로 나온 봉만 받아서 반영하고 다시 저장한다.
+
+    체크포인트가 없거나 설정이 바뀌었으면 cfg["start_date"]부터 한 번 전체를 흘려 넣는다.
+    (학습 데이터와 같은 시작일부터 누적하므로 EMA/RMA 값이 학습 때 피처와 같다)
+    source / cache_dir는 download_data에 그대로 넘긴다.
+    """
+    key = {
+        "ticker": cfg["ticker"],
+        "kospi_ticker": cfg["kospi_ticker"],
+        "vix_ticker": cfg["vix_ticker"],
+        "start_date": str(cfg["start_date"]),
+        "data_source": cfg.get("data_source"),
+        "indicator_version": INDICATOR_VERSION,
+    }
+    stream = FeatureStream.load(path, key) if path else None
+    if stream is None or stream.window_size != cfg["window_size"]:
+        stream = FeatureStream(cfg["window_size"], key)
+        start = str(cfg["start_date"])
+    else:
+        start = (stream.last_date + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    end = end_date or datetime.today().strftime("%Y-%m-%d")
+    if start < end:
+        try:
+            raw = download_data(cfg["ticker"], cfg["kospi_ticker"], cfg["vix_ticker"], start, end,
+                                cache_dir=cache_dir, source=source)
+        except ValueError as e:
+            # 주말/휴장일처럼 새 봉이 없는 경우
+            print(f"[stream] {start} 이후 새 봉이 없습니다 ({e})")
+        else:
+            n_new = stream.extend(raw)
+            print(f"[stream] 새 봉 {n_new}개 반영 (마지막: {stream.last_date:%Y-%m-%d})")
+
+    if path:
+        stream.save(path)
+    return stream
+
+
+# ============================================================
+# 8. 여러 종목 패널 (유니버스 전체 지표)
+# ============================================================
+
+PANEL_FIELDS: Tuple[str, ...] = ("Open", "High", "Low", "Close", "Volume")
+
+
+def download_panel(
+    tickers: Iterable[str],
+    start_date: str,
+    end_date: str,
+    cache_dir: Optional[str] = "data_cache",
+    source: SourceSpec = None,
+    max_workers: int = 8,
+) -> Dict[str, pd.DataFrame]:
+    """
+    여러 종목의 OHLCV를 받아서 필드별 (날짜 x 종목) DataFrame으로 반환.
+    {"Open": df, "High": df, "Low": df, "Close": df, "Volume": df}
+
+    - 날짜는 모든 종목 날짜의 합집합. 상장 전 / 상장 폐지 후 구간은 NaN으로 둔다.
+    - 상장 기간 중간에 빠진 날(거래 정지 등)은 직전 종가로 OHLC를 채우고 Volume은 0.
+      (지표의 EMA/RMA가 그 뒤로 모두 NaN이 되지 않도록)
+    - 데이터가 하나도 없는 종목은 NaN 열로 남는다.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    src = make_source(source)
+    cache_dir = _project_path(cache_dir)
+
+    def fetch(t: str) -> pd.DataFrame:
+        if cache_dir and src.cacheable:
+            return load_history(t, start_date, end_date, src.fetch, cache_dir)
+        return src.fetch(t, start_date, end_date)
+
+    frames = fetch_many(tickers, fetch, max_workers=max_workers)
+    index = pd.DatetimeIndex(sorted(set().union(*(f.index for f in frames.values()))), name="Date")
+
+    panel: Dict[str, pd.DataFrame] = {}
+    for field in PANEL_FIELDS:
+        cols = {t: frames[t][field] if field in frames[t].columns else pd.Series(dtype=float) for t in tickers}
+        panel[field] = pd.DataFrame({t: c.reindex(index) for t, c in cols.items()}, index=index,
+                                    columns=tickers, dtype=np.float64)
+
+    # 상장 기간 안쪽의 빈칸만 (앞뒤 NaN은 그대로)
+    close = panel["Close"]
+    gap = close.isna() & close.ffill().notna() & close.bfill().notna()
+    filled_close = close.mask(gap, close.ffill())
+    for field in ("Open", "High", "Low"):
+        panel[field] = panel[field].mask(gap, filled_close)
+    panel["Close"] = filled_close
+    panel["Volume"] = panel["Volume"].mask(gap, 0.0)
+    return panel
+
+
+def add_indicators_panel(
+    panel: Dict[str, pd.DataFrame],
+    ta_version: str = PANDAS_TA_03,
+) -> Dict[str, pd.DataFrame]:
+    """
+    download_panel 결과로 전 종목 지표를 한 번에 계산해서 지표별 (날짜 x 종목) DataFrame으로 반환.
+    종목마다 add_indicators를 부른 것과 같은 값이고 (이름도 STOCH_%K로 같게),
+    워밍업 전 구간은 NaN이다. (compute_indicator_panel 참고)
+    """
+    close = panel["Close"]
+    ind = compute_indicator_panel(
+        panel["High"].to_numpy().T,
+        panel["Low"].to_numpy().T,
+        close.to_numpy().T,
+        ta_version=ta_version,
+        volume=panel["Volume"].to_numpy().T,
+    )
+    ind["STOCH_%K"] = ind.pop("STOCH_K")
+    return {k: pd.DataFrame(v.T, index=close.index, columns=close.columns) for k, v in ind.items()}
@@ -0,0 +1,117 @@
+# episode_sampler.py
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+
+class EpisodeSampler:
+    """
+    학습 구간에서 무작위 시작점 + 고정 길이(horizon) 에피소드를 뽑는다.
+    - 10년치 전체를 한 에피소드로 훑는 대신 짧은 구간 여러 개로 업데이트 횟수를 늘리는 용도.
+      (VecTradingEnv.reset(starts=...) / episode_len 과 함께 사용)
+    - 에피소드 길이 = warmup + horizon.
+      합성보상은 최근 roll_window일 통계가 찬 뒤부터 나오므로 warmup=roll_window로 두면
+      모든 에피소드에서 합성보상이 horizon 스텝 동안 들어간다. (make_episode_sampler가 자동으로 설정)
+    - stratify:
+        None         → 가능한 시작점 전체에서 균등
+        "year"       → 연도를 먼저 균등하게 고르고 그 안에서 시작점 균등 (특정 연도 쏠림 방지)
+        "volatility" → 시작 시점의 최근 vol_window일 수익률 변동성을 n_regimes개 분위 구간으로 나눠
+                       구간을 먼저 균등하게 고른다 (저/고변동 장세를 고르게)
+      구간 기준 시점은 보상이 들어가기 시작하는 start + warmup.
+    """
+
+    STRATIFY = (None, "year", "volatility")
+
+    def __init__(
+        self,
+        n_steps: int,
+        window_size: int,
+        horizon: int,
+        warmup: int = 0,
+        stratify: Optional[str] = None,
+        dates: Optional[Sequence] = None,
+        asset_returns: Optional[np.ndarray] = None,
+        vol_window: int = 63,
+        n_regimes: int = 3,
+        seed: Optional[int] = None,
+    ):
+        if stratify not in self.STRATIFY:
+            raise ValueError(f"stratify는 {self.STRATIFY} 중 하나여야 합니다: {stratify}")
+        if horizon < 1:
+            raise ValueError(f"horizon은 1 이상이어야 합니다: {horizon}")
+
+        self.horizon = horizon
+        self.warmup = warmup
+        self.episode_len = warmup + horizon
+        self.stratify = stratify
+        self.rng = np.random.default_rng(seed)
+
+        # 시작점 범위: 첫 관측 창이 차는 window_size - 1 부터, 에피소드가 데이터 끝(n_steps - 1)을 넘지 않게
+        first, last = window_size - 1, n_steps - 1 - self.episode_len
+        if last < first:
+            raise ValueError(
+                f"데이터가 짧습니다: {n_steps}행 < window_size({window_size}) + warmup({warmup}) + horizon({horizon})"
+            )
+        self.starts = np.arange(first, last + 1)
+
+        labels = self._labels(stratify, dates, asset_returns, vol_window, n_regimes)
+        if labels is None:
+            self.groups = [self.starts]
+        else:
+            self.groups = [self.starts[labels == g] for g in np.unique(labels)]
+
+    def _labels(self, stratify, dates, asset_returns, vol_window, n_regimes) -> Optional[np.ndarray]:
+        """시작점별 층 번호 (stratify=None이면 None)"""
+        anchor = self.starts + self.warmup
+        if stratify == "year":
+            if dates is None:
+                raise ValueError("stratify='year'에는 dates(학습 구간 날짜 인덱스)가 필요합니다.")
+            return pd.DatetimeIndex(dates)[anchor].year.to_numpy()
+        if stratify == "volatility":
+            if asset_returns is None:
+                raise ValueError("stratify='volatility'에는 asset_returns(일별 수익률)가 필요합니다.")
+            vol = pd.Series(asset_returns).rolling(vol_window, min_periods=2).std().to_numpy()[anchor]
+            vol = np.nan_to_num(vol, nan=np.nanmedian(vol) if np.isfinite(vol).any() else 0.0)
+            edges = np.quantile(vol, np.linspace(0.0, 1.0, n_regimes + 1)[1:-1])
+            return np.searchsorted(edges, vol, side="right")
+        return None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def sample(self, n: int) -> np.ndarray:
+        """시작 인덱스 n개 (층을 균등하게 고른 뒤 층 안에서 균등)"""
+        group_idx = self.rng.integers(0, len(self.groups), size=n)
+        return np.array([self.groups[g][self.rng.integers(0, len(self.groups[g]))] for g in group_idx],
+                        dtype=np.int64)
+
+
+def make_episode_sampler(
+    train_df: pd.DataFrame,
+    window_size: int,
+    reward_cfg: dict,
+    sampler_cfg: dict,
+    seed: Optional[int] = None,
+) -> EpisodeSampler:
+    """
+    config.yaml의 episode_sampler 섹션으로 EpisodeSampler 생성.
+    합성보상을 쓰면 warmup = reward.roll_window (TradingEnv와 같은 기본값 63)
+    """
+    use_composite = reward_cfg.get("use_composite", False)
+    warmup = sampler_cfg.get("warmup", reward_cfg.get("roll_window", 63) if use_composite else 0)
+    close = train_df["Close"].to_numpy(dtype=float)
+    asset_returns = np.zeros(len(close))
+    asset_returns[1:] = close[1:] / close[:-1] - 1.0
+    return EpisodeSampler(
+        n_steps=len(train_df),
+        window_size=window_size,
+        horizon=sampler_cfg.get("horizon", 252),
+        warmup=warmup,
+        stratify=sampler_cfg.get("stratify"),
+        dates=train_df.index,
+        asset_returns=asset_returns,
+        vol_window=sampler_cfg.get("vol_window", 63),
+        n_regimes=sampler_cfg.get("n_regimes", 3),
+        seed=seed,
+    )
@@ -11,7 +11,7 @@ import matplotlib.dates as mdates  # 날짜 축용
 
 from ac_model import A2CAgent
 from trading_env import TradingEnv
-from data_utils import FEATURES, download_data, add_indicators
+from data_utils import FEATURES, download_data, load_features
 
 # -------------------------------------------
 # 1. 백테스트 지표 계산 함수 (승률 정의 포함)
@@ -131,8 +131,10 @@ df = download_data(
     vix_ticker=vix_ticker,
     start_date=start_date,
     end_date=end_date,
+    cache_dir=cfg.get("cache_dir", "data_cache"),
+    source=cfg.get("data_source"),
 )
-df = add_indicators(df)
+df = load_features(df, ticker, cfg.get("feature_store_dir", "feature_store"))
 df = df.dropna(subset=FEATURES + ["Close", "KOSPI"])
 
 print(f"    · 전체 데이터 기간: {df.index.min().date()} ~ {df.index.max().date()} (총 {len(df)}일)")
@@ -184,6 +186,7 @@ env = TradingEnv(
     trade_penalty=trade_penalty,
     use_daily_unrealized=use_daily_unrealized,
     reward_cfg=reward_cfg,
+    reuse_obs_buffer=True,  # 상태를 act()에 바로 넘기고 버린다
 )
 
 state_dim = env.current_state_dim()
@@ -211,7 +214,7 @@ print(f"    · 모델 로드 완료: {model_path}")
 # -------------------------------------------
 print("\n[5] 테스트 구간 백테스트 진행 ...")
 
-s = env.reset()
+s, _ = env.reset()
 done = False
 
 daily_returns = []
@@ -229,7 +232,7 @@ while not done:
     else:
         a = a_raw
 
-    ns, r, done, info = env.step(a)
+    ns, r, done, _, info = env.step(a)
 
     if a in (0, 1):    # Long 또는 Short 한 번이라도 하면 이후에는 자유
         has_position = True
@@ -270,8 +273,7 @@ print(f"    - 최대 낙폭(MDD)    : {metrics['mdd']*100:.2f}%")
 # -------------------------------------------
 print("\n[7] 일별 수익률 및 승률 시각화 ...")
 
-port_rets = np.array(env.port_ret_hist, dtype=float)
-mkt_rets_env = np.array(env.mkt_ret_hist, dtype=float)  # 필요하면 참고용
+port_rets = daily_returns.copy()  # env가 스텝마다 돌려준 r_t (포트폴리오 일별 수익률)
 equity_curve = np.array(env.equity_curve, dtype=float)
 buyhold_curve = np.array(env.buyhold_curve, dtype=float)
 
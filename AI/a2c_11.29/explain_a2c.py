@@ -12,11 +12,12 @@ import pandas as pd
 
 from data_utils import (
     download_data,
-    add_indicators,
+    load_features,
     FEATURES,
     build_state,
 )
-from ac_model import A2CAgent
+from ac_model import A2CAgent, _obs_tensor
+from feature_store import DTYPE
 
 
 # --- feature 이름 생성 (window_size 반영) ---
@@ -83,7 +84,7 @@ def get_recommendation_and_explanation(
 ):
     # 1. 정책 확률 계산
     with torch.no_grad():
-        state_tensor = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+        state_tensor = _obs_tensor(state, agent.device).unsqueeze(0)
         policy_logits, _ = agent.ac_net(state_tensor)
         policy_probs = F.softmax(policy_logits, dim=-1).detach().cpu().numpy()[0]
 
@@ -168,8 +169,10 @@ def run_prediction():
         cfg["vix_ticker"],
         cfg["start_date"],
         cfg["end_date"],
+        cache_dir=cfg.get("cache_dir", "data_cache"),
+        source=cfg.get("data_source"),
     )
-    df = add_indicators(raw)
+    df = load_features(raw, cfg["ticker"], cfg.get("feature_store_dir", "feature_store"))
 
     # train/test 분할 (train은 배경 데이터용, test는 대상 window 선택용)
     train_df, test_df = calendar_split(df, train_years, backtest_days)
@@ -213,7 +216,8 @@ def run_prediction():
     bg_summary = shap.sample(bg_states, 100)
 
     def model_f(x):
-        x_t = torch.tensor(x, dtype=torch.float32, device=cfg.get("device", "cpu"))
+        # SHAP이 만드는 샘플은 float64일 수 있으므로 여기서 float32로 바꾼다
+        x_t = _obs_tensor(np.asarray(x, dtype=DTYPE), cfg.get("device", "cpu"))
         policy_logits, _ = agent.ac_net(x_t)
         policy_probs = F.softmax(policy_logits, dim=-1)
         return policy_probs.detach().cpu().numpy()
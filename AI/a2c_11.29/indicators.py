@@ -0,0 +1,760 @@
+# indicators.py
+"""
+pandas-ta 없이 NumPy 배열만으로 기술지표를 계산하는 엔진.
+
+- compute_indicators(high, low, close)가 한 번의 호출로 모든 지표를 계산하고
+  중간 결과를 공유한다. (SMA20 = 볼린저 중심선, EMA12/EMA26 → MACD,
+  누적합 하나로 SMA20과 이동 분산을 같이 계산)
+- 이동 평균/분산: 누적합(prefix sum) 차분. 창마다 다시 더하지 않는다.
+- EMA / Wilder(RMA): 1차 재귀 필터. scipy가 있으면 scipy.signal.lfilter,
+  없으면 파이썬 루프로 같은 점화식을 계산한다.
+- 이동 최고/최저: 창 길이만큼 밀어 가며 np.maximum / np.minimum
+- 배열 함수는 모두 마지막 축(시간)을 따라 계산하므로 (종목 x 시간) 2차원 패널도
+  그대로 받는다. compute_indicator_panel이 종목마다 상장일(첫 유효값)이 달라도
+  한 번의 벡터 연산으로 전 종목 지표를 계산한다.
+- IndicatorState: 같은 지표를 새 봉 하나씩 O(1)로 갱신하는 스트리밍 상태.
+  to_dict() / from_dict()로 저장했다가 이어서 계산할 수 있다. (실시간 추천용)
+
+값은 pandas-ta와 같게 맞춘다. 버전마다 계산식이 조금 다르므로 ta_version으로 고른다.
+    "0.3" : pandas-ta 0.3.14b (a2c_11.29 requirements)
+            RMA = ewm(alpha=1/n, adjust=True, min_periods=n), TR 첫 값 NaN,
+            볼린저 표준편차 ddof=0
+    "0.4" : pandas-ta 0.4.x (marl requirements)
+            RMA = ewm(alpha=1/n, adjust=False), ATR은 TR 첫 n개 평균으로 시작,
+            볼린저 표준편차 ddof=1
+입력은 앞쪽 NaN(워밍업)만 허용한다. 중간에 NaN이 있으면 이동 평균 계열은
+그 창만 NaN이 되지만 EMA/RMA 계열은 그 뒤가 모두 NaN이 된다.
+
+(a2c_11.29 / marl_3agent / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+import math
+import sys
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from scipy.signal import lfilter
+    _HAS_SCIPY = True
+except Exception:
+    _HAS_SCIPY = False
+
+
+PANDAS_TA_03 = "0.3"
+PANDAS_TA_04 = "0.4"
+
+_EPS = sys.float_info.epsilon
+
+
+# ============================================================
+# 1. 기본 연산
+# ============================================================
+
+def _as_float(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _first_valid(x: np.ndarray) -> int:
+    """
+    첫 번째 NaN이 아닌 (시간축) 위치. 전부 NaN이면 길이.
+    2차원이면 어느 한 행이라도 값이 있는 첫 열. (패널은 행마다 시작을 맞춰서 넘긴다)
+    """
+    nan = np.isnan(x)
+    if nan.ndim > 1:
+        nan = nan.all(axis=tuple(range(nan.ndim - 1)))
+    valid = np.flatnonzero(~nan)
+    return int(valid[0]) if valid.size else len(nan)
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan)
+
+
+def _prepend_nan(x: np.ndarray) -> np.ndarray:
+    """시간축 맨 앞에 NaN 한 칸을 붙이고 마지막 칸을 버린다. (한 칸 뒤로 민 값)"""
+    return np.concatenate((np.full(x.shape[:-1] + (1,), np.nan), x[..., :-1]), axis=-1)
+
+
+def non_zero_range(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a - b. 0이 하나라도 있으면 전체에 float epsilon을 더한다. (pandas-ta와 동일, 패널은 행마다)"""
+    diff = a - b
+    return diff + np.where(np.any(diff == 0, axis=-1, keepdims=True), _EPS, 0.0)
+
+
+def _iir1(x: np.ndarray, gain: float, decay: float, y_prev) -> np.ndarray:
+    """y[t] = gain * x[t] + decay * y[t-1],  y[-1] = y_prev  (y_prev는 행마다 하나)"""
+    y_prev = np.asarray(y_prev, dtype=np.float64)
+    if _HAS_SCIPY:
+        y, _ = lfilter([gain], [1.0, -decay], x, axis=-1, zi=(decay * y_prev)[..., None])
+        return y
+    y = np.empty(x.shape)
+    prev = y_prev
+    for i in range(x.shape[-1]):
+        prev = gain * x[..., i] + decay * prev
+        y[..., i] = prev
+    return y
+
+
+# ============================================================
+# 2. 이동 평균 / 분산 (누적합)
+# ============================================================
+
+def _window_sums(x: np.ndarray, n: int, anchor: float, squares: bool = True):
+    """
+    길이 n 창의 (x - anchor) 합, 제곱합(squares=False면 None), NaN 개수를 누적합 차분으로 구한다.
+    결과 배열은 창의 끝 위치 기준(길이 len(x) - n + 1).
+    anchor를 빼 두면 가격 수준이 커도 제곱합의 자릿수 손실이 줄어든다.
+    """
+    nan = np.isnan(x)
+    d = np.where(nan, 0.0, x - anchor)
+
+    def window(v: np.ndarray) -> np.ndarray:
+        c = np.cumsum(v, axis=-1)
+        c = np.concatenate((np.zeros(c.shape[:-1] + (1,), dtype=c.dtype), c), axis=-1)
+        return c[..., n:] - c[..., :-n]
+
+    return window(d), (window(d * d) if squares else None), window(nan.astype(np.int64))
+
+
+def _first_values(x: np.ndarray) -> np.ndarray:
+    """행마다 첫 번째 유효값 (없으면 0). 시간축은 길이 1로 남긴다."""
+    first = np.take_along_axis(x, np.argmax(~np.isnan(x), axis=-1)[..., None], axis=-1)
+    return np.where(np.isnan(first), 0.0, first)
+
+
+def _rolling_moments(x: np.ndarray, n: int, ddof: Optional[int]):
+    """(이동 평균, 이동 분산). ddof=None이면 분산은 계산하지 않는다."""
+    mean, var = _nan_like(x), None
+    if x.shape[-1] < n:
+        return mean, (_nan_like(x) if ddof is not None else None)
+    anchor = _first_values(x)
+    s1, s2, cnt = _window_sums(x, n, anchor, squares=ddof is not None)
+    full = cnt == 0
+
+    m = s1 / n
+    mean[..., n - 1:] = np.where(full, m + anchor, np.nan)
+    if ddof is not None:
+        var = _nan_like(x)
+        v = np.maximum(s2 - s1 * m, 0.0) / (n - ddof)
+        var[..., n - 1:] = np.where(full, v, np.nan)
+    return mean, var
+
+
+def sma(x, n: int) -> np.ndarray:
+    return _rolling_moments(_as_float(x), n, None)[0]
+
+
+def rolling_std(x, n: int, ddof: int = 1) -> np.ndarray:
+    return np.sqrt(_rolling_moments(_as_float(x), n, ddof)[1])
+
+
+def _sma_from_first_valid(x: np.ndarray, n: int) -> np.ndarray:
+    """pandas-ta의 ma('sma', s.loc[s.first_valid_index():]) 와 같은 값."""
+    out = _nan_like(x)
+    fv = _first_valid(x)
+    if fv < x.shape[-1]:
+        out[..., fv:] = sma(x[..., fv:], n)
+    return out
+
+
+def _rolling_extreme(x: np.ndarray, n: int, op) -> np.ndarray:
+    """
+    창 길이 n의 이동 최고/최저. 창 안의 값을 n-1번 밀어 가며 op(np.maximum 등)로 접는다.
+    (n이 작은 지표 창에서는 sliding_window_view(...).max() 보다 연속 메모리라 빠르다.
+     창 안에 NaN이 있으면 NaN)
+    """
+    x = _as_float(x)
+    out = _nan_like(x)
+    t = x.shape[-1]
+    if t >= n:
+        acc = x[..., n - 1:].copy()
+        for k in range(1, n):
+            op(acc, x[..., n - 1 - k:t - k], out=acc)
+        out[..., n - 1:] = acc
+    return out
+
+
+def rolling_max(x, n: int) -> np.ndarray:
+    return _rolling_extreme(x, n, np.maximum)
+
+
+def rolling_min(x, n: int) -> np.ndarray:
+    return _rolling_extreme(x, n, np.minimum)
+
+
+# ============================================================
+# 3. 재귀 필터 (EMA / RMA)
+# ============================================================
+
+def ema(x, n: int) -> np.ndarray:
+    """
+    pandas-ta ema (sma=True, adjust=False):
+    첫 n개 평균을 시작값으로 두고 alpha = 2 / (n + 1) 로 재귀.
+    """
+    x = _as_float(x)
+    out = _nan_like(x)
+    fv = _first_valid(x)
+    start = fv + n - 1
+    if start >= x.shape[-1]:
+        return out
+    alpha = 2.0 / (n + 1.0)
+    out[..., start] = x[..., fv:start + 1].mean(axis=-1)
+    out[..., start + 1:] = _iir1(x[..., start + 1:], alpha, 1.0 - alpha, out[..., start])
+    return out
+
+
+def _ewm_adjusted(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """pandas ewm(alpha, adjust=True, min_periods).mean(), 앞쪽 NaN 건너뜀."""
+    out = _nan_like(x)
+    fv = _first_valid(x)
+    if fv + min_periods - 1 >= x.shape[-1]:
+        return out
+    decay = 1.0 - alpha
+    seg = x[..., fv:]
+    num = _iir1(seg, 1.0, decay, np.zeros(seg.shape[:-1]))
+    den = (1.0 - decay ** np.arange(1, seg.shape[-1] + 1)) / alpha
+    out[..., fv:] = num / den
+    out[..., fv:fv + min_periods - 1] = np.nan
+    return out
+
+
+def _ewm_unadjusted(x: np.ndarray, alpha: float, start: Optional[int] = None) -> np.ndarray:
+    """pandas ewm(alpha, adjust=False).mean(). start 위치의 값을 시작값으로 쓴다."""
+    out = _nan_like(x)
+    if start is None:
+        start = _first_valid(x)
+    if start >= x.shape[-1]:
+        return out
+    out[..., start] = x[..., start]
+    out[..., start + 1:] = _iir1(x[..., start + 1:], alpha, 1.0 - alpha, x[..., start])
+    return out
+
+
+def rma(x, n: int, ta_version: str = PANDAS_TA_04) -> np.ndarray:
+    """Wilder 이동 평균 (alpha = 1 / n)."""
+    x = _as_float(x)
+    if ta_version == PANDAS_TA_03:
+        return _ewm_adjusted(x, 1.0 / n, n)
+    return _ewm_unadjusted(x, 1.0 / n)
+
+
+# ============================================================
+# 4. 지표
+# ============================================================
+
+def rsi(close, n: int = 14, ta_version: str = PANDAS_TA_04) -> np.ndarray:
+    close = _as_float(close)
+    diff = close - _prepend_nan(close)
+    up = np.where(diff < 0, 0.0, diff)
+    down = np.where(diff > 0, 0.0, diff)
+    up_avg = rma(up, n, ta_version)
+    down_avg = np.abs(rma(down, n, ta_version))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 * up_avg / (up_avg + down_avg)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9,
+         fast_ema: Optional[np.ndarray] = None, slow_ema: Optional[np.ndarray] = None):
+    """(macd, signal, hist). 이미 계산한 EMA가 있으면 넘겨서 재사용."""
+    close = _as_float(close)
+    fast_ema = ema(close, fast) if fast_ema is None else fast_ema
+    slow_ema = ema(close, slow) if slow_ema is None else slow_ema
+    line = fast_ema - slow_ema
+    sig = _nan_like(close)
+    fv = _first_valid(line)
+    if fv < line.shape[-1]:
+        sig[..., fv:] = ema(line[..., fv:], signal)
+    return line, sig, line - sig
+
+
+def stoch(high, low, close, k: int = 14, d: int = 3, smooth_k: int = 3):
+    """(%K, %D)"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    lowest = rolling_min(low, k)
+    highest = rolling_max(high, k)
+    raw = 100.0 * (close - lowest) / non_zero_range(highest, lowest)
+    stoch_k = _sma_from_first_valid(raw, smooth_k)
+    stoch_d = _sma_from_first_valid(stoch_k, d)
+    return stoch_k, stoch_d
+
+
+def true_range(high, low, close, ta_version: str = PANDAS_TA_04) -> np.ndarray:
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev = _prepend_nan(close)
+    ranges = np.abs(np.stack([non_zero_range(high, low), high - prev, prev - low]))
+    # pandas max(axis=1)처럼 NaN은 건너뛴다 (첫 행은 high - low)
+    tr = np.fmax(np.fmax(ranges[0], ranges[1]), ranges[2])
+    if ta_version == PANDAS_TA_03 and tr.shape[-1]:
+        tr[..., 0] = np.nan
+    return tr
+
+
+def atr(high, low, close, n: int = 14, ta_version: str = PANDAS_TA_04) -> np.ndarray:
+    tr = true_range(high, low, close, ta_version)
+    if ta_version == PANDAS_TA_03:
+        return _ewm_adjusted(tr, 1.0 / n, n)
+    # 0.4: 첫 n개 TR의 평균을 시작값으로 하는 RMA
+    out = _nan_like(tr)
+    if tr.shape[-1] < n:
+        return out
+    seeded = tr.copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        head = tr[..., :n]
+        seeded[..., n - 1] = np.nansum(head, axis=-1) / (~np.isnan(head)).sum(axis=-1)
+    out[..., n - 1:] = _ewm_unadjusted(seeded[..., n - 1:], 1.0 / n, 0)
+    return out
+
+
+def bbands(close, n: int = 20, std: float = 2.0, ta_version: str = PANDAS_TA_04,
+           moments=None):
+    """
+    (lower, mid, upper, bandwidth, percent)
+    bandwidth = 100 * (upper - lower) / mid,  percent = (close - lower) / (upper - lower)
+    """
+    close = _as_float(close)
+    ddof = 0 if ta_version == PANDAS_TA_03 else 1
+    mid, var = _rolling_moments(close, n, ddof) if moments is None else moments
+    dev = std * np.sqrt(var)
+    lower = mid - dev
+    upper = mid + dev
+    width = non_zero_range(upper, lower)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bandwidth = 100.0 * width / mid
+        percent = non_zero_range(close, lower) / width
+    return lower, mid, upper, bandwidth, percent
+
+
+# ============================================================
+# 5. 한 번에 계산
+# ============================================================
+
+def compute_indicators(high, low, close, ta_version: str = PANDAS_TA_04,
+                       volume=None) -> Dict[str, np.ndarray]:
+    """
+    a2c / marl 에서 쓰는 지표를 한 번에 계산해서 {이름: float64 배열} 로 반환.
+    (EMA12, EMA26, MACD, MACD_Signal, MACD_Hist, SMA20, RSI, STOCH_K, STOCH_D,
+     ATR, BB_Lower, BB_Mid, BB_Upper, BB_BW, BB_%B, volume이 있으면 Volume_MA20)
+    """
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    out: Dict[str, np.ndarray] = {}
+
+    out["EMA12"] = ema(close, 12)
+    out["EMA26"] = ema(close, 26)
+    out["MACD"], out["MACD_Signal"], out["MACD_Hist"] = macd(
+        close, 12, 26, 9, fast_ema=out["EMA12"], slow_ema=out["EMA26"])
+
+    # SMA20과 볼린저 분산을 같은 누적합으로 계산
+    ddof = 0 if ta_version == PANDAS_TA_03 else 1
+    moments = _rolling_moments(close, 20, ddof)
+    out["SMA20"] = moments[0]
+    (out["BB_Lower"], out["BB_Mid"], out["BB_Upper"],
+     out["BB_BW"], out["BB_%B"]) = bbands(close, 20, 2.0, ta_version, moments=moments)
+
+    out["RSI"] = rsi(close, 14, ta_version)
+    out["STOCH_K"], out["STOCH_D"] = stoch(high, low, close, 14, 3, 3)
+    out["ATR"] = atr(high, low, close, 14, ta_version)
+    if volume is not None:
+        out["Volume_MA20"] = sma(volume, 20)
+    return out
+
+
+# ============================================================
+# 6. 여러 종목 패널 (종목 x 시간)
+# ============================================================
+# 종목마다 상장일이 달라 앞쪽 NaN(워밍업 전 구간) 길이가 다르다.
+# 각 행을 첫 유효값이 0번 열에 오도록 왼쪽으로 당겨서(align) 모든 행의
+# 워밍업 위치를 같게 만든 뒤 한 번에 계산하고, 결과를 원래 위치로 되돌린다.
+# → 행마다 compute_indicators(그 종목의 상장 이후 구간)를 부른 것과 같은 값.
+# 종목별 compute_indicators도 시간 축은 이미 벡터화되어 있어서, 이득은 NumPy 호출 횟수가
+# 블록 수만큼으로 줄어드는 부분이다. (200종목 x 15년 기준 종목별 반복 대비 약 1.2~1.5배)
+
+def first_valid_index(*arrays: np.ndarray) -> np.ndarray:
+    """행마다 모든 입력이 유효한 첫 열. 유효한 값이 없는 행은 열 개수."""
+    valid = np.logical_and.reduce([~np.isnan(a) for a in arrays])
+    return np.where(valid.any(axis=-1), np.argmax(valid, axis=-1), valid.shape[-1])
+
+
+def _shift_rows(x: np.ndarray, shift: np.ndarray) -> np.ndarray:
+    """
+    out[r, t] = x[r, t + shift[r]]. 범위를 벗어난 칸은 NaN.
+    shift가 0이 아닌 행만 양쪽을 NaN으로 채운 버퍼의 창 view에서 행별 오프셋으로 한 번에 gather.
+    """
+    rows = np.flatnonzero(shift)
+    if rows.size == 0:
+        return x
+    t = x.shape[-1]
+    pad = np.full((rows.size, 3 * t), np.nan)
+    pad[:, t:2 * t] = x[rows]
+    out = x.copy()
+    out[rows] = sliding_window_view(pad, t, axis=-1)[np.arange(rows.size), t + np.clip(shift[rows], -t, t)]
+    return out
+
+
+# 한 번에 계산할 칸 수(행 x 열). 중간 배열들이 CPU 캐시 안에 머물 만큼씩 나눠서 계산.
+PANEL_BLOCK_CELLS = 1 << 16
+
+
+def compute_indicator_panel(high, low, close, ta_version: str = PANDAS_TA_04,
+                            volume=None) -> Dict[str, np.ndarray]:
+    """
+    (종목 x 시간) 2차원 가격 패널로 compute_indicators와 같은 지표를 한 번에 계산.
+    반환: {이름: (종목 x 시간) float64 배열}
+
+    - 행마다 high/low/close가 모두 유효해지는 첫 열부터 워밍업을 센다.
+      (상장 전 / 데이터가 없는 구간은 NaN으로 두면 된다)
+    - 중간에 빠진 날(거래 정지 등)은 넘기기 전에 채워 둔다.
+      (NaN이 있으면 1차원과 같이 EMA/RMA 계열은 그 뒤가 모두 NaN)
+    """
+    high, low, close = (np.atleast_2d(_as_float(a)) for a in (high, low, close))
+    if not (high.shape == low.shape == close.shape):
+        raise ValueError(f"high/low/close 모양이 다릅니다: {high.shape}, {low.shape}, {close.shape}")
+
+    vol = None
+    if volume is not None:
+        vol = np.atleast_2d(_as_float(volume))
+        if vol.shape != close.shape:
+            raise ValueError(f"volume 모양이 close와 다릅니다: {vol.shape} != {close.shape}")
+
+    start = first_valid_index(high, low, close)
+    rows, cols = close.shape
+    step = max(1, PANEL_BLOCK_CELLS // max(cols, 1))
+    # 상장 위치 순으로 정렬해서 블록을 나눈다 → 블록 공통의 앞쪽 NaN 열은 잘라내고 계산
+    order = np.argsort(start, kind="stable")
+    out: Dict[str, np.ndarray] = {}
+    for r0 in range(0, rows, step):
+        idx = order[r0:r0 + step]
+        lo = min(int(start[idx[0]]), cols - 1)
+        shift = start[idx] - lo
+        aligned = [_shift_rows(a[idx, lo:], shift) for a in (high, low, close)]
+        v = _shift_rows(vol[idx, lo:], shift) if vol is not None else None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            res = compute_indicators(*aligned, ta_version=ta_version, volume=v)
+        for k, arr in res.items():
+            if k not in out:
+                out[k] = np.full((rows, cols), np.nan)
+            out[k][idx, lo:] = _shift_rows(arr, -shift)
+    return out
+
+
+# ============================================================
+# 7. 스트리밍 상태 (새 봉 하나씩 O(1) 갱신)
+# ============================================================
+# 같은 입력을 처음부터 넣으면 위의 배열 함수와 같은 값이 나온다.
+# (non_zero_range의 epsilon은 0이 나온 그 자리에만 더하므로 ~1e-16 차이가 날 수 있음)
+
+_NAN = float("nan")
+
+
+def _isnan(x: float) -> bool:
+    return x != x
+
+
+class _StreamState:
+    """to_dict() / from_dict() 공통 구현. _params는 생성자 인자 이름."""
+
+    _params: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for key, value in vars(self).items():
+            if isinstance(value, _StreamState):
+                value = value.to_dict()
+            elif isinstance(value, deque):
+                value = [float(v) for v in value]
+            elif isinstance(value, (float, np.floating)):
+                value = float(value)
+            out[key] = value
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        obj = cls(**{k: data[k] for k in cls._params})
+        obj._load(data)
+        return obj
+
+    def _load(self, data: Dict[str, Any]) -> None:
+        for key, current in list(vars(self).items()):
+            if key not in data:
+                continue
+            if isinstance(current, _StreamState):
+                current._load(data[key])
+            elif isinstance(current, deque):
+                current.clear()
+                current.extend(float(v) for v in data[key])
+            elif isinstance(current, float):
+                setattr(self, key, _NAN if data[key] is None else float(data[key]))
+            else:
+                setattr(self, key, data[key])
+
+
+class WindowState(_StreamState):
+    """길이 n 이동 창. 평균/분산/최소/최대 (창 길이가 고정이므로 봉마다 O(1))."""
+
+    _params = ("n",)
+
+    def __init__(self, n: int):
+        self.n = n
+        self.values = deque(maxlen=n)
+
+    def push(self, x: float) -> None:
+        self.values.append(float(x))
+
+    def ready(self) -> bool:
+        return len(self.values) == self.n and not any(_isnan(v) for v in self.values)
+
+    def mean(self) -> float:
+        return math.fsum(self.values) / self.n if self.ready() else _NAN
+
+    def var(self, ddof: int) -> float:
+        if not self.ready():
+            return _NAN
+        m = math.fsum(self.values) / self.n
+        return math.fsum((v - m) ** 2 for v in self.values) / (self.n - ddof)
+
+    def min(self) -> float:
+        return min(self.values) if self.ready() else _NAN
+
+    def max(self) -> float:
+        return max(self.values) if self.ready() else _NAN
+
+
+class SMAState(_StreamState):
+    """이동 평균. skip_leading=True면 첫 유효값 전의 NaN은 창에 넣지 않는다."""
+
+    _params = ("n", "skip_leading")
+
+    def __init__(self, n: int, skip_leading: bool = False):
+        self.n = n
+        self.skip_leading = skip_leading
+        self.started = False
+        self.window = WindowState(n)
+
+    def update(self, x: float) -> float:
+        if self.skip_leading and not self.started and _isnan(x):
+            return _NAN
+        self.started = True
+        self.window.push(x)
+        return self.window.mean()
+
+
+class EMAState(_StreamState):
+    """ema(): 첫 n개 평균으로 시작, alpha = 2 / (n + 1)"""
+
+    _params = ("n",)
+
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.total = 0.0
+        self.value = _NAN
+
+    def update(self, x: float) -> float:
+        if self.count == 0 and _isnan(x):
+            return _NAN
+        if self.count < self.n:
+            self.count += 1
+            self.total += x
+            if self.count == self.n:
+                self.value = self.total / self.n
+            return self.value
+        alpha = 2.0 / (self.n + 1.0)
+        self.value = alpha * x + (1.0 - alpha) * self.value
+        return self.value
+
+
+class RMAState(_StreamState):
+    """rma(): Wilder 평균 (alpha = 1 / n). ta_version에 따라 adjust 방식이 다르다."""
+
+    _params = ("n", "ta_version")
+
+    def __init__(self, n: int, ta_version: str = PANDAS_TA_04):
+        self.n = n
+        self.ta_version = ta_version
+        self.count = 0
+        self.num = 0.0
+        self.den = 0.0
+        self.value = _NAN
+
+    def update(self, x: float) -> float:
+        if self.count == 0 and _isnan(x):
+            return _NAN
+        decay = 1.0 - 1.0 / self.n
+        self.count += 1
+        if self.ta_version == PANDAS_TA_03:
+            # ewm(adjust=True, min_periods=n): 가중합 / 가중치합
+            self.num = x + decay * self.num
+            self.den = 1.0 + decay * self.den
+            return self.num / self.den if self.count >= self.n else _NAN
+        self.value = x if self.count == 1 else (1.0 - decay) * x + decay * self.value
+        return self.value
+
+
+class MACDState(_StreamState):
+    _params = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.fast_ema = EMAState(fast)
+        self.slow_ema = EMAState(slow)
+        self.signal_ema = EMAState(signal)
+
+    def update(self, close: float) -> Tuple[float, float, float, float, float]:
+        """(fast EMA, slow EMA, macd, signal, hist)"""
+        f = self.fast_ema.update(close)
+        s = self.slow_ema.update(close)
+        line = f - s
+        sig = self.signal_ema.update(line)
+        return f, s, line, sig, line - sig
+
+
+class RSIState(_StreamState):
+    _params = ("n", "ta_version")
+
+    def __init__(self, n: int = 14, ta_version: str = PANDAS_TA_04):
+        self.n = n
+        self.ta_version = ta_version
+        self.prev_close = _NAN
+        self.up = RMAState(n, ta_version)
+        self.down = RMAState(n, ta_version)
+
+    def update(self, close: float) -> float:
+        diff = close - self.prev_close
+        self.prev_close = float(close)
+        up = self.up.update(diff if _isnan(diff) else max(diff, 0.0))
+        down = abs(self.down.update(diff if _isnan(diff) else min(diff, 0.0)))
+        if _isnan(up) or _isnan(down) or up + down == 0:
+            return _NAN
+        return 100.0 * up / (up + down)
+
+
+class ATRState(_StreamState):
+    _params = ("n", "ta_version")
+
+    def __init__(self, n: int = 14, ta_version: str = PANDAS_TA_04):
+        self.n = n
+        self.ta_version = ta_version
+        self.prev_close = _NAN
+        self.seed = WindowState(n)    # 0.4: 첫 n개 TR
+        self.rma = RMAState(n, ta_version)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        hl = high - low
+        if hl == 0:
+            hl = _EPS
+        pc = self.prev_close
+        self.prev_close = float(close)
+        if _isnan(pc):
+            # 첫 봉: 0.3은 TR 없음, 0.4는 high - low
+            tr = _NAN if self.ta_version == PANDAS_TA_03 else abs(hl)
+        else:
+            tr = max(abs(hl), abs(high - pc), abs(pc - low))
+
+        if self.ta_version == PANDAS_TA_03:
+            return self.rma.update(tr)
+        # 0.4: 첫 n개 TR의 평균을 시작값으로
+        if self.rma.count == 0:
+            self.seed.push(tr)
+            if len(self.seed.values) < self.n:
+                return _NAN
+            tr = math.fsum(v for v in self.seed.values if not _isnan(v)) / sum(
+                1 for v in self.seed.values if not _isnan(v))
+        return self.rma.update(tr)
+
+
+class StochState(_StreamState):
+    _params = ("k", "d", "smooth_k")
+
+    def __init__(self, k: int = 14, d: int = 3, smooth_k: int = 3):
+        self.k = k
+        self.d = d
+        self.smooth_k = smooth_k
+        self.highs = WindowState(k)
+        self.lows = WindowState(k)
+        self.k_sma = SMAState(smooth_k, skip_leading=True)
+        self.d_sma = SMAState(d, skip_leading=True)
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float]:
+        self.highs.push(high)
+        self.lows.push(low)
+        lowest, highest = self.lows.min(), self.highs.max()
+        rng = highest - lowest
+        raw = 100.0 * (close - lowest) / (rng if rng != 0 else _EPS)
+        k = self.k_sma.update(raw)
+        return k, self.d_sma.update(k)
+
+
+class BBandsState(_StreamState):
+    _params = ("n", "std", "ta_version")
+
+    def __init__(self, n: int = 20, std: float = 2.0, ta_version: str = PANDAS_TA_04):
+        self.n = n
+        self.std = std
+        self.ta_version = ta_version
+        self.window = WindowState(n)
+
+    def update(self, close: float) -> Tuple[float, float, float, float, float]:
+        """(lower, mid, upper, bandwidth, percent)"""
+        self.window.push(close)
+        mid = self.window.mean()
+        if _isnan(mid):
+            return _NAN, _NAN, _NAN, _NAN, _NAN
+        dev = self.std * math.sqrt(self.window.var(0 if self.ta_version == PANDAS_TA_03 else 1))
+        lower, upper = mid - dev, mid + dev
+        width = (upper - lower) or _EPS
+        pos = (close - lower) or _EPS
+        return lower, mid, upper, (100.0 * width / mid if mid != 0 else _NAN), pos / width
+
+
+class IndicatorState(_StreamState):
+    """
+    compute_indicators()를 봉 하나씩 갱신하는 버전.
+
+        state = IndicatorState.from_arrays(high, low, close, volume, ta_version="0.3")
+        row = state.update(h, l, c, v)      # {지표 이름: float}
+        saved = state.to_dict()             # JSON으로 저장 가능
+        state = IndicatorState.from_dict(saved)
+    """
+
+    _params = ("ta_version",)
+
+    def __init__(self, ta_version: str = PANDAS_TA_04):
+        self.ta_version = ta_version
+        self.count = 0
+        self.macd = MACDState(12, 26, 9)
+        self.sma20 = SMAState(20)
+        self.rsi = RSIState(14, ta_version)
+        self.stoch = StochState(14, 3, 3)
+        self.atr = ATRState(14, ta_version)
+        self.bbands = BBandsState(20, 2.0, ta_version)
+        self.volume_ma = SMAState(20)
+
+    def update(self, high: float, low: float, close: float, volume: Optional[float] = None) -> Dict[str, float]:
+        high, low, close = float(high), float(low), float(close)
+        out: Dict[str, float] = {}
+        (out["EMA12"], out["EMA26"], out["MACD"],
+         out["MACD_Signal"], out["MACD_Hist"]) = self.macd.update(close)
+        out["SMA20"] = self.sma20.update(close)
+        (out["BB_Lower"], out["BB_Mid"], out["BB_Upper"],
+         out["BB_BW"], out["BB_%B"]) = self.bbands.update(close)
+        out["RSI"] = self.rsi.update(close)
+        out["STOCH_K"], out["STOCH_D"] = self.stoch.update(high, low, close)
+        out["ATR"] = self.atr.update(high, low, close)
+        if volume is not None:
+            out["Volume_MA20"] = self.volume_ma.update(float(volume))
+        self.count += 1
+        return out
+
+    @classmethod
+    def from_arrays(cls, high, low, close, volume=None, ta_version: str = PANDAS_TA_04) -> "IndicatorState":
+        """지난 히스토리를 한 번 흘려 넣어서 상태를 만든다. (이후로는 update만)"""
+        state = cls(ta_version)
+        high, low, close = _as_float(high), _as_float(low), _as_float(close)
+        vol = _as_float(volume) if volume is not None else None
+        for i in range(len(close)):
+            state.update(high[i], low[i], close[i], None if vol is None else vol[i])
+        return state
@@ -0,0 +1,261 @@
+# rolling_stats.py
+"""
+보상 계산용 이동 통계 (최근 window개 값, 새 값 하나당 O(1)).
+
+- 길이 window의 링 버퍼 + 누적합(합, 제곱합, 곱의 합, 음수 값들의 합/제곱합/개수)
+  → 평균, 분산, 표준편차, 공분산, 베타, 하방 편차를 창을 다시 훑지 않고 계산.
+- 창이 다 차기 전에는 지금까지 들어온 값들로 계산한다. (np.std(deque)와 같음)
+- 빼고 더하기를 반복하면 오차가 쌓이므로 window번 넣을 때마다 버퍼에서 합을 다시 구한다.
+  (분할 상환 O(1))
+
+RollingStatsBatch는 같은 통계를 환경 N개에 대해 배열로 한꺼번에 계산한다. (벡터 환경용)
+
+TradingEnv(a2c 합성 보상)와 MARLStockEnv(marl_4agent 샤프형 보상)에서 사용.
+(a2c_11.29 / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class RollingStats:
+    """
+    x(와 선택적으로 y)의 최근 window개 값에 대한 이동 통계.
+        stats = RollingStats(63)
+        stats.push(port_ret, mkt_ret)
+        if stats.full:
+            stats.mean(), stats.downside_std(ddof=1), stats.cov(ddof=1), stats.var_y(ddof=1)
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError(f"window는 1 이상이어야 합니다: {window}")
+        self.window = window
+        self.clear()
+
+    def clear(self) -> None:
+        self._x = [0.0] * self.window
+        self._y = [0.0] * self.window
+        self._pos = 0
+        self.count = 0
+        self._since_sync = 0
+        self._sx = self._sxx = 0.0
+        self._sy = self._syy = self._sxy = 0.0
+        self._n_neg = 0
+        self._s_neg = self._s_neg2 = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.window
+
+    # ---------- 갱신 ----------
+    def push(self, x: float, y: float = 0.0) -> None:
+        x, y = float(x), float(y)
+        if self.count == self.window:
+            ox, oy = self._x[self._pos], self._y[self._pos]
+            self._sx -= ox
+            self._sxx -= ox * ox
+            self._sy -= oy
+            self._syy -= oy * oy
+            self._sxy -= ox * oy
+            if ox < 0.0:
+                self._n_neg -= 1
+                self._s_neg -= ox
+                self._s_neg2 -= ox * ox
+        else:
+            self.count += 1
+
+        self._x[self._pos], self._y[self._pos] = x, y
+        self._pos = (self._pos + 1) % self.window
+        self._sx += x
+        self._sxx += x * x
+        self._sy += y
+        self._syy += y * y
+        self._sxy += x * y
+        if x < 0.0:
+            self._n_neg += 1
+            self._s_neg += x
+            self._s_neg2 += x * x
+
+        self._since_sync += 1
+        if self._since_sync >= self.window:
+            self._resync()
+
+    def _resync(self) -> None:
+        """버퍼 내용으로 누적합을 다시 구한다. (누적 반올림 오차 제거)"""
+        xs = self._x if self.full else self._x[:self.count]
+        ys = self._y if self.full else self._y[:self.count]
+        self._sx = sum(xs)
+        self._sxx = sum(v * v for v in xs)
+        self._sy = sum(ys)
+        self._syy = sum(v * v for v in ys)
+        self._sxy = sum(a * b for a, b in zip(xs, ys))
+        neg = [v for v in xs if v < 0.0]
+        self._n_neg = len(neg)
+        self._s_neg = sum(neg)
+        self._s_neg2 = sum(v * v for v in neg)
+        self._since_sync = 0
+
+    # ---------- 통계 ----------
+    @staticmethod
+    def _var(s: float, ss: float, n: int, ddof: int) -> float:
+        if n - ddof <= 0:
+            return 0.0
+        return max(ss - s * s / n, 0.0) / (n - ddof)
+
+    def mean(self) -> float:
+        return self._sx / self.count if self.count else 0.0
+
+    def mean_y(self) -> float:
+        return self._sy / self.count if self.count else 0.0
+
+    def var(self, ddof: int = 0) -> float:
+        return self._var(self._sx, self._sxx, self.count, ddof)
+
+    def var_y(self, ddof: int = 0) -> float:
+        return self._var(self._sy, self._syy, self.count, ddof)
+
+    def std(self, ddof: int = 0) -> float:
+        return self.var(ddof) ** 0.5
+
+    def cov(self, ddof: int = 1) -> float:
+        """x, y 공분산 (np.cov 기본값과 같은 ddof=1)"""
+        n = self.count
+        if n - ddof <= 0:
+            return 0.0
+        return (self._sxy - self._sx * self._sy / n) / (n - ddof)
+
+    def beta(self, ddof: int = 1, eps: float = 0.0) -> Optional[float]:
+        """cov(x, y) / var(y). y 분산이 0이면 None"""
+        var_y = self.var_y(ddof)
+        if var_y <= 0.0:
+            return None
+        return self.cov(ddof) / (var_y + eps)
+
+    @property
+    def downside_count(self) -> int:
+        """창 안에서 x < 0 인 값의 개수"""
+        return self._n_neg
+
+    def downside_std(self, ddof: int = 1) -> float:
+        """x < 0 인 값들만의 표준편차 (그런 값이 ddof개 이하면 0)"""
+        return self._var(self._s_neg, self._s_neg2, self._n_neg, ddof) ** 0.5
+
+
+# ============================================================
+# 환경 N개용 (배열)
+# ============================================================
+
+class RollingStatsBatch:
+    """
+    RollingStats N개를 (N, window) 배열 하나로 묶은 것. 행마다 독립적으로 clear할 수 있다.
+        stats = RollingStatsBatch(num_envs, 63)
+        stats.push(port_rets, mkt_rets)     # (N,) 배열
+        stats.mean(), stats.beta(ddof=1)     # (N,) 배열
+    통계 정의(ddof, 값이 모자랄 때 0)는 RollingStats와 같다. beta는 y 분산이 0인 행에서 fill.
+    """
+
+    def __init__(self, n: int, window: int):
+        if window < 1:
+            raise ValueError(f"window는 1 이상이어야 합니다: {window}")
+        self.n = n
+        self.window = window
+        self._x = np.zeros((n, window))
+        self._y = np.zeros((n, window))
+        self._pos = np.zeros(n, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self._since_sync = np.zeros(n, dtype=np.int64)
+        self._sums = np.zeros((8, n))   # sx, sxx, sy, syy, sxy, n_neg, s_neg, s_neg2
+        self._rows = np.arange(n)
+
+    def clear(self, mask: Optional[np.ndarray] = None) -> None:
+        """mask(bool (N,))가 True인 행만 비운다. None이면 전부."""
+        rows = self._rows if mask is None else self._rows[mask]
+        self._x[rows] = 0.0
+        self._y[rows] = 0.0
+        self._pos[rows] = 0
+        self.count[rows] = 0
+        self._since_sync[rows] = 0
+        self._sums[:, rows] = 0.0
+
+    @property
+    def full(self) -> np.ndarray:
+        return self.count == self.window
+
+    # ---------- 갱신 ----------
+    def push(self, x: np.ndarray, y: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None) -> None:
+        """행마다 값 하나씩 넣는다. mask가 주어지면 True인 행만."""
+        rows = self._rows if mask is None else self._rows[mask]
+        x = np.asarray(x, dtype=np.float64)
+        y = np.zeros_like(x) if y is None else np.asarray(y, dtype=np.float64)
+        if mask is not None:
+            x, y = x[mask], y[mask]
+        pos = self._pos[rows]
+
+        # 창이 찬 행은 가장 오래된 값을 뺀다 (안 찬 행의 빈 칸은 0이라 빼도 그대로)
+        delta = self._moments(x, y) - self._moments(self._x[rows, pos], self._y[rows, pos])
+        if mask is None:
+            self._sums += delta
+        else:
+            self._sums[:, rows] += delta
+
+        self._x[rows, pos], self._y[rows, pos] = x, y
+        self._pos[rows] = (pos + 1) % self.window
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.window)
+        self._since_sync[rows] += 1
+        stale = rows[self._since_sync[rows] >= self.window]
+        if len(stale):
+            self._resync(stale)
+
+    @staticmethod
+    def _moments(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """_sums 순서대로 값별 기여분 (8, ...)"""
+        neg = np.minimum(x, 0.0)
+        return np.stack([x, x * x, y, y * y, x * y, (x < 0.0).astype(np.float64), neg, neg * neg])
+
+    def _resync(self, rows: np.ndarray) -> None:
+        """해당 행의 누적합을 버퍼 내용으로 다시 구한다. (빈 칸은 0이므로 그대로 더해도 된다)"""
+        self._sums[:, rows] = self._moments(self._x[rows], self._y[rows]).sum(axis=2)
+        self._since_sync[rows] = 0
+
+    # ---------- 통계 ----------
+    @staticmethod
+    def _var(s: np.ndarray, ss: np.ndarray, n: np.ndarray, ddof: int) -> np.ndarray:
+        dof = n - ddof
+        safe_n = np.maximum(n, 1)
+        var = np.maximum(ss - s * s / safe_n, 0.0) / np.maximum(dof, 1)
+        return np.where(dof > 0, var, 0.0)
+
+    def mean(self) -> np.ndarray:
+        return np.where(self.count > 0, self._sums[0] / np.maximum(self.count, 1), 0.0)
+
+    def mean_y(self) -> np.ndarray:
+        return np.where(self.count > 0, self._sums[2] / np.maximum(self.count, 1), 0.0)
+
+    def var(self, ddof: int = 0) -> np.ndarray:
+        return self._var(self._sums[0], self._sums[1], self.count, ddof)
+
+    def var_y(self, ddof: int = 0) -> np.ndarray:
+        return self._var(self._sums[2], self._sums[3], self.count, ddof)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.var(ddof))
+
+    def cov(self, ddof: int = 1) -> np.ndarray:
+        n = self.count
+        dof = n - ddof
+        cov = (self._sums[4] - self._sums[0] * self._sums[2] / np.maximum(n, 1)) / np.maximum(dof, 1)
+        return np.where(dof > 0, cov, 0.0)
+
+    def beta(self, ddof: int = 1, eps: float = 0.0, fill: float = 0.0) -> np.ndarray:
+        """cov(x, y) / var(y). y 분산이 0인 행은 fill"""
+        var_y = self.var_y(ddof)
+        return np.where(var_y > 0.0, self.cov(ddof) / (var_y + eps), fill)
+
+    @property
+    def downside_count(self) -> np.ndarray:
+        return np.rint(self._sums[5]).astype(np.int64)
+
+    def downside_std(self, ddof: int = 1) -> np.ndarray:
+        return np.sqrt(self._var(self._sums[6], self._sums[7], self.downside_count, ddof))
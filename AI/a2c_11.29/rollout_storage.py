@@ -0,0 +1,108 @@
+# rollout_storage.py
+
+from typing import Optional
+
+import numpy as np
+import torch
+
+
+class RolloutStorage:
+    """
+    A2C 롤아웃을 담는 고정 크기 텐서 저장소. (A2CAgent.init_rollout으로 생성)
+    - 스텝 t의 값은 [t] 자리에 인덱스 쓰기 한 번. 업데이트 때 변환 / 재조립 없음
+        states    (num_steps + 1, N, state_dim) float32   [0]은 reset 관측값, [t + 1]은 t 스텝 후 관측값
+        actions   (num_steps, N) int64
+        rewards / dones / log_probs / values / masks  (num_steps, N) float32
+      → 마지막 states[step]이 부트스트랩 V(s_T)의 입력.
+    - N = 동시에 진행하는 환경 수 (단일 TradingEnv는 1).
+      먼저 끝난 환경의 이후 칸은 masks=0 (학습에서 제외), dones=1 (리턴이 넘어가지 않음)
+    - 용량(num_steps)을 넘겨서 쓰면 ValueError. 에피소드 최대 길이로 만든다.
+    - 멀티프로세스 수집(a2c_workers.RolloutWorkers): share_memory_()로 공유 메모리에 두고
+      워커마다 shard()로 환경 열 구간을 나눠 쓴다. (복사 / 직렬화 없이 학습 프로세스가 그대로 읽음)
+    """
+
+    FIELDS = ("states", "actions", "rewards", "dones", "log_probs", "values", "masks")
+
+    def __init__(self, num_steps: int, num_envs: int, state_dim: int, device: str = "cpu"):
+        self.num_steps = num_steps
+        self.num_envs = num_envs
+        self.device = device
+
+        f32 = dict(dtype=torch.float32, device=device)
+        self.states = torch.zeros(num_steps + 1, num_envs, state_dim, **f32)
+        self.actions = torch.zeros(num_steps, num_envs, dtype=torch.long, device=device)
+        self.rewards = torch.zeros(num_steps, num_envs, **f32)
+        self.dones = torch.zeros(num_steps, num_envs, **f32)
+        self.log_probs = torch.zeros(num_steps, num_envs, **f32)
+        self.values = torch.zeros(num_steps, num_envs, **f32)
+        self.masks = torch.zeros(num_steps, num_envs, **f32)
+        self.step = 0
+
+    def reset(self, states) -> None:
+        """새 롤아웃 시작: 첫 관측값 (N, state_dim) 또는 (state_dim,)"""
+        self.states[0] = torch.as_tensor(states, device=self.device)
+        # 이번에 쓰지 않은 칸(이전 롤아웃의 값)은 학습에서 제외하고 리턴도 넘어오지 않게
+        self.masks.zero_()
+        self.dones.fill_(1.0)
+        self.step = 0
+
+    def insert(
+        self,
+        next_states,
+        actions,
+        rewards,
+        dones,
+        log_probs,
+        values,
+        active: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        한 스텝 (환경 N개) 저장. 각 값은 (N,) 배열/텐서 또는 N=1이면 스칼라.
+        next_states: None이면 환경이 이미 states[t + 1]에 썼다고 본다 (TorchTradingEnv.step(out=...))
+        active: 이번 스텝에 실제로 진행한 환경 (VecTradingEnv info["active"]). None이면 전부
+        """
+        t = self.step
+        if t >= self.num_steps:
+            raise ValueError(f"롤아웃 저장소가 가득 찼습니다 (num_steps={self.num_steps}).")
+
+        if next_states is not None:
+            self.states[t + 1] = torch.as_tensor(next_states, device=self.device)
+        self.actions[t] = torch.as_tensor(actions, device=self.device)
+        self.rewards[t] = torch.as_tensor(rewards, device=self.device)
+        self.log_probs[t] = torch.as_tensor(log_probs, device=self.device)
+        self.values[t] = torch.as_tensor(values, device=self.device)
+        if active is None:
+            self.dones[t] = torch.as_tensor(dones, device=self.device)
+            self.masks[t] = 1.0
+        else:
+            active = torch.as_tensor(active, device=self.device)
+            self.dones[t] = torch.where(active, torch.as_tensor(dones, device=self.device), True)
+            self.masks[t] = active
+        self.step = t + 1
+
+    def share_memory_(self) -> "RolloutStorage":
+        """모든 텐서를 공유 메모리로 (CPU 저장소만). 자식 프로세스에 넘겨도 같은 메모리를 쓴다"""
+        for name in self.FIELDS:
+            getattr(self, name).share_memory_()
+        return self
+
+    def shard(self, start: int, stop: int) -> "RolloutStorage":
+        """
+        환경 열 [start, stop)만 보는 저장소 (메모리를 공유하는 view, step은 따로).
+        워커 하나가 자기 구간에만 쓰고, 학습 쪽은 전체 (T, N) 저장소로 읽는다.
+        """
+        view = object.__new__(RolloutStorage)
+        view.num_steps = self.num_steps
+        view.num_envs = stop - start
+        view.device = self.device
+        for name in self.FIELDS:
+            setattr(view, name, getattr(self, name)[:, start:stop])
+        view.step = 0
+        return view
+
+    def clear(self) -> None:
+        self.step = 0
+
+    def __len__(self) -> int:
+        """저장된 환경-스텝 수 (masks 합)"""
+        return int(self.masks[:self.step].sum().item())
@@ -0,0 +1,6 @@
+# conftest.py
+# 모듈들이 프로젝트 폴더 기준으로 import되므로 (python train_a2c.py 처럼 실행) 같은 경로를 sys.path에
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+# test_data_cache.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_cache
+
+# 2024 추석 연휴 (KRX 휴장, 평일)
+KRX_HOLIDAYS = pd.to_datetime(["2024-09-16", "2024-09-17", "2024-09-18"])
+
+
+class FakeFetch:
+    """평일 봉(휴장일 제외)을 돌려주고 받은 요청 구간을 기록"""
+
+    def __init__(self, holidays=KRX_HOLIDAYS, first=None):
+        self.holidays = holidays
+        self.first = first
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((start, end))
+        idx = pd.bdate_range(start, pd.Timestamp(end) - timedelta(days=1))
+        idx = idx[~idx.isin(self.holidays)]
+        if self.first is not None:
+            idx = idx[idx >= self.first]
+        return pd.DataFrame({"Close": np.arange(len(idx), dtype=float)}, index=idx)
+
+
+def test_holiday_tail_edge_is_not_refetched(tmp_path):
+    fetch = FakeFetch()
+    df = data_cache.load_history("005930.KS", "2024-09-02", "2024-09-18", fetch, str(tmp_path))
+    assert df.index[-1] == pd.Timestamp("2024-09-13")
+
+    again = data_cache.load_history("005930.KS", "2024-09-02", "2024-09-18", fetch, str(tmp_path))
+    assert len(fetch.calls) == 1
+    pd.testing.assert_frame_equal(df, again, check_freq=False)
+
+    # 휴장일 뒤로 늘리면 모자란 tail만
+    data_cache.load_history("005930.KS", "2024-09-02", "2024-09-25", fetch, str(tmp_path))
+    assert fetch.calls[-1] == ("2024-09-18", "2024-09-25")
+    data_cache.load_history("005930.KS", "2024-09-02", "2024-09-25", fetch, str(tmp_path))
+    assert len(fetch.calls) == 2
+
+
+def test_holiday_head_edge_is_not_refetched(tmp_path):
+    fetch = FakeFetch()
+    data_cache.load_history("^KS11", "2024-09-19", "2024-10-01", fetch, str(tmp_path))
+    data_cache.load_history("^KS11", "2024-09-16", "2024-10-01", fetch, str(tmp_path))
+    assert fetch.calls[-1] == ("2024-09-16", "2024-09-19")
+
+    df = data_cache.load_history("^KS11", "2024-09-16", "2024-10-01", fetch, str(tmp_path))
+    assert len(fetch.calls) == 2
+    assert df.index[0] == pd.Timestamp("2024-09-19")
+
+
+def test_range_before_listing_is_cached(tmp_path):
+    fetch = FakeFetch(first=pd.Timestamp("2020-01-02"))
+    data_cache.load_history("NEW", "2020-01-02", "2020-02-01", fetch, str(tmp_path))
+    data_cache.load_history("NEW", "2019-06-01", "2020-02-01", fetch, str(tmp_path))
+    data_cache.load_history("NEW", "2019-06-01", "2020-02-01", fetch, str(tmp_path))
+    assert fetch.calls == [("2020-01-02", "2020-02-01"), ("2019-06-01", "2020-01-02")]
+
+
+def test_open_end_tail_is_rechecked_only_after_ttl(tmp_path, monkeypatch):
+    fetch = FakeFetch(holidays=pd.DatetimeIndex([]))
+    start = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+
+    data_cache.load_history("005930.KS", start, None, fetch, str(tmp_path))
+    data_cache.load_history("005930.KS", start, None, fetch, str(tmp_path))
+    assert len(fetch.calls) == 1
+
+    monkeypatch.setattr(data_cache, "TAIL_RECHECK_MINUTES", 0.0)
+    data_cache.load_history("005930.KS", start, None, fetch, str(tmp_path))
+    assert len(fetch.calls) == 2
+    # 최근 SETTLE_DAYS일은 확정 전이므로 그 앞부터만 다시 받는다
+    assert pd.Timestamp(fetch.calls[-1][0]) >= pd.Timestamp(datetime.now().date()) - timedelta(
+        days=data_cache.SETTLE_DAYS
+    )
+
+
+@pytest.mark.parametrize("end", ["2024-09-18", None])
+def test_empty_first_fetch_writes_nothing(tmp_path, end):
+    def empty(ticker, start, stop):
+        return pd.DataFrame()
+
+    assert data_cache.load_history("NONE", "2024-09-02", end, empty, str(tmp_path)).empty
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,98 @@
+# test_market_data.py
+import types
+
+import pandas as pd
+import pytest
+
+import market_data
+
+
+class PricesMissing(Exception):
+    """yfinance.exceptions.YFPricesMissingError와 같은 생성자 / 속성"""
+
+    def __init__(self, ticker, debug_info):
+        self.debug_info = debug_info
+        super().__init__(f"${ticker}: possibly delisted; no price data found {debug_info}")
+
+
+class FakeTicker:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def history(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        idx = pd.bdate_range(kwargs["start"], pd.Timestamp(kwargs["end"]) - pd.Timedelta(days=1))
+        return pd.DataFrame({c: 1.0 for c in market_data.OHLCV_COLUMNS}, index=idx)
+
+
+@pytest.fixture
+def yf_source(monkeypatch):
+    monkeypatch.setattr(market_data, "YFPricesMissingError", PricesMissing)
+    monkeypatch.setattr(market_data, "_HAS_YFINANCE", True)
+
+    def make(*errors):
+        ticker = FakeTicker(errors)
+        monkeypatch.setattr(market_data, "yf", types.SimpleNamespace(Ticker=lambda t: ticker), raising=False)
+        src = market_data.YFinanceSource(retries=2, backoff=0.0, limiter=market_data.RateLimiter(1e6, 100))
+        return src, ticker
+
+    return make
+
+
+@pytest.mark.parametrize("debug_info", [" (1d 2024-09-16 -> 2024-09-18)", " (period=5d)"])
+def test_prices_missing_for_range_is_empty(yf_source, debug_info):
+    src, ticker = yf_source(PricesMissing("005930.KS", debug_info))
+    df = src.fetch("005930.KS", "2024-09-16", "2024-09-18")
+    assert df.empty and ticker.calls == 1
+
+
+@pytest.mark.parametrize("error", [
+    PricesMissing("005930.KS", ' (1d 2024-09-02 -> 2024-09-06) (Yahoo error = "No data found")'),
+    PricesMissing("005930.KS", " (1d 2024-09-02 -> 2024-09-06)(Yahoo status_code = 500)"),
+    PricesMissing("005930.KS", "upstream changed wording"),
+    RuntimeError("Too Many Requests. Rate limited."),
+])
+def test_unknown_errors_are_retried(yf_source, error):
+    src, ticker = yf_source(error)
+    df = src.fetch("005930.KS", "2024-09-02", "2024-09-07")
+    assert len(df) == 5 and ticker.calls == 2
+
+
+def test_subclass_of_prices_missing_is_not_no_data(monkeypatch):
+    monkeypatch.setattr(market_data, "YFPricesMissingError", PricesMissing)
+
+    class Other(PricesMissing):
+        pass
+
+    assert market_data._is_no_data(PricesMissing("X", " (1d a -> b)"))
+    assert not market_data._is_no_data(Other("X", " (1d a -> b)"))
+
+
+def test_weekend_only_range_skips_network(yf_source):
+    src, ticker = yf_source()
+    assert src.fetch("^KS11", "2024-09-21", "2024-09-23").empty
+    assert ticker.calls == 0
+
+
+def test_synthetic_concurrent_fetch_matches_serial():
+    ends = [f"20{y:02d}-06-01" for y in range(5, 25)]
+    src = market_data.SyntheticSource(seed=7)
+    frames = market_data.fetch_many(
+        [f"T{i}" for i in range(len(ends))],
+        lambda t: src.fetch(t, "2004-01-01", ends[int(t[1:])]),
+        max_workers=8,
+    )
+    for i, end in enumerate(ends):
+        expected = market_data.SyntheticSource(seed=7).fetch(f"T{i}", "2004-01-01", end)
+        pd.testing.assert_frame_equal(frames[f"T{i}"], expected)
+
+
+def test_synthetic_market_factor_returns_copies():
+    src = market_data.SyntheticSource(seed=7)
+    dates = src._dates(pd.Timestamp("2010-01-01"))
+    first = src._market_factor(dates)
+    first["ret"][:] = 0.0
+    assert src._market_factor(dates[:100])["ret"].any()
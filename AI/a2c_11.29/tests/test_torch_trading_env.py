@@ -0,0 +1,98 @@
+# test_torch_trading_env.py
+# torch가 없는 환경에서는 건너뛴다
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from a2c_workers import collect_vec_rollout, make_vec_env  # noqa: E402
+from ac_model import A2CAgent  # noqa: E402
+from data_utils import FEATURES  # noqa: E402
+from torch_trading_env import TorchTradingEnv  # noqa: E402
+from vec_trading_env import VecTradingEnv  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    n = 800
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATURES))), columns=FEATURES,
+                      index=pd.bdate_range("2015-01-01", periods=n))
+    df["Close"] = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, n)))
+    df["KOSPI"] = 2000.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    return df
+
+
+@pytest.mark.parametrize("reward_cfg", [
+    {"use_composite": True, "roll_window": 63},
+    {"use_composite": False},
+    {"use_composite": True, "roll_window": 20, "beta_eps": 0.0},
+])
+def test_step_matches_vec_env(data, reward_cfg):
+    starts = [4, 4, 10, 100, 300, 500, 700, 790]
+    kw = dict(reward_cfg=reward_cfg, starts=starts, episode_len=400)
+    venv = VecTradingEnv(data, 5, len(starts), **kw)
+    tenv = TorchTradingEnv(data, 5, len(starts), **kw)
+    buf = torch.zeros(2, len(starts), tenv.state_dim)
+
+    np.testing.assert_allclose(venv.reset(), tenv.reset(out=buf[0]).numpy(), rtol=0, atol=1e-6)
+    rng = np.random.default_rng(1)
+    while not venv.done.all():
+        a = rng.integers(0, 3, len(starts))
+        s1, r1, d1, i1 = venv.step(a)
+        s2, r2, d2, i2 = tenv.step(torch.as_tensor(a), out=buf[1])
+        assert s2.data_ptr() == buf[1].data_ptr()
+        np.testing.assert_allclose(s1, buf[1].numpy(), rtol=0, atol=1e-6)
+        np.testing.assert_allclose(r1, r2.numpy(), rtol=0, atol=1e-10)
+        np.testing.assert_array_equal(d1, d2.numpy())
+        for k in VecTradingEnv.INFO_KEYS + ("active",):
+            np.testing.assert_allclose(i1[k], i2[k].numpy(), rtol=0, atol=1e-10)
+    assert tenv.done.all()
+    np.testing.assert_allclose(venv.total_reward, tenv.total_reward.numpy(), rtol=0, atol=1e-9)
+
+
+def _collect(data, backend):
+    env = make_vec_env({"data": data, "window_size": 5}, 4, backend,
+                       starts=[4, 50, 100, 300], episode_len=70)
+    agent = A2CAgent(env.current_state_dim(), hidden_dims=[16], seed=0, device="cpu")
+    agent.init_rollout(32, num_envs=4)
+    torch.manual_seed(0)
+
+    stored, dbg, steps = [], {k: 0.0 for k in VecTradingEnv.INFO_KEYS}, 0
+    states = env.reset()
+    while True:
+        states, n = collect_vec_rollout(agent, env, states, dbg)
+        steps += n
+        ro = agent.rollout
+        stored.append({f: getattr(ro, f)[: ro.step + (f == "states")].clone() for f in ro.FIELDS})
+        if bool(env.done.all()):
+            return stored, dbg, steps, float(env.total_reward.mean())
+
+
+def test_rollouts_match_numpy_backend(data, monkeypatch):
+    seen = []
+    step = TorchTradingEnv.step
+
+    def spy(self, actions, out=None):
+        seen.append((type(actions), out))
+        return step(self, actions, out=out)
+
+    monkeypatch.setattr(TorchTradingEnv, "step", spy)
+    a = _collect(data, "numpy")
+    b = _collect(data, "torch")
+
+    # 행동은 텐서 그대로, 다음 관측값은 저장소 자리에 직접
+    assert seen and all(t is torch.Tensor and out is not None for t, out in seen)
+    assert len(a[0]) == len(b[0]) == 3 and a[2] == b[2] == 280
+    for x, y in zip(a[0], b[0]):
+        for f in x:
+            torch.testing.assert_close(x[f], y[f], rtol=0, atol=1e-6)
+    for k in a[1]:
+        assert a[1][k] == pytest.approx(b[1][k], abs=1e-9)
+    assert a[3] == pytest.approx(b[3], abs=1e-9)
+
+
+def test_make_vec_env_rejects_unknown_backend(data):
+    with pytest.raises(ValueError):
+        make_vec_env({"data": data, "window_size": 5}, 2, "jax")
@@ -0,0 +1,257 @@
+# torch_trading_env.py
+
+import numpy as np
+import pandas as pd
+import torch
+from typing import Dict, Any, Optional, Sequence
+
+from trading_env import TradingEnv
+from vec_trading_env import VecTradingEnv
+
+
+class TorchTradingEnv:
+    """
+    VecTradingEnv와 같은 규칙의 환경 N개를 torch 텐서로 진행한다. (모든 상태가 device에 상주)
+    - 스케일된 피처 행렬 / 일별 수익률 / 보상 이동 통계가 device 위의 텐서.
+      관측값은 상주 피처 텐서의 창(unfold view)에서 바로 만든다.
+      → act 때마다 NumPy 배열을 torch.tensor로 바꾸는 복사가 없다.
+    - reset() / step()이 돌려주는 관측값, 보상, done, info도 모두 텐서.
+      step(actions, out=buf[t + 1])처럼 롤아웃 저장소의 (N, state_dim) 자리를 넘기면
+      다음 관측값을 거기에 바로 쓴다. (out=None이면 새 텐서)
+    - 보상 통계는 (N, roll_window) 링 버퍼에서 매 스텝 창 전체 합으로 계산한다.
+      (텐서 연산 몇 번, 누적 오차 없음. GPU에서도 .item() 같은 동기화 없이 진행)
+    - 보상 계산은 float64, 관측값은 float32 → TradingEnv / VecTradingEnv와 같은 값.
+    - 시작 위치 / episode_len / 자동 리셋 없음 규칙은 VecTradingEnv와 같다.
+    """
+
+    INFO_KEYS = VecTradingEnv.INFO_KEYS
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        window_size: int,
+        num_envs: int = 1,
+        trade_penalty: float = 0.001,
+        use_daily_unrealized: bool = True,
+        reward_cfg: Optional[Dict[str, Any]] = None,
+        starts: Optional[Sequence[int]] = None,
+        random_start: bool = False,
+        episode_len: Optional[int] = None,
+        seed: Optional[int] = None,
+        device: str = "cpu",
+    ):
+        if num_envs < 1:
+            raise ValueError(f"num_envs는 1 이상이어야 합니다: {num_envs}")
+
+        # reward 설정 파싱 / 피처 행렬 / 수익률 계산은 단일 환경 것을 그대로 쓰고 텐서로 옮긴다
+        self.env = TradingEnv(
+            data,
+            window_size,
+            trade_penalty=trade_penalty,
+            use_daily_unrealized=use_daily_unrealized,
+            reward_cfg=reward_cfg,
+            reuse_obs_buffer=True,
+        )
+        self.device = torch.device(device)
+        self.num_envs = num_envs
+        self.window_size = window_size
+        self.trade_penalty = trade_penalty
+        self.n_steps = len(self.env.data)
+        self.starts = None if starts is None else np.asarray(starts, dtype=np.int64)
+        self.random_start = random_start
+        self.episode_len = episode_len
+        self.rng = np.random.default_rng(seed)
+
+        if self.starts is not None and len(self.starts) != num_envs:
+            raise ValueError(f"starts 길이({len(self.starts)})가 num_envs({num_envs})와 다릅니다.")
+
+        # 상주 텐서: 피처 (T, F) float32 + 창 view (T - window_size + 1, window_size, F)
+        self.features = torch.as_tensor(self.env.features, device=self.device)
+        self.windows = self.features.unfold(0, window_size, 1).transpose(1, 2)
+        self.asset_ret = torch.as_tensor(self.env.asset_ret, dtype=torch.float64, device=self.device)
+        self.mkt_ret = torch.as_tensor(self.env.mkt_ret, dtype=torch.float64, device=self.device)
+        self.state_dim = self.env.current_state_dim()
+
+        # 에피소드 상태 (텐서)
+        f64 = dict(dtype=torch.float64, device=self.device)
+        self.current_step = torch.zeros(num_envs, dtype=torch.long, device=self.device)
+        self.end_step = torch.zeros(num_envs, dtype=torch.long, device=self.device)
+        self.position = torch.zeros(num_envs, **f64)
+        self.equity = torch.ones(num_envs, **f64)
+        self.bh_equity = torch.ones(num_envs, **f64)
+        self.total_reward = torch.zeros(num_envs, **f64)
+        self.done = torch.ones(num_envs, dtype=torch.bool, device=self.device)
+
+        # 합성보상용 (포트폴리오 수익률, 시장 수익률) 링 버퍼. 빈 칸은 0
+        self.roll_window = self.env.roll_window
+        self._ret_x = torch.zeros(num_envs, self.roll_window, **f64)
+        self._ret_y = torch.zeros(num_envs, self.roll_window, **f64)
+        self._ret_pos = torch.zeros(num_envs, 1, dtype=torch.long, device=self.device)
+        self._ret_count = torch.zeros(num_envs, dtype=torch.long, device=self.device)
+
+    # ------------------------------------------------------
+    # 내부 유틸
+    # ------------------------------------------------------
+    def _start_steps(self, starts: Optional[Sequence[int]] = None) -> torch.Tensor:
+        first, last = self.window_size - 1, self.n_steps - 1
+        if starts is None:
+            starts = self.starts
+        if starts is not None:
+            starts = np.array(starts, dtype=np.int64)
+            if len(starts) != self.num_envs:
+                raise ValueError(f"starts 길이({len(starts)})가 num_envs({self.num_envs})와 다릅니다.")
+            if (starts < first).any() or (starts >= last).any():
+                raise ValueError(f"starts는 [{first}, {last}) 범위여야 합니다.")
+        elif self.random_start:
+            starts = self.rng.integers(first, last, size=self.num_envs)
+        else:
+            starts = np.full(self.num_envs, first, dtype=np.int64)
+        return torch.as_tensor(starts, dtype=torch.long, device=self.device)
+
+    def observe(self, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """환경별 current_step에서 끝나는 창 + 포지션 (N, state_dim) float32. out이 있으면 거기에 쓴다."""
+        if out is None:
+            out = torch.empty(self.num_envs, self.state_dim, dtype=torch.float32, device=self.device)
+        assert out.dtype == torch.float32, f"관측값 버퍼 dtype은 float32여야 합니다: {out.dtype}"
+        out[:, :-1] = self.windows[self.current_step - (self.window_size - 1)].reshape(self.num_envs, -1)
+        out[:, -1] = self.position
+        return out
+
+    def _push_returns(self, r_port: torch.Tensor, r_mkt: torch.Tensor, active: torch.Tensor) -> None:
+        """active인 환경만 링 버퍼에 (r_port, r_mkt)를 넣는다. (마스크 연산이라 동기화 없음)"""
+        keep = active.unsqueeze(1)
+        pos = self._ret_pos
+        self._ret_x.scatter_(1, pos, torch.where(keep, r_port.unsqueeze(1), self._ret_x.gather(1, pos)))
+        self._ret_y.scatter_(1, pos, torch.where(keep, r_mkt.unsqueeze(1), self._ret_y.gather(1, pos)))
+        self._ret_pos = torch.where(keep, (pos + 1) % self.roll_window, pos)
+        self._ret_count = torch.where(active, (self._ret_count + 1).clamp(max=self.roll_window), self._ret_count)
+
+    @staticmethod
+    def _var(s: torch.Tensor, ss: torch.Tensor, n: torch.Tensor, ddof: int) -> torch.Tensor:
+        dof = n - ddof
+        var = (ss - s * s / n.clamp(min=1)).clamp(min=0.0) / dof.clamp(min=1)
+        return torch.where(dof > 0, var, 0.0)
+
+    def _composite_reward(self):
+        """VecTradingEnv._composite_reward와 같은 계산 (창이 안 찬 환경은 0)"""
+        e = self.env
+        x, y = self._ret_x, self._ret_y
+        n = self._ret_count.to(torch.float64)
+        ready = self._ret_count == self.roll_window
+
+        sx, sy = x.sum(dim=1), y.sum(dim=1)
+        mean_r = sx / n.clamp(min=1)
+        neg = x.clamp(max=0.0)
+        n_neg = (x < 0.0).sum(dim=1).to(torch.float64)
+        downside_std = torch.where(
+            n_neg > 1, self._var(neg.sum(dim=1), (neg * neg).sum(dim=1), n_neg, 1).sqrt(), 0.0
+        )
+
+        # 시장 분산이 0이면 베타 0
+        var_y = self._var(sy, (y * y).sum(dim=1), n, 1)
+        cov = torch.where(n > 1, ((x * y).sum(dim=1) - sx * sy / n.clamp(min=1)) / (n - 1).clamp(min=1), 0.0)
+        beta_est = torch.where(var_y > 0.0, cov / (var_y + 1e-8), 0.0)
+        if e.beta_eps > 0:
+            abs_beta = beta_est.abs().clamp(min=e.beta_eps)
+        else:
+            abs_beta = beta_est.abs() + 1e-8
+
+        comp_R_raw = torch.where(downside_std > 0.0, mean_r / (downside_std + 1e-8), 0.0)
+        comp_Ddown_raw = downside_std
+        comp_Dret_raw = (mean_r - e.rf) / (abs_beta + 1e-8)
+        comp_Try_raw = mean_r / (abs_beta + 1e-8)
+
+        comp_R_scaled = comp_R_raw / e.scale_rann if e.scale_rann > 0 else comp_R_raw
+        comp_Ddown_scaled = -comp_Ddown_raw / e.scale_ddown if e.scale_ddown > 0 else -comp_Ddown_raw
+        comp_Dret_scaled = comp_Dret_raw / e.scale_dret if e.scale_dret > 0 else comp_Dret_raw
+        comp_Try_scaled = comp_Try_raw / e.scale_treynor if e.scale_treynor > 0 else comp_Try_raw
+
+        composite_raw = (
+            e.w1 * comp_R_scaled
+            + e.w2 * comp_Ddown_scaled
+            + e.w3 * comp_Dret_scaled
+            + e.w4 * comp_Try_scaled
+        )
+        composite_tanh = torch.tanh(composite_raw / e.clip) if e.clip > 0 else torch.tanh(composite_raw)
+
+        use = ready if e.use_composite else torch.zeros_like(ready)
+        terms = {
+            "comp_beta": torch.where(use, beta_est, 0.0),
+            "comp_R": torch.where(use, comp_R_raw, 0.0),
+            "comp_Ddown": torch.where(use, comp_Ddown_raw, 0.0),
+            "comp_Dret": torch.where(use, comp_Dret_raw, 0.0),
+            "comp_Try": torch.where(use, comp_Try_raw, 0.0),
+        }
+        return torch.where(use, composite_tanh / e.scale_factor, 0.0), terms
+
+    # ------------------------------------------------------
+    # Gym 스타일 인터페이스 (배치, 텐서)
+    # ------------------------------------------------------
+    def reset(self, starts: Optional[Sequence[int]] = None, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """starts: 이번 에피소드들의 시작 위치 (N,). None이면 생성 시 설정대로"""
+        if self.n_steps < self.window_size + 1:
+            raise ValueError("데이터 길이가 window_size + 1 보다 커야 합니다.")
+
+        self.current_step = self._start_steps(starts)
+        last = self.n_steps - 1
+        if self.episode_len is None:
+            self.end_step = torch.full_like(self.current_step, last)
+        else:
+            self.end_step = (self.current_step + self.episode_len).clamp(max=last)
+        self.position.zero_()
+        self.equity.fill_(1.0)
+        self.bh_equity.fill_(1.0)
+        self.total_reward.zero_()
+        self.done.zero_()
+        self._ret_x.zero_()
+        self._ret_y.zero_()
+        self._ret_pos.zero_()
+        self._ret_count.zero_()
+        return self.observe(out)
+
+    def current_state_dim(self) -> int:
+        return self.state_dim
+
+    @torch.no_grad()
+    def step(self, actions, out: Optional[torch.Tensor] = None):
+        """
+        actions: (N,) 정수 텐서 (또는 배열). 0=Long, 1=Short, 2=Hold
+        out: 다음 관측값을 쓸 (N, state_dim) float32 텐서 (롤아웃 저장소 자리). None이면 새 텐서
+        return: (next_states, rewards, dones, infos) - 모두 device 위의 텐서
+        """
+        actions = torch.as_tensor(actions, device=self.device)
+        active = ~self.done
+
+        # 1) 액션 → 포지션
+        prev_position = self.position
+        new_position = torch.where(actions == 0, 1.0, torch.where(actions == 1, -1.0, prev_position))
+        new_position = torch.where(active, new_position, prev_position)
+        trade_cost = self.trade_penalty * (new_position - prev_position).abs()
+
+        # 2) 다음 시점으로 이동 (끝난 환경은 제자리)
+        next_step = self.current_step + active.long()
+        r_asset = torch.where(active, self.asset_ret[next_step], 0.0)
+        r_mkt = torch.where(active, self.mkt_ret[next_step], 0.0)
+        r_port = new_position * r_asset
+
+        self.equity = self.equity * (1.0 + r_port)
+        self.bh_equity = self.bh_equity * (1.0 + r_asset)
+        base_reward = r_port - trade_cost
+
+        self._push_returns(r_port, r_mkt, active)
+
+        # 3) 합성 보상
+        composite_reward, terms = self._composite_reward()
+        rewards = torch.where(active, base_reward + composite_reward, 0.0)
+        self.total_reward += rewards
+
+        # 4) 다음 state, info
+        self.position = new_position
+        self.current_step = next_step
+        self.done = self.done | (self.current_step >= self.end_step)
+
+        infos = {"base": base_reward, "r_t": r_port, "rb_t": r_asset, "active": active}
+        for k, v in terms.items():
+            infos[k] = torch.where(active, v, 0.0)
+
+        return self.observe(out), rewards, self.done.clone(), infos
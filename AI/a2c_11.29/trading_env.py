@@ -1,22 +1,38 @@
 # trading_env.py
 
+import gymnasium as gym
+from gymnasium import spaces
+import copy
+
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, Any, Optional
 
-from data_utils import FEATURES, build_state
+from data_utils import FEATURES
+from feature_store import DTYPE
+from rolling_stats import RollingStats
 
 
-class TradingEnv:
+class TradingEnv(gym.Env):
     """
-    단일 종목 + KOSPI + VIX 기반 트레이딩 환경.
+    단일 종목 + KOSPI + VIX 기반 트레이딩 환경. (gymnasium.Env)
+    - reset() → (state, info), step(action) → (state, reward, terminated, truncated, info)
+      observation_space / action_space가 있으므로 gymnasium.vector로 묶을 수 있다. (make_async_env)
     - 상태(state): 최근 window_size일의 기술지표 FEATURES + Position(현재 포지션)
     - 액션(action): 0=Long(매수), 1=Short(매도), 2=Hold(관망)
         * 포지션 값: +1 (Long), -1 (Short), 0 (미보유)
+    - 관측값은 data_utils.build_state와 같은 float32(DTYPE) 벡터. 보상 계산용 가격/수익률은 float64.
+      FEATURES를 생성 시 한 번만 연속 float32 배열로 만들어 두고,
+      스텝마다 그 창(view)을 출력 버퍼에 복사만 한다. (pandas 인덱싱 없음)
+      reuse_obs_buffer=True면 매번 같은 배열을 돌려준다. → 다음 step 전에 쓰고 버릴 때만
+      (롤아웃 버퍼처럼 상태를 모아 두는 곳에서는 False: 스텝마다 새 배열)
     - 보상(reward):
         1) base_reward: 포지션 * 당일 수익률 - 거래 비용
         2) composite_reward: Sharpe-like / Downside / Treynor 등
            → config.yaml의 reward 섹션에 따라 계산
+    - seek(스텝 또는 날짜, 포트폴리오)로 원하는 시점에 바로 이동 (Hold로 과거를 다시 진행하지 않음)
+      snapshot() / restore()로 에피소드 상태 저장/복원
     """
 
     def __init__(
@@ -26,15 +42,31 @@ class TradingEnv:
         trade_penalty: float = 0.001,
         use_daily_unrealized: bool = True,
         reward_cfg: Optional[Dict[str, Any]] = None,
+        reuse_obs_buffer: bool = False,
     ):
+        super().__init__()
+        # 원래 인덱스(날짜)는 seek(날짜)용으로 따로 보관
+        self.dates = data.index
         self.data = data.reset_index(drop=True)
         self.window_size = window_size
         self.trade_penalty = trade_penalty
         self.use_daily_unrealized = use_daily_unrealized
         self.reward_cfg = reward_cfg or {}
+        self.reuse_obs_buffer = reuse_obs_buffer
+
+        # 관측값용 피처 행렬 (T, F) float32 + 창 view (T - window_size + 1, window_size, F)
+        # windows[i]는 i ~ i + window_size - 1 행 (복사 없음)
+        self.features = np.ascontiguousarray(self.data[FEATURES].to_numpy(dtype=DTYPE))
+        self.windows = sliding_window_view(self.features, window_size, axis=0).transpose(0, 2, 1)
+        self._obs = np.empty(window_size * len(FEATURES) + 1, dtype=DTYPE)
+        self._obs_window = self._obs[:-1].reshape(window_size, len(FEATURES))
+
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=self._obs.shape, dtype=DTYPE)
+        self.action_space = spaces.Discrete(3)
 
         # 가격/지수 배열
-        self.close = self.data["Close"].values.astype(float)
+        # (self.close는 gym.Env.close()와 겹치므로 close_prices)
+        self.close_prices = self.data["Close"].values.astype(float)
         self.kospi = self.data["KOSPI"].values.astype(float)
 
         # 일별 수익률
@@ -49,10 +81,6 @@ class TradingEnv:
         self.bh_equity: float = 1.0
         self.total_reward: float = 0.0
 
-        # 합성보상용 히스토리
-        self.port_ret_hist = []
-        self.mkt_ret_hist = []
-
         # 곡선 기록용
         self.equity_curve = []
         self.buyhold_curve = []
@@ -60,20 +88,29 @@ class TradingEnv:
         # reward 설정 파싱
         self._parse_reward_cfg()
 
+        # 합성보상용 최근 roll_window일 (포트폴리오 수익률, 시장 수익률) 이동 통계
+        self.ret_stats = RollingStats(self.roll_window)
+
     # ------------------------------------------------------
     # 내부 유틸
     # ------------------------------------------------------
     def _compute_returns(self):
         """종목/코스피 일별 수익률 계산."""
-        if len(self.close) < 2:
+        if len(self.close_prices) < 2:
             return
 
-        asset_ret = (self.close[1:] / self.close[:-1]) - 1.0
+        asset_ret = (self.close_prices[1:] / self.close_prices[:-1]) - 1.0
         mkt_ret = (self.kospi[1:] / self.kospi[:-1]) - 1.0
 
         self.asset_ret[1:] = asset_ret
         self.mkt_ret[1:] = mkt_ret
 
+    def _observe(self) -> np.ndarray:
+        """current_step에서 끝나는 창 + 포지션 (build_state와 같은 값)"""
+        np.copyto(self._obs_window, self.windows[self.current_step - (self.window_size - 1)])
+        self._obs[-1] = self.position
+        return self._obs if self.reuse_obs_buffer else self._obs.copy()
+
     def _parse_reward_cfg(self):
         cfg = self.reward_cfg
 
@@ -106,7 +143,8 @@ class TradingEnv:
     # ------------------------------------------------------
     # Gym 스타일 인터페이스
     # ------------------------------------------------------
-    def reset(self):
+    def reset(self, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None):
+        super().reset(seed=seed)
         if len(self.data) < self.window_size + 1:
             raise ValueError("데이터 길이가 window_size + 1 보다 커야 합니다.")
 
@@ -116,17 +154,12 @@ class TradingEnv:
         self.bh_equity = 1.0
         self.total_reward = 0.0
 
-        self.port_ret_hist = []
-        self.mkt_ret_hist = []
+        self.ret_stats.clear()
 
         self.equity_curve = [self.equity]
         self.buyhold_curve = [self.bh_equity]
 
-        window_df = self.data.iloc[
-            self.current_step - (self.window_size - 1) : self.current_step + 1
-        ]
-        state = build_state(window_df, position_flag=self.position)
-        return state
+        return self._observe(), {}
 
     def current_state_dim(self) -> int:
         return len(FEATURES) * self.window_size + 1
@@ -137,11 +170,7 @@ class TradingEnv:
 
         # 이미 끝난 경우 방어
         if self.current_step >= len(self.data) - 1:
-            window_df = self.data.iloc[
-                self.current_step - (self.window_size - 1) : self.current_step + 1
-            ]
-            state = build_state(window_df, position_flag=self.position)
-            return state, 0.0, True, info
+            return self._observe(), 0.0, True, False, info
 
         # 1) 액션 → 포지션
         prev_position = self.position
@@ -172,8 +201,7 @@ class TradingEnv:
 
         base_reward = r_port - trade_cost
 
-        self.port_ret_hist.append(r_port)
-        self.mkt_ret_hist.append(r_mkt)
+        self.ret_stats.push(r_port, r_mkt)
 
         # 3) 합성 보상
         comp_beta = 0.0
@@ -183,22 +211,14 @@ class TradingEnv:
         comp_Try_raw = 0.0
         composite_reward = 0.0
 
-        if self.use_composite and len(self.port_ret_hist) >= self.roll_window:
-            port_window = np.array(self.port_ret_hist[-self.roll_window :], dtype=float)
-            mkt_window = np.array(self.mkt_ret_hist[-self.roll_window :], dtype=float)
+        if self.use_composite and self.ret_stats.full:
+            stats = self.ret_stats
+            mean_r = stats.mean()
+            downside_std = stats.downside_std(ddof=1) if stats.downside_count > 1 else 0.0
 
-            mean_r = float(np.mean(port_window))
-            downside = port_window[port_window < 0.0]
-            if len(downside) > 1:
-                downside_std = float(np.std(downside, ddof=1))
-            else:
-                downside_std = 0.0
-
-            var_mkt = float(np.var(mkt_window, ddof=1)) if np.var(mkt_window) > 0 else 0.0
-            if var_mkt > 0.0:
-                cov_rm = float(np.cov(port_window, mkt_window)[0, 1])
-                beta_est = cov_rm / (var_mkt + 1e-8)
-            else:
+            # 시장 분산이 0이면 베타 0
+            beta_est = stats.beta(ddof=1, eps=1e-8)
+            if beta_est is None:
                 beta_est = 0.0
 
             abs_beta = max(self.beta_eps, abs(beta_est)) if self.beta_eps > 0 else (abs(beta_est) + 1e-8)
@@ -237,10 +257,7 @@ class TradingEnv:
         self.current_step = next_step
         done = (self.current_step >= len(self.data) - 1)
 
-        window_df = self.data.iloc[
-            self.current_step - (self.window_size - 1) : self.current_step + 1
-        ]
-        next_state = build_state(window_df, position_flag=self.position)
+        next_state = self._observe()
 
         self.equity_curve.append(self.equity)
         self.buyhold_curve.append(self.bh_equity)
@@ -254,4 +271,90 @@ class TradingEnv:
         info["comp_Dret"] = float(comp_Dret_raw)
         info["comp_Try"] = float(comp_Try_raw)
 
-        return next_state, reward, done, info
\ No newline at end of file
+        return next_state, reward, done, False, info
+
+    # ------------------------------------------------------
+    # 위치 이동 / 상태 저장
+    # ------------------------------------------------------
+    def _resolve_step(self, target) -> int:
+        """정수면 스텝(창의 마지막 행) 그대로, 아니면 날짜로 보고 그 날짜의 행 번호"""
+        if isinstance(target, (int, np.integer)):
+            step = int(target)
+        else:
+            step = int(self.dates.get_loc(pd.Timestamp(target)))
+        first, last = self.window_size - 1, len(self.data) - 1
+        if not first <= step <= last:
+            raise ValueError(f"스텝은 [{first}, {last}] 범위여야 합니다: {step}")
+        return step
+
+    def seek(self, target, portfolio_state: Optional[Dict[str, float]] = None):
+        """
+        target(스텝 또는 날짜)에서 끝나는 창으로 바로 이동. (과거를 Hold로 다시 진행하지 않음)
+        portfolio_state: {"position", "equity", "bh_equity"} (없는 키는 0 / 1.0 / 1.0)
+        - 합성보상 이동 통계는 그 포지션을 들고 있었을 때의 최근 roll_window일 수익률로 채운다.
+          → reset 후 같은 포지션으로 Hold만 해서 온 것과 같은 보상 상태. 비용은 roll_window에 비례
+        - equity / 곡선 / total_reward는 이동한 시점부터 새로 시작
+        return: (state, {})
+        """
+        step = self._resolve_step(target)
+        portfolio_state = portfolio_state or {}
+
+        self.current_step = step
+        self.position = float(portfolio_state.get("position", 0.0))
+        self.equity = float(portfolio_state.get("equity", 1.0))
+        self.bh_equity = float(portfolio_state.get("bh_equity", 1.0))
+        self.total_reward = 0.0
+
+        self.ret_stats.clear()
+        for t in range(max(self.window_size, step - self.roll_window + 1), step + 1):
+            self.ret_stats.push(self.position * self.asset_ret[t], self.mkt_ret[t])
+
+        self.equity_curve = [self.equity]
+        self.buyhold_curve = [self.bh_equity]
+
+        return self._observe(), {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """restore()로 되돌릴 수 있는 에피소드 상태 (복사본)"""
+        return {
+            "current_step": self.current_step,
+            "position": self.position,
+            "equity": self.equity,
+            "bh_equity": self.bh_equity,
+            "total_reward": self.total_reward,
+            "ret_stats": copy.deepcopy(self.ret_stats),
+            "equity_curve": list(self.equity_curve),
+            "buyhold_curve": list(self.buyhold_curve),
+        }
+
+    def restore(self, snap: Dict[str, Any]):
+        """snapshot() 시점으로 복원 (같은 snapshot으로 여러 번 복원 가능). return: (state, {})"""
+        self.current_step = snap["current_step"]
+        self.position = snap["position"]
+        self.equity = snap["equity"]
+        self.bh_equity = snap["bh_equity"]
+        self.total_reward = snap["total_reward"]
+        self.ret_stats = copy.deepcopy(snap["ret_stats"])
+        self.equity_curve = list(snap["equity_curve"])
+        self.buyhold_curve = list(snap["buyhold_curve"])
+        return self._observe(), {}
+
+
+# ------------------------------------------------------
+# 서브프로세스 벡터 환경
+# ------------------------------------------------------
+def make_async_env(env_config: Dict[str, Any], num_envs: int, shared_memory: bool = True):
+    """
+    TradingEnv num_envs개를 각자 서브프로세스에서 돌리는 gymnasium.vector.AsyncVectorEnv.
+    - env_config: TradingEnv 생성 인자 (train_a2c의 train_env_config와 같은 dict)
+    - shared_memory=True면 관측값을 공유 메모리로 넘긴다. (프로세스 간 pickle 복사 없음)
+      워커의 관측값은 곧바로 공유 메모리에 복사되므로 워커 쪽은 관측 버퍼를 재사용한다.
+    - 끝난 환경은 다음 step에서 자동 리셋된다. (gymnasium 기본 autoreset)
+    학습자(정책 forward)는 메인 프로세스에 두고 환경 스텝만 여러 코어에서 돌릴 때 사용.
+    (한 프로세스 안에서 배열로 묶는 것은 vec_trading_env.VecTradingEnv)
+    """
+    cfg = {**env_config, "reuse_obs_buffer": True}
+    return gym.vector.AsyncVectorEnv(
+        [lambda: TradingEnv(**cfg) for _ in range(num_envs)],
+        shared_memory=shared_memory,
+    )
@@ -8,9 +8,12 @@ import pandas as pd
 from tqdm import tqdm
 from sklearn.preprocessing import StandardScaler
 
-from data_utils import download_data, add_indicators, FEATURES
+from data_utils import download_data, load_features, FEATURES
 from trading_env import TradingEnv
-from ac_model import A2CAgent
+from vec_trading_env import VecTradingEnv
+from episode_sampler import make_episode_sampler
+from ac_model import A2CAgent, make_lr_lambda
+from a2c_workers import RolloutWorkers, collect_vec_episodes, make_vec_env
 
 
 # --- A2C용 검증(Validation) 함수 ---
@@ -20,15 +23,16 @@ def validate_agent(agent: A2CAgent, env_config: dict, scaler: StandardScaler = N
     env_config: TradingEnv 생성에 사용할 설정 딕셔너리
     scaler: 여기서는 이미 스케일된 데이터를 env에 넣는 구조라면 사용하지 않음
     """
-    val_env = TradingEnv(**env_config)
-    s = val_env.reset()
+    # 상태를 act()에 바로 넘기고 버리므로 관측 버퍼 재사용
+    val_env = TradingEnv(**env_config, reuse_obs_buffer=True)
+    s, _ = val_env.reset()
     done = False
     episode_reward = 0.0
 
     while not done:
         # 검증 시에는 deterministic=True로 greedy 정책 사용
         a, _ = agent.act(s, deterministic=True)
-        ns, r, done, _ = val_env.step(a)
+        ns, r, done, _, _ = val_env.step(a)
         episode_reward += r
         s = ns if not done else s
 
@@ -80,6 +84,14 @@ def run_training():
     validate_every = cfg.get("validate_every_n_episodes", 10)
     model_path = cfg["model_path"]
 
+    num_envs = cfg.get("num_envs", 1)
+    num_workers = cfg.get("num_workers", 0)
+    env_backend = cfg.get("env_backend", "numpy")
+    sampler_cfg = cfg.get("episode_sampler") or {}
+    adv_cfg = cfg.get("advantage") or {}
+    update_cfg = cfg.get("update") or {}
+    lr_cfg = update_cfg.get("lr_schedule") or {}
+    episodes = cfg["episodes"]
     train_years = cfg.get("train_years", 10)
     backtest_days = cfg.get("backtest_days", 365)
 
@@ -91,8 +103,10 @@ def run_training():
         cfg["vix_ticker"],
         cfg["start_date"],
         cfg["end_date"],
+        cache_dir=cfg.get("cache_dir", "data_cache"),
+        source=cfg.get("data_source"),
     )
-    df = add_indicators(raw)
+    df = load_features(raw, cfg["ticker"], cfg.get("feature_store_dir", "feature_store"))
 
     # === 10년 학습 + 1년 백테스트(최근) ===
     train_df, test_df = calendar_split(df, train_years, backtest_days)
@@ -126,6 +140,42 @@ def run_training():
     }
 
     env = TradingEnv(**train_env_config)
+    # num_envs > 1: 에피소드 N개를 배열로 동시에 진행 (업데이트 1번에 에피소드 N개)
+    #  환경마다 시작 위치를 무작위로 (모두 같은 위치면 같은 데이터를 N번 보는 것과 같음)
+    # env_backend="torch"면 num_envs=1이어도 TorchTradingEnv 경로 (관측값을 롤아웃 저장소에 바로 씀)
+    device = cfg.get("device", "cpu")
+    venv = None
+    if num_envs > 1 or env_backend != "numpy":
+        venv = make_vec_env(
+            train_env_config, num_envs, env_backend, device=device,
+            random_start=num_envs > 1, seed=cfg["seed"],
+        )
+
+    # 무작위 시작 + 고정 길이 에피소드 (episode_sampler.enabled). num_envs=1이어도 배치 환경 경로로 진행
+    sampler = None
+    if sampler_cfg.get("enabled", False):
+        sampler = make_episode_sampler(train_df, window_size, reward_cfg, sampler_cfg, seed=cfg["seed"])
+        venv = make_vec_env(
+            train_env_config, num_envs, env_backend, device=device, episode_len=sampler.episode_len
+        )
+        print(f"에피소드 샘플러: 길이 {sampler.episode_len} (warmup {sampler.warmup} + horizon {sampler.horizon}), "
+              f"시작점 {len(sampler)}개 / 층 {len(sampler.groups)}개 (stratify={sampler.stratify})")
+
+    # 업데이트 스케줄: 에피소드를 rollout_len 틱씩 끊어서 업데이트 (null이면 에피소드마다 한 번)
+    episode_ticks = sampler.episode_len if sampler is not None else len(train_df) - window_size
+    rollout_ticks = min(update_cfg.get("rollout_len") or episode_ticks, episode_ticks)
+    updates_per_episode = -(-episode_ticks // rollout_ticks)
+    lr_lambda = None
+    if lr_cfg:
+        total_updates = lr_cfg.get("total_updates") or episodes * updates_per_episode
+        lr_lambda = make_lr_lambda(
+            lr_cfg.get("type", "constant"),
+            total_updates,
+            warmup_updates=lr_cfg.get("warmup_updates", 0),
+            final_ratio=lr_cfg.get("final_lr_ratio", 0.0),
+        )
+        print(f"lr 스케줄: {lr_cfg.get('type', 'constant')} (총 {total_updates} 업데이트)")
+    print(f"롤아웃 길이: {rollout_ticks}틱 (에피소드당 최대 {updates_per_episode}번 업데이트)")
 
     # A2CAgent 생성
     agent = A2CAgent(
@@ -137,11 +187,39 @@ def run_training():
         value_loss_coeff=cfg["value_loss_coeff"],
         entropy_coeff=cfg["entropy_coeff"],
         seed=cfg["seed"],
-        device=cfg.get("device", "cpu"),
+        device=device,
+        advantage=adv_cfg.get("method", "mc"),
+        n_steps=adv_cfg.get("n_steps", 5),
+        gae_lambda=adv_cfg.get("gae_lambda", 0.95),
+        update_epochs=update_cfg.get("update_epochs", 1),
+        num_minibatches=update_cfg.get("num_minibatches", 1),
+        lr_lambda=lr_lambda,
     )
 
+    # 롤아웃 저장소: 업데이트 한 번까지의 최대 틱 수(rollout_ticks) x 환경 수
+    workers = None
+    if num_workers > 0:
+        # 워커 K개 x 환경 num_envs개를 동시에 수집 (저장소는 RolloutWorkers가 공유 메모리로 할당)
+        workers = RolloutWorkers(
+            agent,
+            train_env_config,
+            num_workers=num_workers,
+            envs_per_worker=num_envs,
+            sampler_cfg=sampler_cfg,
+            episode_len=sampler.episode_len if sampler is not None else None,
+            rollout_len=rollout_ticks,
+            hidden_dims=model_cfg.get("hidden_dims", [128, 128]),
+            seed=cfg["seed"],
+            env_backend=env_backend,
+        )
+        print(f"롤아웃 워커: {num_workers}개 프로세스 x 환경 {num_envs}개 ({env_backend})")
+    elif venv is not None:
+        agent.init_rollout(rollout_ticks, num_envs=venv.num_envs)
+        print(f"환경 백엔드: {env_backend} (환경 {venv.num_envs}개)")
+    else:
+        agent.init_rollout(rollout_ticks)
+
     # 6. A2C 학습 루프 (On-Policy)
-    episodes = cfg["episodes"]
     best_val_reward = -np.inf
     print(f"\nA2C 학습 시작 (총 {episodes} 에피소드)...")
 
@@ -150,53 +228,68 @@ def run_training():
     val_rewards = []
 
     for ep in range(episodes):
-        s = env.reset()
-        done = False
-        episode_reward = 0.0
-
-        # --- 디버깅 누적용 (보상 구성 요소 평균 보기) ---
-        dbg_acc = {
-            "base": 0.0,
-            "r_t": 0.0,
-            "rb_t": 0.0,
-            "comp_beta": 0.0,
-            "comp_R": 0.0,
-            "comp_Ddown": 0.0,
-            "comp_Dret": 0.0,
-            "comp_Try": 0.0,
-        }
-        steps = 0
-
-        desc = f"Episode {ep + 1}/{episodes}"
-        pbar = tqdm(total=len(train_df) - window_size, desc=desc, leave=True)
-
-        while not done:
-            # 1. 행동 결정 (샘플링)
-            a, log_prob = agent.act(s, deterministic=False)
-
-            # 2. 크리틱의 현재 상태 가치(V(s)) 추정
-            value = agent.get_value(s)
-
-            # 3. 환경 스텝
-            ns, r, done, info = env.step(a)
-
-            # 4. 롤아웃 버퍼에 저장
-            agent.remember(s, a, r, ns, done, log_prob, value)
-
-            episode_reward += r
-            s = ns if not done else s
-            pbar.update(1)
-
-            # --- info 누적 (디버그용) ---
-            for k in dbg_acc.keys():
-                if k in info:
-                    dbg_acc[k] += info[k]
-            steps += 1
-
-        pbar.close()
-
-        # 5. (핵심) 에피소드가 끝나면, 수집된 롤아웃으로 학습
-        loss_tuple = agent.train_step()
+        update_losses = []
+
+        def update():
+            # 롤아웃마다 업데이트 (에피소드 중간에서 끊겼으면 끊긴 지점의 V(s)로 부트스트랩)
+            loss = agent.train_step()
+            if loss is not None:
+                update_losses.append(loss)
+
+        if workers is not None:
+            episode_reward, dbg_acc, steps = workers.collect(update)
+        elif venv is not None:
+            episode_reward, dbg_acc, steps = collect_vec_episodes(
+                agent, venv, VecTradingEnv.INFO_KEYS, sampler, update
+            )
+        else:
+            s, _ = env.reset()
+            done = False
+            episode_reward = 0.0
+
+            # --- 디버깅 누적용 (보상 구성 요소 평균 보기) ---
+            dbg_acc = {
+                "base": 0.0,
+                "r_t": 0.0,
+                "rb_t": 0.0,
+                "comp_beta": 0.0,
+                "comp_R": 0.0,
+                "comp_Ddown": 0.0,
+                "comp_Dret": 0.0,
+                "comp_Try": 0.0,
+            }
+            steps = 0
+
+            desc = f"Episode {ep + 1}/{episodes}"
+            pbar = tqdm(total=len(train_df) - window_size, desc=desc, leave=True)
+
+            while not done:
+                # 1~2. 행동 샘플 + 크리틱 V(s)를 forward 한 번으로
+                a, log_prob, value = agent.act_and_value(s, deterministic=False)
+
+                # 3. 환경 스텝
+                ns, r, done, _, info = env.step(a)
+
+                # 4. 롤아웃 버퍼에 저장 (rollout_len 틱이 차면 에피소드 도중이라도 업데이트)
+                agent.remember(s, a, r, ns, done, log_prob, value)
+                if not done and agent.rollout.step == agent.rollout.num_steps:
+                    update()
+
+                episode_reward += r
+                s = ns if not done else s
+                pbar.update(1)
+
+                # --- info 누적 (디버그용) ---
+                for k in dbg_acc.keys():
+                    if k in info:
+                        dbg_acc[k] += info[k]
+                steps += 1
+
+            pbar.close()
+
+        # 5. (핵심) 에피소드가 끝나면, 남은 롤아웃으로 학습
+        update()
+        loss_tuple = tuple(np.mean(update_losses, axis=0)) if update_losses else None
 
         # 에피소드 보상 로그 저장
         episode_rewards.append(episode_reward)
@@ -227,7 +320,9 @@ def run_training():
                 f"Reward: {episode_reward:12.2f} | "
                 f"A_Loss: {actor_loss:10.4f} | "
                 f"C_Loss: {critic_loss:14.4f} | "
-                f"E_Loss: {entropy_loss:10.4f}"
+                f"E_Loss: {entropy_loss:10.4f} | "
+                f"Upd: {len(update_losses):4d} | "
+                f"LR: {agent.current_lr():.2e}"
             )
         else:
             print(
@@ -248,6 +343,9 @@ def run_training():
                 print(f"*** New Best Model! Saving to {model_path} ***")
                 agent.save(model_path)
 
+    if workers is not None:
+        workers.close()
+
     # --- 학습 요약 출력 + 로그 저장 ---
     if len(episode_rewards) > 0:
         ep_rewards_arr = np.array(episode_rewards, dtype=float)
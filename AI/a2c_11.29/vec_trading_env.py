@@ -0,0 +1,221 @@
+# vec_trading_env.py
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+from feature_store import DTYPE
+from rolling_stats import RollingStatsBatch
+from trading_env import TradingEnv
+
+
+class VecTradingEnv:
+    """
+    TradingEnv 에피소드 N개를 한 프로세스 안에서 배열로 동시에 진행하는 환경.
+    - 포지션 / 자산 / 보상 통계 / 현재 스텝을 길이 N 배열로 들고,
+      step(actions)에 행동 배열 (N,)을 받아 N개 에피소드를 한 번에 진행한다.
+      → 정책 forward도 (N, state_dim) 배치 한 번 (A2CAgent.act_batch)
+    - 에피소드 하나하나는 같은 설정의 TradingEnv와 같은 보상/관측을 낸다.
+      (피처 행렬, 수익률, reward 설정은 내부 TradingEnv 하나를 그대로 공유)
+    - 시작 위치:
+        starts=None, random_start=False → 모두 TradingEnv.reset()과 같은 window_size - 1
+        random_start=True → reset마다 [window_size - 1, 끝 - 1) 에서 무작위 (seed 고정 가능)
+        starts=[...] → 환경별로 직접 지정 (reset(starts=...)로 그 reset에만 지정할 수도 있다)
+      episode_len을 주면 그 스텝 수만큼만 진행 (데이터 끝에 닿으면 거기서 종료)
+    - 자동 리셋 없음. 먼저 끝난 환경은 나머지가 끝날 때까지 행동을 무시하고
+      보상 0, done=True를 돌려준다. (infos["active"]로 이번 스텝에 실제 진행한 환경 표시)
+    """
+
+    INFO_KEYS = ("base", "r_t", "rb_t", "comp_beta", "comp_R", "comp_Ddown", "comp_Dret", "comp_Try")
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        window_size: int,
+        num_envs: int,
+        trade_penalty: float = 0.001,
+        use_daily_unrealized: bool = True,
+        reward_cfg: Optional[Dict[str, Any]] = None,
+        starts: Optional[Sequence[int]] = None,
+        random_start: bool = False,
+        episode_len: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        if num_envs < 1:
+            raise ValueError(f"num_envs는 1 이상이어야 합니다: {num_envs}")
+
+        # 피처 창 view / 수익률 / reward 설정은 단일 환경과 공유
+        self.env = TradingEnv(
+            data,
+            window_size,
+            trade_penalty=trade_penalty,
+            use_daily_unrealized=use_daily_unrealized,
+            reward_cfg=reward_cfg,
+            reuse_obs_buffer=True,
+        )
+        self.num_envs = num_envs
+        self.window_size = window_size
+        self.trade_penalty = trade_penalty
+        self.n_steps = len(self.env.data)
+        self.starts = None if starts is None else np.asarray(starts, dtype=np.int64)
+        self.random_start = random_start
+        self.episode_len = episode_len
+        self.rng = np.random.default_rng(seed)
+
+        if self.starts is not None and len(self.starts) != num_envs:
+            raise ValueError(f"starts 길이({len(self.starts)})가 num_envs({num_envs})와 다릅니다.")
+
+        n_feat = self.env.windows.shape[2]
+        self._obs = np.empty((num_envs, window_size * n_feat + 1), dtype=DTYPE)
+        self._obs_window = self._obs[:, :-1].reshape(num_envs, window_size, n_feat)
+
+        # 에피소드 상태 (배열)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.end_step = np.zeros(num_envs, dtype=np.int64)
+        self.position = np.zeros(num_envs)
+        self.equity = np.ones(num_envs)
+        self.bh_equity = np.ones(num_envs)
+        self.total_reward = np.zeros(num_envs)
+        self.done = np.ones(num_envs, dtype=bool)
+
+        self.ret_stats = RollingStatsBatch(num_envs, self.env.roll_window)
+
+    # ------------------------------------------------------
+    # 내부 유틸
+    # ------------------------------------------------------
+    def _start_steps(self, starts: Optional[Sequence[int]] = None) -> np.ndarray:
+        first, last = self.window_size - 1, self.n_steps - 1
+        if starts is None:
+            starts = self.starts
+        if starts is not None:
+            starts = np.array(starts, dtype=np.int64)
+            if len(starts) != self.num_envs:
+                raise ValueError(f"starts 길이({len(starts)})가 num_envs({self.num_envs})와 다릅니다.")
+            if (starts < first).any() or (starts >= last).any():
+                raise ValueError(f"starts는 [{first}, {last}) 범위여야 합니다.")
+            return starts
+        if self.random_start:
+            return self.rng.integers(first, last, size=self.num_envs)
+        return np.full(self.num_envs, first, dtype=np.int64)
+
+    def _observe(self) -> np.ndarray:
+        """환경별 current_step에서 끝나는 창 + 포지션 (N, state_dim)"""
+        self._obs_window[:] = self.env.windows[self.current_step - (self.window_size - 1)]
+        self._obs[:, -1] = self.position
+        return self._obs.copy()
+
+    def _composite_reward(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """TradingEnv.step의 합성 보상을 환경 N개에 대해 배열로 계산 (창이 안 찬 환경은 0)"""
+        e = self.env
+        zeros = np.zeros(self.num_envs)
+        terms = {"comp_beta": zeros, "comp_R": zeros, "comp_Ddown": zeros, "comp_Dret": zeros, "comp_Try": zeros}
+        ready = self.ret_stats.full
+        if not e.use_composite or not ready.any():
+            return zeros, terms
+
+        stats = self.ret_stats
+        mean_r = stats.mean()
+        downside_std = np.where(stats.downside_count > 1, stats.downside_std(ddof=1), 0.0)
+
+        # 시장 분산이 0이면 베타 0
+        beta_est = stats.beta(ddof=1, eps=1e-8, fill=0.0)
+        if e.beta_eps > 0:
+            abs_beta = np.maximum(e.beta_eps, np.abs(beta_est))
+        else:
+            abs_beta = np.abs(beta_est) + 1e-8
+
+        comp_R_raw = np.where(downside_std > 0.0, mean_r / (downside_std + 1e-8), 0.0)
+        comp_Ddown_raw = downside_std
+        comp_Dret_raw = (mean_r - e.rf) / (abs_beta + 1e-8)
+        comp_Try_raw = mean_r / (abs_beta + 1e-8)
+
+        comp_R_scaled = comp_R_raw / e.scale_rann if e.scale_rann > 0 else comp_R_raw
+        comp_Ddown_scaled = -comp_Ddown_raw / e.scale_ddown if e.scale_ddown > 0 else -comp_Ddown_raw
+        comp_Dret_scaled = comp_Dret_raw / e.scale_dret if e.scale_dret > 0 else comp_Dret_raw
+        comp_Try_scaled = comp_Try_raw / e.scale_treynor if e.scale_treynor > 0 else comp_Try_raw
+
+        composite_raw = (
+            e.w1 * comp_R_scaled
+            + e.w2 * comp_Ddown_scaled
+            + e.w3 * comp_Dret_scaled
+            + e.w4 * comp_Try_scaled
+        )
+        composite_tanh = np.tanh(composite_raw / e.clip) if e.clip > 0 else np.tanh(composite_raw)
+        composite_reward = np.where(ready, composite_tanh / e.scale_factor, 0.0)
+
+        terms = {
+            "comp_beta": np.where(ready, beta_est, 0.0),
+            "comp_R": np.where(ready, comp_R_raw, 0.0),
+            "comp_Ddown": np.where(ready, comp_Ddown_raw, 0.0),
+            "comp_Dret": np.where(ready, comp_Dret_raw, 0.0),
+            "comp_Try": np.where(ready, comp_Try_raw, 0.0),
+        }
+        return composite_reward, terms
+
+    # ------------------------------------------------------
+    # Gym 스타일 인터페이스 (배치)
+    # ------------------------------------------------------
+    def reset(self, starts: Optional[Sequence[int]] = None) -> np.ndarray:
+        """starts: 이번 에피소드들의 시작 위치 (N,). None이면 생성 시 설정대로 (EpisodeSampler.sample 등)"""
+        if self.n_steps < self.window_size + 1:
+            raise ValueError("데이터 길이가 window_size + 1 보다 커야 합니다.")
+
+        self.current_step = self._start_steps(starts)
+        last = self.n_steps - 1
+        if self.episode_len is None:
+            self.end_step = np.full(self.num_envs, last, dtype=np.int64)
+        else:
+            self.end_step = np.minimum(self.current_step + self.episode_len, last)
+        self.position[:] = 0.0
+        self.equity[:] = 1.0
+        self.bh_equity[:] = 1.0
+        self.total_reward[:] = 0.0
+        self.done[:] = False
+        self.ret_stats.clear()
+        return self._observe()
+
+    def current_state_dim(self) -> int:
+        return self.env.current_state_dim()
+
+    def step(self, actions: np.ndarray):
+        """
+        actions: (N,) 정수 배열 (0=Long, 1=Short, 2=Hold)
+        return: (next_states (N, state_dim), rewards (N,), dones (N,), infos)
+            infos: INFO_KEYS별 (N,) 배열 + "active" (이번 스텝에 진행한 환경)
+        """
+        actions = np.asarray(actions)
+        active = ~self.done
+
+        # 1) 액션 → 포지션
+        prev_position = self.position
+        new_position = np.where(actions == 0, 1.0, np.where(actions == 1, -1.0, prev_position))
+        new_position = np.where(active, new_position, prev_position)
+        trade_cost = self.trade_penalty * np.abs(new_position - prev_position)
+
+        # 2) 다음 시점으로 이동 (끝난 환경은 제자리)
+        next_step = np.where(active, self.current_step + 1, self.current_step)
+        r_asset = np.where(active, self.env.asset_ret[next_step], 0.0)
+        r_mkt = np.where(active, self.env.mkt_ret[next_step], 0.0)
+        r_port = new_position * r_asset
+
+        self.equity = self.equity * (1.0 + r_port)
+        self.bh_equity = self.bh_equity * (1.0 + r_asset)
+        base_reward = r_port - trade_cost
+
+        self.ret_stats.push(r_port, r_mkt, mask=None if active.all() else active)
+
+        # 3) 합성 보상
+        composite_reward, terms = self._composite_reward()
+        rewards = np.where(active, base_reward + composite_reward, 0.0)
+        self.total_reward += rewards
+
+        # 4) 다음 state, info
+        self.position = new_position
+        self.current_step = next_step
+        self.done = self.done | (self.current_step >= self.end_step)
+
+        infos = {"base": base_reward, "r_t": r_port, "rb_t": r_asset, "active": active}
+        for k, v in terms.items():
+            infos[k] = np.where(active, v, 0.0)
+
+        return self._observe(), rewards, self.done.copy(), infos
@@ -1,3 +1,5 @@
+import os
+
 import torch
 
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -21,10 +23,33 @@ START_DATE = "2015-11-28"
 END_DATE = "2025-11-27"
 
 NUM_EPISODES = 300
+# 동시에 진행할 학습 환경 수 (vec_environment.VecMARLStockEnv). 1이면 MARLStockEnv 하나
+#  - N이면 틱마다 에이전트별 forward 1번으로 환경 N개를 진행하고 리플레이 버퍼에 N개씩 넣는다
+NUM_ENVS = 1
+#  - N > 1이면 환경마다 시작 위치를 무작위로 (VEC_ENV_SEED로 고정)
+VEC_ENV_SEED = 42
+# 틱당 학습(learner.train) 횟수. NUM_ENVS개를 진행하는 틱에는 횟수는 그대로 두고 배치를
+# BATCH_SIZE x 진행한 환경 수로 키운다 (환경-스텝당 학습 샘플 수는 환경 수와 관계없이 같음)
+UPDATES_PER_ENV_STEP = 2
 
 EPSILON_START = 1.0
 EPSILON_END = 0.1
 EPSILON_DECAY_STEPS = 150000 
 
 WARMUP_STEPS = 2000 
-REWARD_SCALE = 10.0
\ No newline at end of file
+REWARD_SCALE = 10.0
+
+# --- 캐시 설정 ---
+# 실행 위치(cwd)와 상관없이 이 프로젝트 폴더 아래 (None 이면 캐시 없이 매번 다운로드)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache")
+FUNDAMENTALS_TTL_HOURS = 24       # 재무제표/추천 정보 재사용 시간
+
+# --- 데이터 공급자 (market_data.py) ---
+# "yfinance" | "snapshot" (SNAPSHOT_DIR의 <ticker>.parquet|csv) | "synthetic" (시드 고정 합성 가격)
+DATA_SOURCE = "yfinance"
+SNAPSHOT_DIR = "data_snapshot"
+SYNTHETIC_SEED = 42
+
+# --- 지표 행렬 저장소 (feature_store.py) ---
+# 실행 위치(cwd)와 상관없이 이 프로젝트 폴더 아래 (None 이면 매번 지표 계산)
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_store")
@@ -1,7 +1,11 @@
 import gymnasium as gym
 from gymnasium import spaces
+import copy
 import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from config import N_AGENTS, WINDOW_SIZE, REWARD_SCALE
+from feature_store import DTYPE
 
 class MARLStockEnv(gym.Env):
     def __init__(self, features_df, prices_df, 
@@ -33,11 +37,26 @@ class MARLStockEnv(gym.Env):
         self.observation_dim_2 = self.window_size * self.n_features_agent_2 + 2
         
         self.state_dim = self.window_size * self.n_features_global + (self.n_agents * 2)
+
+        # --- 관측값 테이블 (생성 시 한 번만) ---
+        # 에이전트별 컬럼을 미리 골라 둔 연속 float32(DTYPE) 행렬과 그 창 view
+        # (T - window_size + 1, window_size, F_i). 스텝마다는 창 복사 + 포트폴리오 상태만 쓴다.
+        self._global_table = np.ascontiguousarray(features_df.to_numpy(dtype=DTYPE))
+        self._global_windows = self._windows(self._global_table)
+        self._agent_windows = [
+            self._windows(np.ascontiguousarray(self._global_table[:, idx]))
+            for idx in self._agent_indices()
+        ]
+        # 한 스텝의 관측값 + 글로벌 상태를 담는 버퍼 배치 (에이전트 obs들, 글로벌 상태 순)
+        sizes = [w.shape[1] * w.shape[2] + 2 for w in self._agent_windows] + [self.state_dim]
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+        # 가격은 .iloc 대신 배열로 (원래 dtype 유지)
+        self._price_arr = np.asarray(prices_df)
         
         self.observation_space = spaces.Dict({
-            'agent_0': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_0,), dtype=np.float32),
-            'agent_1': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_1,), dtype=np.float32),
-            'agent_2': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_2,), dtype=np.float32)
+            'agent_0': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_0,), dtype=DTYPE),
+            'agent_1': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_1,), dtype=DTYPE),
+            'agent_2': spaces.Box(low=-np.inf, high=np.inf, shape=(self.observation_dim_2,), dtype=DTYPE)
         })
         
         self.action_dim = 3
@@ -52,26 +71,29 @@ class MARLStockEnv(gym.Env):
         # [개선] 누적 보상 추적
         self.episode_returns = []
 
+    def _agent_indices(self):
+        # agent 3 이상(있다면)은 전체 컬럼을 본다
+        cols = [self.agent_0_indices, self.agent_1_indices, self.agent_2_indices]
+        all_cols = list(range(self.n_features_global))
+        return [cols[i] if i < len(cols) else all_cols for i in range(self.n_agents)]
+
+    def _windows(self, table):
+        """(T, F) → (T - window_size + 1, window_size, F) view. [i]는 i ~ i + window_size - 1 행"""
+        return sliding_window_view(table, self.window_size, axis=0).transpose(0, 2, 1)
+
     def _get_obs_and_state(self):
         start = self.current_step
-        end = start + self.window_size
-        
-        market_data_global_windowed = self.df.iloc[start:end].values
-        
-        market_data_agent_0 = market_data_global_windowed[:, self.agent_0_indices]
-        market_data_agent_1 = market_data_global_windowed[:, self.agent_1_indices]
-        market_data_agent_2 = market_data_global_windowed[:, self.agent_2_indices]
+        current_price = self._price_arr[self.current_step + self.window_size - 1]
+
+        # 스텝마다 새 버퍼 하나 (리플레이 버퍼가 obs를 그대로 들고 있으므로 재사용하지 않음)
+        buf = np.empty(self._offsets[-1], dtype=DTYPE)
+        o = self._offsets
+        global_state = buf[o[-2]:o[-1]]
+        n_global = self.window_size * self.n_features_global
+        np.copyto(global_state[:n_global].reshape(self.window_size, self.n_features_global),
+                  self._global_windows[start])
 
-        market_data_global_flat = market_data_global_windowed.flatten()
-        market_data_agent_0_flat = market_data_agent_0.flatten()
-        market_data_agent_1_flat = market_data_agent_1.flatten()
-        market_data_agent_2_flat = market_data_agent_2.flatten()
-            
-        current_price = self.prices.iloc[self.current_step + self.window_size - 1]
-        
-        global_portfolio_state = []
         observations = {}
-        
         for i in range(self.n_agents):
             pos_signal = self.positions[i]
             entry_price = self.entry_prices[i]
@@ -81,23 +103,17 @@ class MARLStockEnv(gym.Env):
                 unrealized_return_pct = (current_price - entry_price) / (entry_price + 1e-9)
             elif pos_signal == -1 and entry_price != 0:
                 unrealized_return_pct = (entry_price - current_price) / (entry_price + 1e-9)
-            unrealized_return_pct = np.clip(unrealized_return_pct, -1.0, 1.0)
-            
-            own_portfolio_state = np.array([pos_signal, unrealized_return_pct], dtype=np.float32)
-            
-            if i == 0:
-                obs_flat = market_data_agent_0_flat
-            elif i == 1:
-                obs_flat = market_data_agent_1_flat
-            elif i == 2:
-                obs_flat = market_data_agent_2_flat
-            else:
-                obs_flat = market_data_global_flat
-                
-            observations[f'agent_{i}'] = np.concatenate([obs_flat, own_portfolio_state])
-            global_portfolio_state.append(own_portfolio_state)
-            
-        global_state = np.concatenate([market_data_global_flat, np.concatenate(global_portfolio_state)])
+            # 스칼라라서 np.clip 대신 min/max (값 동일, 호출 비용만 작음)
+            unrealized_return_pct = min(max(unrealized_return_pct, -1.0), 1.0)
+
+            obs = buf[o[i]:o[i + 1]]
+            window = self._agent_windows[i][start]
+            np.copyto(obs[:-2].reshape(window.shape), window)
+            obs[-2] = pos_signal
+            obs[-1] = unrealized_return_pct
+            global_state[n_global + 2 * i:n_global + 2 * i + 2] = obs[-2:]
+            observations[f'agent_{i}'] = obs
+
         return observations, global_state
 
     def reset(self, seed=None, initial_portfolio=None):
@@ -116,14 +132,66 @@ class MARLStockEnv(gym.Env):
         obs, state = self._get_obs_and_state()
         return obs, {"global_state": state}
 
+    # ---------- 위치 이동 / 상태 저장 ----------
+    def _resolve_step(self, target):
+        """정수면 current_step(창의 시작 행) 그대로, 아니면 날짜로 보고 그 날짜에서 끝나는 창의 시작 행"""
+        if isinstance(target, (int, np.integer)):
+            step = int(target)
+        else:
+            step = int(self.df.index.get_loc(pd.Timestamp(target))) - self.window_size + 1
+        # 관측값은 마지막 창(len(df) - window_size)까지 만들 수 있다. step()은 max_steps 전까지만
+        last = len(self.df) - self.window_size
+        if not 0 <= step <= last:
+            raise ValueError(f"current_step은 [0, {last}] 범위여야 합니다: {step}")
+        return step
+
+    def seek(self, target, portfolio_state=None):
+        """
+        target(current_step 또는 날짜)으로 바로 이동. 날짜면 그 날짜에서 끝나는 창을 본다.
+        (Hold로 과거를 다시 진행하거나 current_step / _get_obs_and_state를 직접 건드리지 않음)
+        portfolio_state: reset의 initial_portfolio와 같은 형식 {'positions', 'entry_prices'} (없으면 무포지션)
+        return: reset()과 같은 (obs, {"global_state": state})
+        """
+        self.current_step = self._resolve_step(target)
+        if portfolio_state:
+            self.positions = list(portfolio_state['positions'])
+            self.entry_prices = list(portfolio_state['entry_prices'])
+        else:
+            self.positions = [0] * self.n_agents
+            self.entry_prices = [0.0] * self.n_agents
+        self.episode_returns = []
+
+        obs, state = self._get_obs_and_state()
+        return obs, {"global_state": state}
+
+    def snapshot(self):
+        """restore()로 되돌릴 수 있는 에피소드 상태 (복사본)"""
+        return copy.deepcopy({
+            'current_step': self.current_step,
+            'positions': self.positions,
+            'entry_prices': self.entry_prices,
+            'episode_returns': self.episode_returns,
+        })
+
+    def restore(self, snap):
+        """snapshot() 시점으로 복원. return: (obs, {"global_state": state})"""
+        snap = copy.deepcopy(snap)
+        self.current_step = snap['current_step']
+        self.positions = snap['positions']
+        self.entry_prices = snap['entry_prices']
+        self.episode_returns = snap['episode_returns']
+
+        obs, state = self._get_obs_and_state()
+        return obs, {"global_state": state}
+
     def get_state(self):
         _, state = self._get_obs_and_state()
         return state
     
     def step(self, actions):
-        old_price = self.prices.iloc[self.current_step + self.window_size - 1]
+        old_price = self._price_arr[self.current_step + self.window_size - 1]
         self.current_step += 1
-        new_price = self.prices.iloc[self.current_step + self.window_size - 1]
+        new_price = self._price_arr[self.current_step + self.window_size - 1]
         
         price_return = (new_price - old_price) / (old_price + 1e-9)
         
@@ -0,0 +1,184 @@
+# fundamentals.py
+"""
+시점 기준(point-in-time) 재무 지표 저장소.
+
+- 재무 지표(ROA, DebtRatio, AnalystRating)를 "이 날부터 알 수 있는 값" 단위의
+  이벤트로만 보관한다. (컬럼별 유효일 배열 + 값 배열, 일별로 펼치지 않음)
+    ROA / DebtRatio : 분기 말일 + 공시 지연(기본 2개월)
+    AnalystRating   : 추천 정보 시점
+- 거래일 인덱스에 맞추는 것은 np.searchsorted 한 번 (as-of, 그날 포함 직전 이벤트).
+  resample('D').ffill() + merge_asof로 일별 프레임을 만드는 것과 같은 값이고,
+  종목 수가 많아도 이벤트 수(분기 수)만큼만 메모리를 쓴다.
+- 컬럼마다 NaN인 이벤트는 건너뛰고 그 전 값을 쓴다. 첫 이벤트 전은 fill 값(기본 0).
+
+(marl_3agent / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+FUNDAMENTAL_COLUMNS = ("ROA", "DebtRatio", "AnalystRating")
+
+# 분기 재무제표가 공시되어 실제로 쓸 수 있게 되기까지의 지연
+PUBLICATION_LAG_MONTHS = 2
+
+
+def _to_naive_datetime(index: Iterable[Any]) -> pd.DatetimeIndex:
+    """tz 없는 ns 단위 DatetimeIndex (이미 DatetimeIndex면 변환 없이)"""
+    idx = index if isinstance(index, pd.DatetimeIndex) else pd.DatetimeIndex(pd.to_datetime(index))
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.as_unit("ns")
+
+
+# ============================================================
+# 1. 이벤트 저장소
+# ============================================================
+
+class FundamentalsIndex:
+    """
+    컬럼별 (유효일, 값) 이벤트 목록.
+    dates[col]는 오름차순 datetime64[ns], values[col]는 같은 길이의 float64. (NaN 없음)
+    """
+
+    def __init__(self, dates: Dict[str, np.ndarray], values: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.values = values
+
+    @property
+    def columns(self) -> list:
+        return list(self.dates)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FundamentalsIndex":
+        """인덱스 = 유효일, 컬럼 = 지표. 같은 날짜가 여러 번 있으면 마지막 행을 쓴다."""
+        idx = _to_naive_datetime(df.index)
+        order = np.argsort(idx.asi8, kind="stable")
+        stamps = idx.asi8[order]
+        dates, values = {}, {}
+        for col in df.columns:
+            v = df[col].to_numpy(dtype=np.float64)[order]
+            keep = ~np.isnan(v)
+            d, v = stamps[keep], v[keep]
+            # 같은 날짜는 마지막 값만 (searchsorted side='right'도 마지막을 집는다)
+            last = np.append(d[1:] != d[:-1], True) if len(d) else np.zeros(0, dtype=bool)
+            dates[str(col)] = d[last].view("datetime64[ns]")
+            values[str(col)] = v[last]
+        return cls(dates, values)
+
+    def merge(self, other: "FundamentalsIndex") -> "FundamentalsIndex":
+        """컬럼을 합친다. (같은 컬럼이 있으면 other 쪽)"""
+        return FundamentalsIndex({**self.dates, **other.dates}, {**self.values, **other.values})
+
+    def asof(
+        self,
+        index: Iterable[Any],
+        columns: Optional[Sequence[str]] = None,
+        fill: float = 0.0,
+    ) -> pd.DataFrame:
+        """
+        거래일 index 각 날짜에 그날까지 유효해진 마지막 값을 붙인 DataFrame.
+        이벤트가 아직 없는 날과 저장소에 없는 컬럼은 fill.
+        """
+        idx = _to_naive_datetime(index)
+        target = idx.asi8.view("datetime64[ns]")
+        out = {}
+        for col in (columns or self.columns):
+            d = self.dates.get(col)
+            if d is None or len(d) == 0:
+                out[col] = np.full(len(target), fill)
+                continue
+            pos = np.searchsorted(d, target, side="right") - 1
+            out[col] = np.where(pos >= 0, self.values[col][np.maximum(pos, 0)], fill)
+        return pd.DataFrame(out, index=index if isinstance(index, pd.Index) else idx)
+
+
+# ============================================================
+# 2. yfinance 재무 데이터 → 이벤트
+# ============================================================
+
+def balance_sheet_events(qf: Any, qbs: Any, lag_months: int = PUBLICATION_LAG_MONTHS) -> pd.DataFrame:
+    """
+    분기 손익계산서(qf) / 재무상태표(qbs)로 ROA, DebtRatio 이벤트를 만든다.
+    유효일 = 분기 말일 + lag_months. 필요한 항목이 없으면 ValueError.
+    """
+    if qf is None or qbs is None or qf.empty or qbs.empty \
+            or 'Net Income' not in qf.index or 'Total Assets' not in qbs.index:
+        raise ValueError("재무제표에 Net Income / Total Assets 가 없습니다.")
+
+    net_income = qf.loc['Net Income'].T
+    total_assets = qbs.loc['Total Assets'].T
+    # Total Liabilities Net Minority Interest가 없을 경우 Total Liab 사용
+    liab_key = 'Total Liabilities Net Minority Interest'
+    if liab_key not in qbs.index:
+        liab_key = 'Total Liab'
+    if liab_key not in qbs.index:
+        print("경고: 부채(Total Liab) 정보를 찾을 수 없습니다.")
+        total_liab = pd.Series(0.0, index=total_assets.index)
+    else:
+        total_liab = qbs.loc[liab_key].T
+
+    events = pd.DataFrame(index=total_assets.index)
+    events['ROA'] = net_income / total_assets
+    events['DebtRatio'] = total_liab / total_assets
+    events.index = _to_naive_datetime(events.index) + pd.DateOffset(months=lag_months)
+    return events.astype(np.float64)
+
+
+def analyst_rating_events(rec: Any) -> pd.DataFrame:
+    """
+    애널리스트 추천 정보로 AnalystRating 이벤트를 만든다.
+    (강력매수 1.5 + 매수 1.0 - 매도 1.0 - 강력매도 1.5) / 전체 의견 수
+    """
+    if rec is None or rec.empty:
+        raise ValueError("추천 정보 데이터가 비어있음")
+
+    # yfinance 최신 버전에 따라 컬럼 이름이 다름 ('strongBuy' or 'strong_buy')
+    required_cols_snake = ['strong_buy', 'buy', 'hold', 'sell', 'strong_sell']
+    required_cols_camel = ['strongBuy', 'buy', 'hold', 'sell', 'strongSell']
+    if all(col in rec.columns for col in required_cols_snake):
+        target_cols = required_cols_snake
+    elif all(col in rec.columns for col in required_cols_camel):
+        target_cols = required_cols_camel
+    else:
+        raise ValueError(f"필요한 컬럼({required_cols_snake} 또는 {required_cols_camel})이 없음.")
+
+    score_buy = (rec[target_cols[0]] * 1.5) + (rec[target_cols[1]] * 1.0)
+    score_sell = (rec[target_cols[3]] * 1.0) + (rec[target_cols[4]] * 1.5)
+    total_count = rec[target_cols].sum(axis=1)
+
+    events = pd.DataFrame(index=_to_naive_datetime(rec.index))
+    events['AnalystRating'] = ((score_buy - score_sell) / (total_count + 1e-9)).to_numpy(dtype=np.float64)
+    return events.fillna(0.0)
+
+
+def build_fundamentals_index(
+    fundamentals: Dict[str, Any],
+    lag_months: int = PUBLICATION_LAG_MONTHS,
+) -> FundamentalsIndex:
+    """
+    DataProcessor._fetch_fundamentals() 결과로 FundamentalsIndex를 만든다.
+    가져오지 못한 항목은 경고만 출력하고 빈 컬럼으로 둔다. (asof에서 0)
+    """
+    index = FundamentalsIndex({c: np.zeros(0, dtype="datetime64[ns]") for c in FUNDAMENTAL_COLUMNS},
+                              {c: np.zeros(0) for c in FUNDAMENTAL_COLUMNS})
+
+    try:
+        qf, qbs = fundamentals.get('quarterly_financials'), fundamentals.get('quarterly_balance_sheet')
+        events = balance_sheet_events(qf, qbs, lag_months)
+        print(f"... 재무제표에 {lag_months}개월 공시 지연(lag) 적용 ...")
+        index = index.merge(FundamentalsIndex.from_frame(events))
+    except ValueError:
+        print("경고: 재무제표(ROA, DebtRatio)를 가져올 수 없습니다. 0으로 채웁니다.")
+    except Exception as e:
+        print(f"경고: 재무제표 처리 중 오류({e}). 0으로 채웁니다.")
+
+    try:
+        index = index.merge(FundamentalsIndex.from_frame(analyst_rating_events(fundamentals.get('recommendations'))))
+    except Exception as e:
+        print(f"경고: 애널리스트 추천 정보({e})를 가져올 수 없습니다. 0으로 채웁니다.")
+
+    return index
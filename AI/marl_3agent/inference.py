@@ -11,7 +11,7 @@ from utils import convert_joint_action_to_signal, generate_ai_explanation, print
 def predict_today():
     # 1. 데이터 준비 (가장 최신 데이터 가져오기)
     processor = DataProcessor()
-    (features_df, _, _, a0_cols, a1_cols, a2_cols) = processor.process()
+    (features_df, original_prices, _, a0_cols, a1_cols, a2_cols) = processor.process()
     
     # 2. 스케일러 로드 및 적용
     try:
@@ -27,7 +27,7 @@ def predict_today():
     
     # 3. 모델 로드
     # Dummy Env를 만들어 차원 정보 획득
-    dummy_env = MARLStockEnv(norm_features.iloc[-50:], None, a0_cols, a1_cols, a2_cols)
+    dummy_env = MARLStockEnv(norm_features.iloc[-50:], original_prices.iloc[-50:], a0_cols, a1_cols, a2_cols)
     learner = QMIX_Learner(
         [dummy_env.observation_dim_0, dummy_env.observation_dim_1, dummy_env.observation_dim_2],
         dummy_env.action_dim, dummy_env.state_dim, DEVICE
@@ -37,13 +37,9 @@ def predict_today():
     
     # 4. 마지막 시점의 Observation 생성
     # (Environment의 내부 로직을 빌려 사용)
-    last_obs_dict, last_state_info = dummy_env.reset()
-    # 실제로는 reset이 아니라 마지막 데이터를 넣어야 함.
-    # Env 구조상 마지막 step으로 강제 이동하거나 직접 텐서를 만들어야 함.
-    # 여기서는 가장 간단하게 Env를 마지막 시점으로 이동시킴
-    dummy_env.current_step = len(dummy_env.df) - WINDOW_SIZE - 1
-    obs_dict, info = dummy_env._get_obs_and_state()
-    global_state = info
+    # 마지막 날짜에서 끝나는 창으로 바로 이동 (무포지션)
+    obs_dict, info = dummy_env.seek(dummy_env.df.index[-1])
+    global_state = info["global_state"]
     
     # 5. 예측 수행 (Q-value 계산)
     action_map = {0: "Long", 1: "Hold", 2: "Short"}
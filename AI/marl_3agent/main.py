@@ -6,10 +6,12 @@ import time
 
 from config import (
     DEVICE, N_AGENTS, WINDOW_SIZE, BUFFER_SIZE, BATCH_SIZE, 
-    TARGET_UPDATE_FREQ, NUM_EPISODES, EPSILON_START, EPSILON_END, EPSILON_DECAY_STEPS, WARMUP_STEPS
+    TARGET_UPDATE_FREQ, NUM_EPISODES, EPSILON_START, EPSILON_END, EPSILON_DECAY_STEPS, WARMUP_STEPS,
+    NUM_ENVS, VEC_ENV_SEED, UPDATES_PER_ENV_STEP
 )
 from data_processor import DataProcessor
 from environment import MARLStockEnv
+from vec_environment import VecMARLStockEnv
 from qmix_model import QMIX_Learner
 from replay_buffer import ReplayBuffer
 
@@ -110,6 +112,16 @@ def print_ui_output(
     print("=============================================")
 
 
+def epsilon_at(total_steps):
+    """Warmup 동안 1.0, 이후 선형 감소 Epsilon"""
+    if total_steps <= WARMUP_STEPS:
+        return 1.0
+    return max(
+        EPSILON_END, 
+        EPSILON_START - (EPSILON_START - EPSILON_END) * (total_steps - WARMUP_STEPS) / EPSILON_DECAY_STEPS
+    )
+
+
 def test_model(learner, test_env, episodes=5):
     """모델 성능을 테스트하는 함수"""
     total_rewards = []
@@ -178,6 +190,15 @@ def main():
         agent_0_cols, agent_1_cols, agent_2_cols,
         n_agents=N_AGENTS, window_size=WINDOW_SIZE
     )
+    # NUM_ENVS > 1: 학습 환경 N개를 배열로 동시에 진행 (에피소드 1번 = 환경 N개의 에피소드)
+    train_venv = None
+    if NUM_ENVS > 1:
+        train_venv = VecMARLStockEnv(
+            train_features, train_prices,
+            agent_0_cols, agent_1_cols, agent_2_cols,
+            num_envs=NUM_ENVS, n_agents=N_AGENTS, window_size=WINDOW_SIZE,
+            random_start=True, seed=VEC_ENV_SEED
+        )
     test_env = MARLStockEnv(
         test_features, test_prices, 
         agent_0_cols, agent_1_cols, agent_2_cols,
@@ -218,57 +239,98 @@ def main():
     print(f"--- 조기 종료: {validation_interval} 에피소드마다 검증, patience={patience} ---")
     
     for i_episode in range(NUM_EPISODES):
-        obs_dict, info = train_env.reset(initial_portfolio=None) 
-        global_state = info["global_state"]
         episode_team_reward = 0.0
         episode_loss = 0.0
         episode_q_val = 0.0
         train_count = 0
         
-        done = False
-        
-        while not done:
-            total_steps += 1
-            
-            # [개선] Warmup phase - random exploration
-            if total_steps <= WARMUP_STEPS:
-                epsilon = 1.0
-                if total_steps == WARMUP_STEPS:
+        if train_venv is not None:
+            obs_batch, info = train_venv.reset()
+            state_batch = info["global_state"]
+
+            while not train_venv.done.all():
+                prev_steps = total_steps
+                n_active = int((~train_venv.done).sum())  # 이번 틱에 진행하는 환경-스텝 수
+                total_steps += n_active
+                if not warmup_done and total_steps >= WARMUP_STEPS:
                     print(f"Warmup complete! Starting policy learning...")
                     warmup_done = True
-            else:
-                # [개선] 선형 감소 Epsilon
-                epsilon = max(
-                    EPSILON_END, 
-                    EPSILON_START - (EPSILON_START - EPSILON_END) * (total_steps - WARMUP_STEPS) / EPSILON_DECAY_STEPS
-                )
+                epsilon = epsilon_at(total_steps)
+
+                # 에이전트별 forward 1번으로 환경 N개의 행동 선택
+                actions_batch = learner.select_actions_batch(obs_batch, epsilon)
+                next_obs_batch, rewards_batch, dones_batch, _, info = train_venv.step(actions_batch)
+                next_state_batch = info["global_state"]
+
+                buffer.add_batch(state_batch, obs_batch, actions_batch, rewards_batch,
+                                 next_state_batch, next_obs_batch, dones_batch, mask=info["active"])
+
+                # 틱마다 업데이트 횟수는 단일 환경과 같고 배치만 진행한 환경 수배
+                #  → 환경-스텝당 학습에 쓰는 샘플 수(UPDATES_PER_ENV_STEP x BATCH_SIZE)는 그대로,
+                #    learner forward/backward 횟수는 환경 수와 무관
+                batch_size = BATCH_SIZE * n_active
+                if warmup_done and len(buffer) >= batch_size * 2:
+                    num_updates = max(1, round(UPDATES_PER_ENV_STEP))
+
+                    for _ in range(num_updates):
+                        loss, q_val = learner.train(buffer, batch_size)
+                        if loss is not None:
+                            episode_loss += loss
+                            episode_q_val += q_val
+                            train_count += 1
+
+                # 에피소드 보상은 환경 평균
+                episode_team_reward += float(rewards_batch.sum()) / train_venv.num_envs
+                obs_batch = next_obs_batch
+                state_batch = next_state_batch
+
+                # total_steps가 N씩 늘어나므로 TARGET_UPDATE_FREQ 배수를 지났는지로 판단
+                if warmup_done and total_steps // TARGET_UPDATE_FREQ > prev_steps // TARGET_UPDATE_FREQ:
+                    learner.update_target_networks()
+        else:
+            obs_dict, info = train_env.reset(initial_portfolio=None) 
+            global_state = info["global_state"]
+            done = False
+        
+            while not done:
+                total_steps += 1
+            
+                # [개선] Warmup phase - random exploration
+                if total_steps <= WARMUP_STEPS:
+                    epsilon = 1.0
+                    if total_steps == WARMUP_STEPS:
+                        print(f"Warmup complete! Starting policy learning...")
+                        warmup_done = True
+                else:
+                    # [개선] 선형 감소 Epsilon
+                    epsilon = epsilon_at(total_steps)
             
-            actions_dict = learner.select_actions(obs_dict, epsilon)
-            next_obs_dict, rewards_dict, dones_dict, _, info = train_env.step(actions_dict)
+                actions_dict = learner.select_actions(obs_dict, epsilon)
+                next_obs_dict, rewards_dict, dones_dict, _, info = train_env.step(actions_dict)
             
-            next_global_state = info["global_state"]
-            team_reward = rewards_dict['agent_0']
-            done = dones_dict['__all__']
+                next_global_state = info["global_state"]
+                team_reward = rewards_dict['agent_0']
+                done = dones_dict['__all__']
             
-            buffer.add(global_state, obs_dict, actions_dict, team_reward, 
-                       next_global_state, next_obs_dict, done)
+                buffer.add(global_state, obs_dict, actions_dict, team_reward, 
+                           next_global_state, next_obs_dict, done)
                        
-            if warmup_done and len(buffer) >= BATCH_SIZE * 2:
-                num_updates = 2 
+                if warmup_done and len(buffer) >= BATCH_SIZE * 2:
+                    num_updates = max(1, round(UPDATES_PER_ENV_STEP))
                 
-                for _ in range(num_updates):
-                    loss, q_val = learner.train(buffer)
-                    if loss is not None:
-                        episode_loss += loss
-                        episode_q_val += q_val
-                        train_count += 1
-            
-            episode_team_reward += team_reward
-            obs_dict = next_obs_dict
-            global_state = next_global_state
-
-            if warmup_done and total_steps % TARGET_UPDATE_FREQ == 0:
-                learner.update_target_networks()
+                    for _ in range(num_updates):
+                        loss, q_val = learner.train(buffer)
+                        if loss is not None:
+                            episode_loss += loss
+                            episode_q_val += q_val
+                            train_count += 1
+            
+                episode_team_reward += team_reward
+                obs_dict = next_obs_dict
+                global_state = next_global_state
+
+                if warmup_done and total_steps % TARGET_UPDATE_FREQ == 0:
+                    learner.update_target_networks()
         
         episode_rewards.append(episode_team_reward)
         if train_count > 0:
@@ -0,0 +1,489 @@
+# market_data.py
+"""
+가격 데이터 공급자(MarketDataSource) 모음.
+
+- YFinanceSource  : 기존처럼 yfinance에서 받음 (네트워크 필요, 로컬 캐시 대상)
+- SnapshotSource  : <dir>/<ticker>.parquet|csv 로 저장해 둔 스냅샷을 읽음 (오프라인)
+- SyntheticSource : 시드 고정 합성 가격 (국면 전환 GBM 시장 + 베타 종목 + VIX)
+
+모든 공급자는 fetch(ticker, start, end)로
+DatetimeIndex(tz-naive) + ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+형태의 일봉 DataFrame을 [start, end) 구간으로 돌려준다.
+
+make_source()에 config 값("yfinance" / "snapshot:<dir>" / "synthetic" 또는 dict)을
+넘겨서 만든다. 여러 티커는 fetch_many()로 스레드 풀에서 동시에 받는다.
+(a2c_11.29 / marl_3agent / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yfinance as yf
+    _HAS_YFINANCE = True
+except Exception:
+    _HAS_YFINANCE = False
+
+try:
+    from yfinance.exceptions import YFPricesMissingError
+except Exception:
+    YFPricesMissingError = None
+
+# YFPricesMissingError 중 "그 구간에 가격 없음"(주말/휴장 tail 등)만 빈 결과로 바꾼다.
+#  - debug_info(요청 구간 설명)가 괄호 하나뿐일 때만: " (1d 2024-09-16 -> 2024-09-18)" / " (period=5d)"
+#  - Yahoo 오류 응답 / HTTP 상태가 덧붙었거나 debug_info가 없거나 형식이 다르면 일시적 오류로 보고
+#    call_with_retry로 재시도 (모르는 오류를 빈 결과로 바꾸면 data_cache에 빈 구간으로 기록되므로)
+#  - 그 밖의 예외(YFTickerMissingError 전체, 속도 제한, 네트워크 오류 ...)는 그대로 재시도 대상
+_YF_NO_DATA_DEBUG = re.compile(r"^\s*\([^()]*\)\s*$")
+
+
+def _is_no_data(e: Exception) -> bool:
+    if YFPricesMissingError is None or type(e) is not YFPricesMissingError:
+        return False
+    debug_info = getattr(e, "debug_info", None)
+    return isinstance(debug_info, str) and _YF_NO_DATA_DEBUG.match(debug_info) is not None
+
+
+def _has_weekday(start: Optional[str], end: Optional[str]) -> bool:
+    """[start, end)에 평일이 있는지 (없으면 봉이 없는 것이 정상이라 요청하지 않는다)"""
+    if start is None or end is None:
+        return True
+    return len(pd.bdate_range(pd.Timestamp(start), pd.Timestamp(end) - timedelta(days=1))) > 0
+
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def _to_ts(date: Optional[str], default: pd.Timestamp) -> pd.Timestamp:
+    return pd.Timestamp(date) if date is not None else default
+
+
+def _slice(df: pd.DataFrame, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index < pd.Timestamp(end)]
+    return df
+
+
+def _safe_name(ticker: str) -> str:
+    """'^KS11' -> '_KS11', '005930.KS' -> '005930_KS' (data_cache와 같은 규칙)"""
+    return re.sub(r"[^0-9A-Za-z_-]", "_", ticker)
+
+
+# ============================================================
+# 1. 동시 다운로드 / 재시도 / 전역 속도 제한
+# ============================================================
+
+class RateLimiter:
+    """
+    토큰 버킷 속도 제한기 (스레드 안전).
+    초당 rate개씩 토큰이 차고, 최대 burst개까지 몰아서 호출할 수 있다.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# yfinance 호출은 프로세스 전체에서 이 제한기 하나를 같이 쓴다.
+YF_RATE_LIMITER = RateLimiter(rate=2.0, burst=4)
+
+# 재시도 지터용 (전역 random 상태를 건드리면 학습 시드 재현성이 깨짐)
+_jitter = random.Random()
+
+
+def call_with_retry(
+    fn: Callable[[], Any],
+    retries: int = 3,
+    backoff: float = 1.0,
+    max_backoff: float = 30.0,
+    limiter: Optional[RateLimiter] = None,
+    desc: str = "",
+) -> Any:
+    """
+    fn()을 호출하고, 예외가 나면 backoff * 2^k 초(지터 포함)만큼 쉬었다가
+    최대 retries번 다시 시도한다. 매 시도 전에 limiter 토큰을 받는다.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = min(max_backoff, backoff * (2 ** attempt)) * _jitter.uniform(0.5, 1.0)
+            print(f"[market_data] {desc} 실패({e}). {delay:.1f}초 후 재시도 ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+
+def fetch_many(
+    tickers: Iterable[str],
+    fetch_fn: Callable[[str], pd.DataFrame],
+    max_workers: int = 4,
+) -> Dict[str, pd.DataFrame]:
+    """
+    fetch_fn(ticker)를 티커마다 스레드 풀에서 동시에 호출해서 {ticker: df}로 반환.
+    전체 소요 시간이 티커별 시간의 합이 아니라 최댓값 수준이 된다.
+    (하나라도 실패하면 그 예외를 그대로 올린다.)
+    """
+    uniq: List[str] = list(dict.fromkeys(tickers))
+    if max_workers <= 1 or len(uniq) <= 1:
+        return {t: fetch_fn(t) for t in uniq}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(uniq)), thread_name_prefix="fetch") as ex:
+        futures = {t: ex.submit(fetch_fn, t) for t in uniq}
+        return {t: f.result() for t, f in futures.items()}
+
+
+# ============================================================
+# 2. 공통 인터페이스
+# ============================================================
+
+class MarketDataSource:
+    """가격/재무 데이터 공급자 기본 클래스."""
+
+    name = "base"
+    # True면 data_cache의 로컬 캐시를 거쳐서 호출한다. (네트워크 공급자만)
+    cacheable = False
+
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def fundamentals(self, ticker: str, name: str) -> Any:
+        """
+        yf.Ticker의 속성 이름(quarterly_financials, quarterly_balance_sheet,
+        recommendations ...)에 해당하는 데이터. 없으면 None.
+        """
+        return None
+
+
+# ============================================================
+# 3. yfinance
+# ============================================================
+
+class YFinanceSource(MarketDataSource):
+    """
+    yf.Ticker(t).history()로 받는다.
+    (yf.download는 모듈 전역 딕셔너리에 결과를 모아서 여러 스레드에서 동시에
+     부르면 서로 결과를 지워 버리므로, 티커별 객체를 쓰는 history를 사용)
+
+    네트워크 호출마다 전역 속도 제한(YF_RATE_LIMITER)을 거치고,
+    실패하면 지수 백오프로 retries번까지 재시도한다.
+    """
+
+    name = "yfinance"
+    cacheable = True
+
+    def __init__(
+        self,
+        auto_adjust: bool = False,
+        retries: int = 3,
+        backoff: float = 1.0,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        if not _HAS_YFINANCE:
+            raise RuntimeError(
+                "yfinance가 설치되어 있지 않습니다. pip install yfinance 로 설치하거나\n"
+                "data_source를 snapshot / synthetic 으로 바꾸세요."
+            )
+        self.auto_adjust = auto_adjust
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter if limiter is not None else YF_RATE_LIMITER
+        self._tickers: Dict[str, Any] = {}
+        self._tickers_lock = threading.Lock()
+
+    def _ticker(self, ticker: str) -> Any:
+        with self._tickers_lock:
+            if ticker not in self._tickers:
+                self._tickers[ticker] = yf.Ticker(ticker)
+            return self._tickers[ticker]
+
+    def _retry(self, fn: Callable[[], Any], desc: str) -> Any:
+        return call_with_retry(fn, retries=self.retries, backoff=self.backoff,
+                               limiter=self.limiter, desc=desc)
+
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        if not _has_weekday(start, end):
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+
+        def history() -> pd.DataFrame:
+            try:
+                return self._ticker(ticker).history(
+                    start=start, end=end, interval="1d", auto_adjust=self.auto_adjust,
+                    actions=False, raise_errors=True,
+                )
+            except Exception as e:
+                if not _is_no_data(e):
+                    raise
+                return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        df = self._retry(history, desc=f"{ticker} 가격")
+        # yf.download(ignore_tz=True)와 같게 거래소 현지 날짜 그대로 tz만 제거
+        if getattr(df.index, "tz", None) is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = "Date"
+        return df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+
+    def fundamentals(self, ticker: str, name: str) -> Any:
+        return self._retry(lambda: getattr(self._ticker(ticker), name), desc=f"{ticker} {name}")
+
+
+# ============================================================
+# 4. 로컬 스냅샷 (CSV / Parquet)
+# ============================================================
+
+class SnapshotSource(MarketDataSource):
+    """
+    <root>/<ticker>.parquet 또는 <root>/<ticker>.csv 를 읽는다.
+    (티커 이름은 _safe_name 규칙: '^VIX' -> '_VIX.csv')
+
+    재무 데이터는 <root>/<ticker>.<name>.pkl 이 있으면 읽고 없으면 None.
+    export_snapshot()으로 다른 공급자의 데이터를 이 형식으로 저장할 수 있다.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, root: str = "data_snapshot"):
+        self.root = root
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def _load(self, ticker: str) -> pd.DataFrame:
+        if ticker in self._frames:
+            return self._frames[ticker]
+
+        base = os.path.join(self.root, _safe_name(ticker))
+        if os.path.exists(base + ".parquet"):
+            df = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            df = pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+        else:
+            raise FileNotFoundError(f"{ticker} 스냅샷이 없습니다: {base}.parquet|csv")
+
+        idx = pd.to_datetime(df.index)
+        if getattr(idx, "tz", None) is not None:
+            idx = idx.tz_localize(None)
+        df.index = idx
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        self._frames[ticker] = df
+        return df
+
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        return _slice(self._load(ticker), start, end).copy()
+
+    def fundamentals(self, ticker: str, name: str) -> Any:
+        path = os.path.join(self.root, f"{_safe_name(ticker)}.{name}.pkl")
+        if not os.path.exists(path):
+            return None
+        return pd.read_pickle(path)
+
+
+def export_snapshot(
+    source: MarketDataSource,
+    tickers: Iterable[str],
+    start: Optional[str],
+    end: Optional[str],
+    root: str = "data_snapshot",
+    fundamentals: Iterable[str] = (),
+) -> None:
+    """source에서 받은 데이터를 SnapshotSource가 읽는 형식으로 저장."""
+    os.makedirs(root, exist_ok=True)
+    for t in tickers:
+        base = os.path.join(root, _safe_name(t))
+        source.fetch(t, start, end).to_csv(base + ".csv")
+        for name in fundamentals:
+            value = source.fundamentals(t, name)
+            if value is not None:
+                pd.to_pickle(value, f"{base}.{name}.pkl")
+
+
+# ============================================================
+# 5. 합성 데이터 (시드 고정)
+# ============================================================
+
+class SyntheticSource(MarketDataSource):
+    """
+    네트워크 없이 재현 가능한 일봉을 만든다.
+
+    - 시장 요인: 평온/위기 2-국면 마르코프 전환 GBM (시드만으로 결정)
+    - 지수 티커('^'로 시작, VIX 제외): 시장 요인 그대로
+    - 일반 종목: beta * 시장 수익률 + 종목 고유 잡음 (티커별로 다른 시드)
+    - VIX: 국면별 목표 수준으로 되돌아가는 로그 OU 과정, 시장 급락 시 상승
+
+    ORIGIN부터 영업일 단위로 생성한 뒤 잘라서 돌려주므로,
+    같은 시드/티커면 요청 구간과 관계없이 같은 날짜에 같은 값이 나온다.
+    """
+
+    name = "synthetic"
+    ORIGIN = pd.Timestamp("2000-01-03")
+
+    # (연 기대수익률, 연 변동성) - 0: 평온, 1: 위기
+    REGIMES = ((0.08, 0.15), (-0.20, 0.40))
+    # 일별 국면 전환 확률 (평온→위기, 위기→평온)
+    P_SWITCH = (0.01, 0.05)
+
+    def __init__(self, seed: int = 42, beta: float = 1.1, idio_vol: float = 0.20):
+        self.seed = int(seed)
+        self.beta = beta
+        self.idio_vol = idio_vol
+        # fetch_many 스레드들이 같이 쓰므로 (길이, 배열)은 락 안에서 한 번에 바꾼다
+        self._market: Optional[Dict[str, np.ndarray]] = None
+        self._market_lock = threading.Lock()
+
+    # ---------- 내부: 난수 스트림 ----------
+    def _rng(self, *keys: Union[int, str]) -> np.random.Generator:
+        words = [self.seed] + [zlib.crc32(str(k).encode("utf-8")) for k in keys]
+        return np.random.default_rng(np.random.SeedSequence(words))
+
+    def _dates(self, end: pd.Timestamp) -> pd.DatetimeIndex:
+        return pd.bdate_range(self.ORIGIN, end - timedelta(days=1))
+
+    def _market_factor(self, dates: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+        """
+        시장 국면 / 일 수익률 (필요한 길이만큼 늘려가며 재사용, 스레드 안전).
+        항상 복사본을 돌려준다. (호출한 쪽이 고쳐도 공유 배열은 그대로)
+        """
+        n = len(dates)
+        with self._market_lock:
+            if self._market is None or len(self._market["ret"]) < n:
+                self._market = self._build_market(n)
+            return {k: v[:n].copy() for k, v in self._market.items()}
+
+    def _build_market(self, n: int) -> Dict[str, np.ndarray]:
+        u = self._rng("regime").random(n)
+        z = self._rng("market").standard_normal(n)
+
+        regime = np.zeros(n, dtype=np.int8)
+        for t in range(1, n):
+            prev = regime[t - 1]
+            regime[t] = (1 - prev) if u[t] < self.P_SWITCH[prev] else prev
+
+        mu = np.array([r[0] for r in self.REGIMES])[regime] / 252.0
+        sig = np.array([r[1] for r in self.REGIMES])[regime] / np.sqrt(252.0)
+        ret = mu - 0.5 * sig ** 2 + sig * z
+
+        return {"regime": regime, "ret": ret, "z": z}
+
+    def _noise(self, ticker: str, part: str, n: int) -> np.ndarray:
+        # 구성 요소마다 별도 스트림 → 생성 길이가 달라도 앞부분 값은 그대로
+        return self._rng("ticker", ticker, part).standard_normal(n)
+
+    def _ohlcv(self, ticker: str, close: np.ndarray, base_volume: float) -> Dict[str, np.ndarray]:
+        n = len(close)
+        prev = np.concatenate([[close[0]], close[:-1]])
+        open_ = prev * np.exp(0.003 * self._noise(ticker, "open", n))
+        high = np.maximum(open_, close) * np.exp(np.abs(0.008 * self._noise(ticker, "high", n)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(0.008 * self._noise(ticker, "low", n)))
+        move = np.abs(np.log(close / prev))
+        volume = base_volume * np.exp(0.3 * self._noise(ticker, "volume", n)) * (1.0 + 20.0 * move)
+        return {
+            "Open": open_, "High": high, "Low": low,
+            "Close": close, "Adj Close": close.copy(),
+            "Volume": np.round(volume),
+        }
+
+    # ---------- fetch ----------
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        today = pd.Timestamp(datetime.now().date())
+        end_ts = _to_ts(end, today + timedelta(days=1))
+        dates = self._dates(end_ts)
+        if len(dates) == 0:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        market = self._market_factor(dates)
+        n = len(dates)
+        upper = ticker.upper()
+
+        if "VIX" in upper:
+            # 로그 OU: 평온 15, 위기 32 근처로 회귀 + 시장 충격과 음의 상관
+            target = np.log(np.where(market["regime"] == 1, 32.0, 15.0))
+            eps = self._noise(ticker, "ret", n)
+            x = np.empty(n)
+            x[0] = target[0]
+            for t in range(1, n):
+                x[t] = x[t - 1] + 0.08 * (target[t] - x[t - 1]) + 0.06 * eps[t] - 0.05 * market["z"][t]
+            close = np.exp(x)
+            cols = self._ohlcv(ticker, close, base_volume=0.0)
+        elif upper.startswith("^"):
+            close = 2000.0 * np.exp(np.cumsum(market["ret"]))
+            cols = self._ohlcv(ticker, close, base_volume=5e8)
+        else:
+            idio = self.idio_vol / np.sqrt(252.0)
+            ret = self.beta * market["ret"] + idio * self._noise(ticker, "ret", n) - 0.5 * idio ** 2
+            close = 50000.0 * np.exp(np.cumsum(ret))
+            cols = self._ohlcv(ticker, close, base_volume=1e7)
+
+        df = pd.DataFrame(cols, index=dates, columns=OHLCV_COLUMNS)
+        df.index.name = "Date"
+        return _slice(df, start, end)
+
+
+# ============================================================
+# 6. 설정값 → 공급자
+# ============================================================
+
+SourceSpec = Union[None, str, Dict[str, Any], MarketDataSource]
+
+
+def make_source(spec: SourceSpec = None, yf_kwargs: Optional[Dict[str, Any]] = None) -> MarketDataSource:
+    """
+    spec 예시:
+      None / "yfinance"
+      "snapshot:data_snapshot"          (콜론 뒤는 스냅샷 폴더)
+      "synthetic" / "synthetic:7"       (콜론 뒤는 시드)
+      {"type": "snapshot", "snapshot_dir": "data_snapshot"}
+      {"type": "synthetic", "seed": 42}
+      MarketDataSource 인스턴스 (그대로 사용)
+
+    yf_kwargs는 YFinanceSource일 때 생성자에 넘긴다. (auto_adjust, retries, backoff ...)
+    """
+    if isinstance(spec, MarketDataSource):
+        return spec
+
+    if spec is None:
+        opts: Dict[str, Any] = {"type": "yfinance"}
+    elif isinstance(spec, str):
+        kind, _, arg = spec.partition(":")
+        opts = {"type": kind.strip()}
+        if arg and opts["type"] == "snapshot":
+            opts["snapshot_dir"] = arg
+        elif arg and opts["type"] == "synthetic":
+            opts["seed"] = int(arg)
+    else:
+        opts = dict(spec)
+
+    kind = str(opts.get("type", "yfinance")).lower()
+    if kind == "yfinance":
+        return YFinanceSource(**(yf_kwargs or {}))
+    if kind == "snapshot":
+        return SnapshotSource(opts.get("snapshot_dir", "data_snapshot"))
+    if kind == "synthetic":
+        return SyntheticSource(seed=opts.get("seed", 42))
+    raise ValueError(f"알 수 없는 data_source: {kind} (yfinance / snapshot / synthetic)")
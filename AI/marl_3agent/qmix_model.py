@@ -5,6 +5,7 @@ import copy
 import random
 import numpy as np
 from config import N_AGENTS, LR, TAU, MIXER_EMBED_DIM, BATCH_SIZE, GAMMA
+from feature_store import DTYPE
 
 # --- [개선] Dueling DQN 구조 (최적화 버전) ---
 class Q_Net(nn.Module):
@@ -63,12 +64,28 @@ class DQN_Agent:
         self.steps_done += 1
         if random.random() > epsilon:
             with torch.no_grad():
-                obs_tensor = torch.FloatTensor(obs).unsqueeze(0).to(self.dvc)
+                # 환경 관측값은 이미 float32(DTYPE) → 변환 복사 없이 텐서로
+                assert obs.dtype in (DTYPE, torch.float32), f"관측값 dtype은 float32여야 합니다: {obs.dtype}"
+                obs_tensor = torch.as_tensor(obs, device=self.dvc).unsqueeze(0)
                 q_values = self.q_net(obs_tensor)
                 action = q_values.argmax(dim=1).item()
                 return action
         else:
             return random.randrange(self.action_dim)
+
+    def select_actions_batch(self, obs_batch, epsilon):
+        """환경 B개의 관측값 (B, obs_dim) → 행동 (B,). epsilon-greedy는 행마다 따로, forward는 한 번"""
+        n = len(obs_batch)
+        self.steps_done += n
+        actions = np.random.randint(self.action_dim, size=n)
+        greedy = np.random.random(n) > epsilon
+        if greedy.any():
+            with torch.no_grad():
+                obs_batch = np.asarray(obs_batch)
+                assert obs_batch.dtype == DTYPE, f"관측값 dtype은 float32여야 합니다: {obs_batch.dtype}"
+                obs_tensor = torch.as_tensor(obs_batch[greedy], device=self.dvc)
+                actions[greedy] = self.q_net(obs_tensor).argmax(dim=1).cpu().numpy()
+        return actions
             
     def get_q_values(self, obs_batch):
         return self.q_net(obs_batch)
@@ -203,11 +220,18 @@ class QMIX_Learner:
             actions[agent_id] = action
         return actions
 
-    def train(self, replay_buffer):
-        if len(replay_buffer) < BATCH_SIZE:
+    def select_actions_batch(self, obs_batch, epsilon):
+        """obs_batch: {'agent_i': (B, obs_dim_i)} → 행동 배열 (B, n_agents) (VecMARLStockEnv용)"""
+        return np.stack([agent.select_actions_batch(obs_batch[f'agent_{i}'], epsilon)
+                         for i, agent in enumerate(self.agents)], axis=1)
+
+    def train(self, replay_buffer, batch_size=None):
+        # batch_size: None이면 BATCH_SIZE (환경 B개를 동시에 진행할 때는 B배 배치로 한 번)
+        batch_size = batch_size or BATCH_SIZE
+        if len(replay_buffer) < batch_size:
             return None, None
             
-        s, obs, a, r, s_next, obs_next, d = replay_buffer.sample()
+        s, obs, a, r, s_next, obs_next, d = replay_buffer.sample(batch_size)
         
         chosen_action_qvals = []
         for i, agent in enumerate(self.agents):
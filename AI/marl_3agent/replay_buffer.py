@@ -3,6 +3,7 @@ import torch
 import numpy as np
 from collections import deque, namedtuple
 from config import N_AGENTS
+from feature_store import DTYPE
 
 class ReplayBuffer:
     def __init__(self, buffer_size, batch_size, device):
@@ -14,6 +15,9 @@ class ReplayBuffer:
                                                   "next_global_state", "next_obs", "done"])
 
     def add(self, global_state, obs, actions, reward, next_global_state, next_obs, done):
+        # dtype 규칙: 관측값 / 글로벌 상태는 환경에서 나온 DTYPE(float32) 그대로 저장 (sample에서 다시 변환하지 않음)
+        assert global_state.dtype == DTYPE and next_global_state.dtype == DTYPE, \
+            f"글로벌 상태 dtype은 float32여야 합니다: {global_state.dtype}, {next_global_state.dtype}"
         obs_list = [obs[f'agent_{i}'] for i in range(N_AGENTS)]
         actions_list = [actions[f'agent_{i}'] for i in range(N_AGENTS)]
         next_obs_list = [next_obs[f'agent_{i}'] for i in range(N_AGENTS)]
@@ -22,17 +26,35 @@ class ReplayBuffer:
                             next_global_state, next_obs_list, done)
         self.memory.append(e)
 
-    def sample(self):
-        experiences = random.sample(self.memory, k=self.batch_size)
+    def add_batch(self, global_states, obs, actions, rewards, next_global_states, next_obs, dones, mask=None):
+        """
+        VecMARLStockEnv 한 스텝(환경 B개)의 transition을 한 번에 저장.
+        obs / next_obs: {'agent_i': (B, obs_dim_i)}, actions: (B, N_AGENTS), 나머지: (B, ...)
+        mask: True인 환경만 저장 (이미 끝난 환경 제외용)
+        """
+        assert global_states.dtype == DTYPE and next_global_states.dtype == DTYPE, \
+            f"글로벌 상태 dtype은 float32여야 합니다: {global_states.dtype}, {next_global_states.dtype}"
+        rows = range(len(rewards)) if mask is None else np.flatnonzero(mask)
+        agent_ids = [f'agent_{i}' for i in range(N_AGENTS)]
+        for b in rows:
+            e = self.experience(global_states[b], [obs[k][b] for k in agent_ids],
+                                [int(a) for a in actions[b]], float(rewards[b]),
+                                next_global_states[b], [next_obs[k][b] for k in agent_ids], bool(dones[b]))
+            self.memory.append(e)
+
+    def sample(self, batch_size=None):
+        """batch_size: None이면 생성 시 batch_size (VecMARLStockEnv 경로는 환경 수만큼 키워서 호출)"""
+        experiences = random.sample(self.memory, k=batch_size or self.batch_size)
         
-        global_states = torch.from_numpy(np.vstack([e.global_state for e in experiences])).float().to(self.device)
-        rewards = torch.from_numpy(np.vstack([e.reward for e in experiences])).float().to(self.device)
-        next_global_states = torch.from_numpy(np.vstack([e.next_global_state for e in experiences])).float().to(self.device)
-        dones = torch.from_numpy(np.vstack([e.done for e in experiences]).astype(np.float32)).float().to(self.device)
+        # 저장된 관측값은 이미 float32 → 쌓기만 하고 .float() 변환 없음. 보상/done만 여기서 DTYPE으로
+        global_states = torch.from_numpy(np.stack([e.global_state for e in experiences])).to(self.device)
+        rewards = torch.from_numpy(np.array([[e.reward] for e in experiences], dtype=DTYPE)).to(self.device)
+        next_global_states = torch.from_numpy(np.stack([e.next_global_state for e in experiences])).to(self.device)
+        dones = torch.from_numpy(np.array([[e.done] for e in experiences], dtype=DTYPE)).to(self.device)
         
-        obs_list = [torch.from_numpy(np.vstack([e.obs[i] for e in experiences])).float().to(self.device) for i in range(N_AGENTS)]
+        obs_list = [torch.from_numpy(np.stack([e.obs[i] for e in experiences])).to(self.device) for i in range(N_AGENTS)]
         actions_list = [torch.from_numpy(np.vstack([e.actions[i] for e in experiences])).long().to(self.device) for i in range(N_AGENTS)]
-        next_obs_list = [torch.from_numpy(np.vstack([e.next_obs[i] for e in experiences])).float().to(self.device) for i in range(N_AGENTS)]
+        next_obs_list = [torch.from_numpy(np.stack([e.next_obs[i] for e in experiences])).to(self.device) for i in range(N_AGENTS)]
         
         return (global_states, obs_list, actions_list, rewards, next_global_states, next_obs_list, dones)
 
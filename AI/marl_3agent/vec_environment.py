@@ -0,0 +1,177 @@
+import numpy as np
+from config import N_AGENTS, WINDOW_SIZE, REWARD_SCALE
+from environment import MARLStockEnv
+from feature_store import DTYPE
+
+# step()의 거래 1회당 비용 (MARLStockEnv.step과 같은 값)
+TRANSACTION_COST = 0.0015
+
+
+class VecMARLStockEnv:
+    """
+    MARLStockEnv B개를 배열로 한꺼번에 진행하는 환경.
+    - 포지션 / 진입가는 (B, n_agents) 배열, 현재 스텝은 (B,) 배열.
+      실현 손익, 거래 비용, 정렬 보너스, 과도한 거래 페널티를 에이전트 루프 없이 배열 연산으로 계산한다.
+    - 관측값: {'agent_i': (B, obs_dim_i)} + 글로벌 상태 (B, state_dim)
+      → QMIX_Learner.select_actions_batch 한 번, ReplayBuffer.add_batch 한 번
+    - 행동: (B, n_agents) 정수 배열 (0=Buy, 1=Hold, 2=Sell)
+    - 각 환경의 보상/관측은 같은 시작점의 MARLStockEnv와 같다.
+      (관측값 창 테이블은 내부 MARLStockEnv 하나를 그대로 공유)
+    - 시작 위치: starts로 직접 지정 / random_start=True면 reset마다 무작위 / 기본은 모두 0.
+      episode_len을 주면 그 스텝 수만큼만 진행.
+    - 자동 리셋 없음. 먼저 끝난 환경은 행동을 무시하고 보상 0, done=True.
+      (info["active"]: 이번 스텝에 실제로 진행한 환경)
+    """
+
+    def __init__(self, features_df, prices_df,
+                 agent_0_cols, agent_1_cols, agent_2_cols,
+                 num_envs, n_agents=N_AGENTS, window_size=WINDOW_SIZE,
+                 starts=None, random_start=False, episode_len=None, seed=None):
+        if num_envs < 1:
+            raise ValueError(f"num_envs는 1 이상이어야 합니다: {num_envs}")
+
+        self.env = MARLStockEnv(features_df, prices_df, agent_0_cols, agent_1_cols, agent_2_cols,
+                                n_agents=n_agents, window_size=window_size)
+        self.num_envs = num_envs
+        self.n_agents = n_agents
+        self.window_size = window_size
+        self.max_steps = self.env.max_steps
+        self.state_dim = self.env.state_dim
+        self.action_dim = self.env.action_dim
+        self.observation_dims = [w.shape[1] * w.shape[2] + 2 for w in self.env._agent_windows]
+        # 가격은 원래 dtype 그대로 (MARLStockEnv와 같은 정밀도로 수익률 계산)
+        self._prices = np.asarray(self.env._price_arr).reshape(-1)
+
+        self.starts = None if starts is None else np.asarray(starts, dtype=np.int64)
+        if self.starts is not None and len(self.starts) != num_envs:
+            raise ValueError(f"starts 길이({len(self.starts)})가 num_envs({num_envs})와 다릅니다.")
+        self.random_start = random_start
+        self.episode_len = episode_len
+        self.rng = np.random.default_rng(seed)
+
+        # 에피소드 상태 (배열)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.end_step = np.zeros(num_envs, dtype=np.int64)
+        self.positions = np.zeros((num_envs, n_agents), dtype=np.int64)
+        self.entry_prices = np.zeros((num_envs, n_agents))
+        self.done = np.ones(num_envs, dtype=bool)
+
+    def _start_steps(self):
+        if self.starts is not None:
+            if (self.starts < 0).any() or (self.starts >= self.max_steps).any():
+                raise ValueError(f"starts는 [0, {self.max_steps}) 범위여야 합니다.")
+            return self.starts.copy()
+        if self.random_start:
+            return self.rng.integers(0, self.max_steps, size=self.num_envs)
+        return np.zeros(self.num_envs, dtype=np.int64)
+
+    def _get_obs_and_state(self):
+        start = self.current_step
+        current_price = self._prices[start + self.window_size - 1][:, None]
+
+        # 스텝마다 새 버퍼 (리플레이 버퍼가 행 view를 그대로 들고 있으므로 재사용하지 않음)
+        o = self.env._offsets
+        buf = np.empty((self.num_envs, o[-1]), dtype=DTYPE)
+        global_state = buf[:, o[-2]:o[-1]]
+        n_global = self.window_size * self.env.n_features_global
+        global_state[:, :n_global] = self.env._global_windows[start].reshape(self.num_envs, n_global)
+
+        entry = self.entry_prices
+        has_entry = entry != 0
+        unrealized = np.zeros_like(entry)
+        long_ = (self.positions == 1) & has_entry
+        short_ = (self.positions == -1) & has_entry
+        unrealized[long_] = ((current_price - entry) / (entry + 1e-9))[long_]
+        unrealized[short_] = ((entry - current_price) / (entry + 1e-9))[short_]
+        np.clip(unrealized, -1.0, 1.0, out=unrealized)
+
+        tail = global_state[:, n_global:].reshape(self.num_envs, self.n_agents, 2)
+        tail[:, :, 0] = self.positions
+        tail[:, :, 1] = unrealized
+
+        observations = {}
+        for i, windows in enumerate(self.env._agent_windows):
+            obs = buf[:, o[i]:o[i + 1]]
+            obs[:, :-2] = windows[start].reshape(self.num_envs, -1)
+            obs[:, -2:] = tail[:, i]
+            observations[f'agent_{i}'] = obs
+
+        return observations, global_state
+
+    def reset(self):
+        self.current_step = self._start_steps()
+        if self.episode_len is None:
+            self.end_step = np.full(self.num_envs, self.max_steps, dtype=np.int64)
+        else:
+            self.end_step = np.minimum(self.current_step + self.episode_len, self.max_steps)
+        self.positions[:] = 0
+        self.entry_prices[:] = 0.0
+        self.done[:] = False
+
+        obs, state = self._get_obs_and_state()
+        return obs, {"global_state": state}
+
+    def step(self, actions):
+        """
+        actions: (B, n_agents) 정수 배열
+        return: (obs, rewards (B,), dones (B,), False, info)
+        """
+        actions = np.asarray(actions)
+        active = ~self.done
+        old_price = self._prices[self.current_step + self.window_size - 1]
+        self.current_step = np.where(active, self.current_step + 1, self.current_step)
+        new_price = self._prices[self.current_step + self.window_size - 1]
+
+        price_return = (new_price - old_price) / (old_price + 1e-9)
+
+        # 에이전트별 매매 (끝난 환경은 Hold로 취급)
+        act = np.where(active[:, None], actions, 1)
+        buy, sell = act == 0, act == 2
+        pos, entry = self.positions, self.entry_prices
+        new_p = new_price[:, None]
+
+        # 반대 포지션 청산 → 실현 수익 + 비용
+        close_short = buy & (pos == -1)
+        close_long = sell & (pos == 1)
+        realized = np.where(close_short, (entry - new_p) / (entry + 1e-9), 0.0) \
+            + np.where(close_long, (new_p - entry) / (entry + 1e-9), 0.0)
+        # 새 포지션 진입 → 진입가 갱신 + 비용
+        open_long = buy & (pos != 1)
+        open_short = sell & (pos != -1)
+        n_trades = close_short.astype(np.int64) + close_long + open_long + open_short
+
+        self.entry_prices = np.where(open_long | open_short, new_p, entry)
+        self.positions = np.where(buy, 1, np.where(sell, -1, pos))
+
+        instant_rewards = realized.sum(axis=1)
+        transaction_costs = (n_trades * TRANSACTION_COST).sum(axis=1)
+
+        # 보상 계산 (MARLStockEnv.step과 같은 항)
+        joint_position = self.positions.sum(axis=1)
+        holding_reward = joint_position * price_return
+        alignment_bonus = np.abs(joint_position) / self.n_agents * 0.01
+        action_changes = (act != 1).sum(axis=1)
+        overtrading_penalty = np.where(action_changes == self.n_agents, -0.005 * action_changes, 0.0)
+
+        raw_team_reward = (
+            holding_reward +
+            instant_rewards -
+            transaction_costs +
+            alignment_bonus +
+            overtrading_penalty
+        )
+        team_reward = np.clip(raw_team_reward * REWARD_SCALE, -0.1, 0.1)
+        team_reward = np.where(active, team_reward, 0.0)
+
+        next_obs, next_state = self._get_obs_and_state()
+        self.done = self.done | (self.current_step >= self.end_step)
+
+        info = {
+            "global_state": next_state,
+            "active": active,
+            "raw_pnl": team_reward,
+            "price_return": np.where(active, price_return, 0.0),
+            "instant_reward": np.where(active, instant_rewards, 0.0),
+            "transaction_cost": np.where(active, transaction_costs, 0.0),
+        }
+        return next_obs, team_reward, self.done.copy(), False, info
@@ -1,3 +1,5 @@
+import os
+
 import torch
 
 # --- 설정 ---
@@ -21,4 +23,19 @@ START_DATE = "2014-11-17"  # 10년 데이터 (학습 10년 + 백테스팅 1년)
 END_DATE = "2025-11-18"
 
 # --- 학습 설정 ---
-NUM_EPISODES = 500
\ No newline at end of file
+NUM_EPISODES = 500
+
+# --- 캐시 설정 ---
+# 실행 위치(cwd)와 상관없이 이 프로젝트 폴더 아래 (None 이면 캐시 없이 매번 다운로드)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache")
+FUNDAMENTALS_TTL_HOURS = 24       # 재무제표/추천 정보 재사용 시간
+
+# --- 데이터 공급자 (market_data.py) ---
+# "yfinance" | "snapshot" (SNAPSHOT_DIR의 <ticker>.parquet|csv) | "synthetic" (시드 고정 합성 가격)
+DATA_SOURCE = "yfinance"
+SNAPSHOT_DIR = "data_snapshot"
+SYNTHETIC_SEED = 42
+
+# --- 지표 행렬 저장소 (feature_store.py) ---
+# 실행 위치(cwd)와 상관없이 이 프로젝트 폴더 아래 (None 이면 매번 지표 계산)
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_store")
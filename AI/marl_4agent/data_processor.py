@@ -1,79 +1,40 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
 # --- Config ---
-from config import TICKER, VIX_TICKER, START_DATE, END_DATE
-
-# ---- pandas-ta 호환 래퍼 (이전과 동일) -----------------------------
-try:
-    import pandas_ta as ta
-    _USING_PANDAS_TA = True
-except Exception:
-    _USING_PANDAS_TA = False
-    try:
-        import ta as _ta
-    except Exception as e:
-        raise RuntimeError(
-            "pandas-ta도, ta도 설치되어 있지 않습니다. 다음 중 하나를 설치하세요:\n"
-            "  pip install pandas-ta  (Python 3.12+)\n"
-            "  pip install ta          (대체 라이브러리)"
-        ) from e
-
-    class _PTAWrapper:
-        @staticmethod
-        def sma(close, length=20):
-            return _ta.trend.SMAIndicator(close=close, window=length).sma_indicator()
-
-        @staticmethod
-        def macd(close, fast=12, slow=26, signal=9):
-            ind = _ta.trend.MACD(close=close, window_slow=slow, window_fast=fast, window_sign=signal)
-            return pd.DataFrame({
-                f"MACD_{fast}_{slow}_{signal}": ind.macd(),
-                f"MACDs_{fast}_{slow}_{signal}": ind.macd_signal(),
-                f"MACDh_{fast}_{slow}_{signal}": ind.macd_diff()
-            })
-
-        @staticmethod
-        def rsi(close, length=14):
-            return _ta.momentum.RSIIndicator(close=close, window=length).rsi()
-
-        @staticmethod
-        def stoch(high, low, close, k=14, d=3, smooth_k=3):
-            ind = _ta.momentum.StochasticOscillator(
-                high=high, low=low, close=close, window=k, smooth_window=smooth_k
-            )
-            return pd.DataFrame({
-                f"STOCHk_{k}_{d}_{smooth_k}": ind.stoch(),
-                f"STOCHd_{k}_{d}_{smooth_k}": ind.stoch_signal()
-            })
-
-        @staticmethod
-        def atr(high, low, close, length=14):
-            return _ta.volatility.AverageTrueRange(
-                high=high, low=low, close=close, window=length
-            ).average_true_range()
-
-        @staticmethod
-        def bbands(close, length=20, std=2.0):
-            bb = _ta.volatility.BollingerBands(close=close, window=length, window_dev=std)
-            return pd.DataFrame({
-                f"BBL_{length}_{std}": bb.bollinger_lband(),
-                f"BBM_{length}_{std}": bb.bollinger_mavg(),
-                f"BBU_{length}_{std}": bb.bollinger_hband()
-            })
-
-    ta = _PTAWrapper()
-# ------------------------------------------------------------------------------
+from config import (TICKER, VIX_TICKER, START_DATE, END_DATE, CACHE_DIR, FUNDAMENTALS_TTL_HOURS,
+                    DATA_SOURCE, SNAPSHOT_DIR, SYNTHETIC_SEED, FEATURE_STORE_DIR)
+from data_cache import load_history, load_payload
+from feature_store import load_or_build
+from fundamentals import FUNDAMENTAL_COLUMNS, build_fundamentals_index
+from indicators import PANDAS_TA_04, IndicatorState, compute_indicators
+from market_data import fetch_many, make_source
+
+# calculate_features의 계산 로직을 바꾸면 올린다 (feature_store에 저장된 행렬 무효화)
+INDICATOR_VERSION = 3
+FEATURE_SET = "marl_4agent"
+# 감성 지표(2.4)의 마지막 행을 다시 계산하는 데 필요한 최근 행 수 (pct_change(20) + rolling(20))
+SENTIMENT_LOOKBACK = 25
+
 
 class DataProcessor:
-    def __init__(self, ticker=TICKER, vix_ticker=VIX_TICKER, start=START_DATE, end=END_DATE):
+    def __init__(self, ticker=TICKER, vix_ticker=VIX_TICKER, start=START_DATE, end=END_DATE,
+                 cache_dir=CACHE_DIR, fundamentals_ttl_hours=FUNDAMENTALS_TTL_HOURS, source=None,
+                 feature_store_dir=FEATURE_STORE_DIR):
         self.ticker_str = ticker
-        self.ticker_obj = yf.Ticker(self.ticker_str)
+        # 가격/재무 데이터 공급자 (market_data.py). None이면 config.DATA_SOURCE 사용
+        if source is None:
+            source = {"type": DATA_SOURCE, "snapshot_dir": SNAPSHOT_DIR, "seed": SYNTHETIC_SEED}
+        self.source = make_source(source, yf_kwargs=dict(auto_adjust=False))
         self.vix_ticker = vix_ticker
         self.start = start
         self.end = end
+        # 가격 히스토리 / 재무 데이터 로컬 캐시 (None이면 매번 다운로드)
+        self.cache_dir = cache_dir
+        self.fundamentals_ttl_hours = fundamentals_ttl_hours
+        # 계산된 지표 행렬 memmap 저장소 (None이면 매번 계산)
+        self.feature_store_dir = feature_store_dir
         
         # [수정] 피처 목록 세분화
         self.features = []
@@ -83,6 +44,8 @@ class DataProcessor:
         self.agent_3_features = [] # [추가] 시장 감성 분석가 피처
         
         self.original_prices = None
+        self.price_history = None
+        self.fundamentals_index = None
         self.scalers = {}
 
     def _flatten_cols(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -99,11 +62,49 @@ class DataProcessor:
                     df[base] = df[col]
         return df
 
-    def fetch_data(self):
-        print(f"데이터 다운로드 중 ({self.ticker_str}, {self.vix_ticker})...")
-        df = yf.download(self.ticker_str, start=self.start, end=self.end, group_by="column", auto_adjust=False, progress=False, threads=False)
+    def _download(self, ticker, start, end):
+        df = self.source.fetch(ticker, start, end)
         df = self._flatten_cols(df)
-        df = self._strip_suffix(df, self.ticker_str)
+        df = self._strip_suffix(df, ticker)
+        return df
+
+    def _load_prices(self, ticker, start=None, end=None):
+        """캐시가 있으면 부족한 앞/뒤 구간만 받아서 이어 붙이고, 없으면 전체 다운로드"""
+        start = start or self.start
+        end = end or self.end
+        if self.cache_dir and self.source.cacheable:
+            return load_history(ticker, start, end, self._download, self.cache_dir)
+        return self._download(ticker, start, end)
+
+    def _load_fundamental(self, name):
+        """yf.Ticker의 분기 재무제표/추천 정보를 TTL 캐시를 거쳐서 가져옴 (공급자에 없으면 None)"""
+        fetch = lambda: self.source.fundamentals(self.ticker_str, name)
+        if self.cache_dir and self.source.cacheable:
+            return load_payload(f"{self.ticker_str}_{name}", fetch, self.cache_dir, self.fundamentals_ttl_hours)
+        return fetch()
+
+    def _fetch_fundamentals(self):
+        """calculate_features에 쓰는 재무제표 / 추천 정보를 한 번에 가져옴 (실패한 항목은 None)"""
+        out = {}
+        for name, label in [('quarterly_financials', "분기별 재무제표"),
+                            ('quarterly_balance_sheet', None),
+                            ('recommendations', "애널리스트 추천 정보 (시계열)")]:
+            if label:
+                print(f"{label} 가져오는 중...")
+            try:
+                out[name] = self._load_fundamental(name)
+            except Exception as e:
+                print(f"경고: {name} 가져오기 실패({e}).")
+                out[name] = None
+        return out
+
+    def fetch_data(self, start=None, end=None):
+        """[start, end) 구간 가격 + VIX (기본은 self.start ~ self.end)"""
+        print(f"데이터 다운로드 중 ({self.ticker_str}, {self.vix_ticker})...")
+        # 종목 / VIX 동시 다운로드 (재시도 / 속도 제한은 공급자 안에서 처리)
+        frames = fetch_many([self.ticker_str, self.vix_ticker],
+                            lambda t: self._load_prices(t, start, end))
+        df = frames[self.ticker_str]
 
         if 'Close' not in df.columns:
             if 'Adj Close' in df.columns:
@@ -119,9 +120,7 @@ class DataProcessor:
         if df.empty:
             raise RuntimeError(f"'{self.ticker_str}' 가격 데이터가 비어 있습니다. 날짜 범위/티커를 확인하세요.")
 
-        vix_df = yf.download(self.vix_ticker, start=self.start, end=self.end, group_by="column", auto_adjust=False, progress=False, threads=False)
-        vix_df = self._flatten_cols(vix_df)
-        vix_df = self._strip_suffix(vix_df, self.vix_ticker)
+        vix_df = frames[self.vix_ticker]
 
         if 'Close' not in vix_df.columns:
             if 'Adj Close' in vix_df.columns:
@@ -154,127 +153,58 @@ class DataProcessor:
         df = df.sort_index()
         return df
 
-    def calculate_features(self, df):
+    @staticmethod
+    def _technical_columns(ind, close):
+        """compute_indicators() / IndicatorState.update() 결과 → 피처 컬럼 (배열 / 스칼라 모두)"""
+        denom = np.asarray(ind['BB_Upper'] - ind['BB_Lower'], dtype=float)
+        denom = np.where(denom == 0, np.nan, denom)
+        cols = {
+            'SMA20': ind['SMA20'],
+            'MACD': ind['MACD'],
+            'MACD_Signal': ind['MACD_Signal'],
+            'RSI': ind['RSI'],
+            'Stoch_K': ind['STOCH_K'],
+            'Stoch_D': ind['STOCH_D'],
+            'ATR': ind['ATR'],
+            'Bollinger_B': np.clip((close - ind['BB_Lower']) / (denom + 1e-9), -1, 2),
+        }
+        if 'Volume_MA20' in ind:
+            cols['Volume_MA20'] = ind['Volume_MA20']
+        return cols
+
+    def calculate_features(self, df, fundamentals=None, fund_index=None):
         print("기술적 지표 및 재무 지표 계산 중...")
+        if fundamentals is None and fund_index is None:
+            fundamentals = self._fetch_fundamentals()
+
+        # --- 2.1. 기술적 지표 (requirements의 pandas-ta 0.4와 같은 계산식, indicators.py) ---
+        ind = compute_indicators(df['High'], df['Low'], df['Close'], ta_version=PANDAS_TA_04, volume=df['Volume'])
+        for col, values in self._technical_columns(ind, df['Close'].to_numpy()).items():
+            df[col] = values
+
+        # --- 2.2. 재무제표 지표 / 2.3. 추정실적 (fundamentals.py, 유효일 기준 as-of) ---
+        if fund_index is None:
+            fund_index = build_fundamentals_index(fundamentals)
+        self.fundamentals_index = fund_index
+        fund = fund_index.asof(df.index, FUNDAMENTAL_COLUMNS)
+        for col in FUNDAMENTAL_COLUMNS:
+            df[col] = fund[col].to_numpy()
 
-        def pick(df_like, candidates):
-            if not isinstance(df_like, pd.DataFrame):
-                raise KeyError("pick expects a DataFrame-like object.")
-            for k in candidates:
-                if k in df_like.columns:
-                    return df_like[k]
-            cols = list(df_like.columns)
-            for cand in candidates:
-                for c in cols:
-                    if cand.lower() in str(c).lower():
-                        return df_like[c]
-            for c in cols:
-                head = str(c).split('_')[0]
-                for cand in candidates:
-                    if cand.lower() == head.lower():
-                        return df_like[c]
-            raise KeyError(f"원하는 컬럼을 찾지 못했습니다. 사용 가능한 컬럼: {cols}")
-
-        # --- 2.1. 기술적 지표 ---
-        df['SMA20'] = ta.sma(df['Close'], length=20)
-        macd = ta.macd(df['Close'])
-        df['MACD'] = pick(macd, ['MACD_12_26_9', 'MACD', 'macd'])
-        df['MACD_Signal'] = pick(macd, ['MACDs_12_26_9', 'MACD_Signal', 'Signal', 'macd_signal'])
-        df['RSI'] = ta.rsi(df['Close'])
-        stoch = ta.stoch(df['High'], df['Low'], df['Close'])
-        df['Stoch_K'] = pick(stoch, ['STOCHk_14_3_3', 'STOCHk', 'stoch_k', 'K', 'k'])
-        df['Stoch_D'] = pick(stoch, ['STOCHd_14_3_3', 'STOCHd', 'stoch_d', 'D', 'd'])
-        df['ATR'] = ta.atr(df['High'], df['Low'], df['Close'])
-        bbands = ta.bbands(df['Close'], length=20)
-        lower = pick(bbands, ['BBL_20_2.0', 'BBL_20_2', 'BBL', 'lower', 'lband', 'bollinger_lband', 'bb_lower'])
-        upper = pick(bbands, ['BBU_20_2.0', 'BBU_20_2', 'BBU', 'upper', 'hband', 'bollinger_hband', 'bb_upper'])
-        denom = (upper - lower).replace(0, np.nan)
-        df['Bollinger_B'] = ((df['Close'] - lower) / (denom + 1e-9)).clip(-1, 2)
-
-        # --- 2.2. 재무제표 지표 ---
-        print("분기별 재무제표 가져오는 중...")
-        qf = self.ticker_obj.quarterly_financials
-        qbs = self.ticker_obj.quarterly_balance_sheet
-        try:
-            if (qf is not None) and (not qf.empty) and (qbs is not None) and (not qbs.empty) and ('Net Income' in qf.index) and ('Total Assets' in qbs.index):
-                net_income = qf.loc['Net Income'].T
-                total_assets = qbs.loc['Total Assets'].T
-                
-                # Total Liabilities Net Minority Interest가 없을 경우 Total Liab 사용
-                liab_key = 'Total Liabilities Net Minority Interest'
-                if liab_key not in qbs.index:
-                    liab_key = 'Total Liab'
-                
-                if liab_key not in qbs.index:
-                    print("경고: 부채(Total Liab) 정보를 찾을 수 없습니다.")
-                    total_liab = pd.Series(0.0, index=total_assets.index)
-                else:
-                    total_liab = qbs.loc[liab_key].T
-
-                df_fund = pd.DataFrame(index=total_assets.index)
-                df_fund['ROA'] = net_income / total_assets
-                df_fund['DebtRatio'] = total_liab / total_assets
-
-                df_fund.index = pd.to_datetime(df_fund.index)
-                print("... 재무제표에 2개월 공시 지연(lag) 적용 ...")
-                df_fund.index = df_fund.index + pd.DateOffset(months=2)
-                try: df_fund = df_fund.tz_localize(None)
-                except Exception: pass
-                
-                df_fund_daily = df_fund.resample('D').ffill()
-                df = pd.merge_asof(df, df_fund_daily, left_index=True, right_index=True, direction='backward')
-                df[['ROA', 'DebtRatio']] = df[['ROA', 'DebtRatio']].ffill().fillna(0.0)
-            else:
-                print("경고: 재무제표(ROA, DebtRatio)를 가져올 수 없습니다. 0으로 채웁니다.")
-                df['ROA'] = 0.0
-                df['DebtRatio'] = 0.0
-        except Exception as e:
-            print(f"경고: 재무제표 처리 중 오류({e}). 0으로 채웁니다.")
-            df['ROA'] = 0.0
-            df['DebtRatio'] = 0.0
-
-        # --- 2.3. 추정실적 ---
-        print("애널리스트 추천 정보 (시계열) 가져오는 중...")
-        try:
-            rec = self.ticker_obj.recommendations
-            if rec is None or rec.empty:
-                raise Exception("추천 정보 데이터가 비어있음")
-            
-            # yfinance 최신 버전에 따라 컬럼 이름이 다름 ('strongBuy' or 'strong_buy')
-            required_cols_snake = ['strong_buy', 'buy', 'hold', 'sell', 'strong_sell']
-            required_cols_camel = ['strongBuy', 'buy', 'hold', 'sell', 'strongSell']
-            
-            target_cols = required_cols_snake
-            if not all(col in rec.columns for col in required_cols_snake):
-                if not all(col in rec.columns for col in required_cols_camel):
-                     raise Exception(f"필요한 컬럼({required_cols_snake} 또는 {required_cols_camel})이 없음.")
-                else:
-                    target_cols = required_cols_camel
-                    
-            try: rec.index = pd.to_datetime(rec.index).tz_localize(None)
-            except Exception: pass
-            rec = rec.sort_index()
-
-            score_buy = (rec[target_cols[0]] * 1.5) + (rec[target_cols[1]] * 1.0)
-            score_sell = (rec[target_cols[3]] * 1.0) + (rec[target_cols[4]] * 1.5)
-            total_count = rec[target_cols].sum(axis=1)
-            
-            rec_scores = pd.DataFrame(index=rec.index)
-            rec_scores['AnalystRating'] = (score_buy - score_sell) / (total_count + 1e-9)
-            rec_scores = rec_scores.fillna(0.0)
+        # --- 2.4. 시장 감성 지표 (한국 주식 시장) ---
+        print("시장 감성 지표 계산 중...")
+        df = self._add_sentiment_features(df)
 
-            df = pd.merge_asof(df, rec_scores, left_index=True, right_index=True, direction='backward')
-            df['AnalystRating'] = df['AnalystRating'].ffill().fillna(0.0)
+        self._define_feature_groups()
 
-        except Exception as e:
-            print(f"경고: 애널리스트 추천 정보({e})를 가져올 수 없습니다. 0으로 채웁니다.")
-            df['AnalystRating'] = 0.0
+        df = df.dropna()
+        return df
 
-        # --- 2.4. 시장 감성 지표 (한국 주식 시장) ---
-        print("시장 감성 지표 계산 중...")
-        
-        # 거래량 기반 감성 (거래량 급증 = 관심 증가)
-        df['Volume_MA20'] = df['Volume'].rolling(window=20).mean()
+    def _add_sentiment_features(self, df):
+        """
+        2.4 시장 감성 지표. 최근 21행만 있으면 마지막 행 값이 정해진다.
+        (append_bars에서 짧은 tail에 다시 적용)
+        """
+        # 거래량 기반 감성 (거래량 급증 = 관심 증가, Volume_MA20은 2.1에서 계산)
         df['Volume_Ratio'] = df['Volume'] / (df['Volume_MA20'] + 1e-9)
         
         # 가격 모멘텀 (단기 vs 장기)
@@ -299,7 +229,9 @@ class DataProcessor:
         for col in sentiment_cols:
             if col in df.columns:
                 df[col] = df[col].fillna(0.0)
+        return df
 
+    def _define_feature_groups(self):
         # --- [수정] 피처 목록을 4개로 분리 ---
         common_cols = ['Close', 'High', 'Low', 'Volume'] # 공통 핵심 가격
         
@@ -330,9 +262,6 @@ class DataProcessor:
         self.features = sorted(list(set(self.agent_0_features + self.agent_1_features + 
                                         self.agent_2_features + self.agent_3_features)))
 
-        df = df.dropna()
-        return df
-
     def normalize_data(self, df_train, df_test):
         print("데이터 정규화 중 (Train-Test 분리 적용)...")
         
@@ -394,11 +323,21 @@ class DataProcessor:
         return df_train_norm, df_test_norm
 
     def process(self):
-        if not _USING_PANDAS_TA:
-            print("[알림] pandas-ta를 찾지 못하여 'ta' 라이브러리로 대체했습니다.")
-             
         df = self.fetch_data()
-        df_features = self.calculate_features(df)
+        # 증분 갱신(make_indicator_state)용으로 원본 가격 히스토리를 보관
+        self.price_history = df
+        fundamentals = self._fetch_fundamentals()
+        # 재무 지표 이벤트 (append_bars에서도 새 날짜의 as-of 값을 찾는 데 사용)
+        self.fundamentals_index = build_fundamentals_index(fundamentals)
+
+        # 원본 가격 + 재무 데이터가 지난번과 같으면 지표 계산 없이 memmap을 그대로 사용
+        self._define_feature_groups()
+        df_features = load_or_build(
+            self.ticker_str, FEATURE_SET, INDICATOR_VERSION,
+            [df, *fundamentals.values()],
+            lambda: self.calculate_features(df, fundamentals, self.fundamentals_index),
+            self.feature_store_dir,
+        )
         
         self.original_prices = df_features['Close'].copy()
         
@@ -423,4 +362,60 @@ class DataProcessor:
             self.agent_1_features,
             self.agent_2_features,
             self.agent_3_features  # <--- 추가
-        )
\ No newline at end of file
+        )
+
+    # ---------- 증분 갱신 (실시간 추론용) ----------
+    def make_indicator_state(self, df_prices=None):
+        """
+        가격 히스토리(기본: 마지막 process()에서 받은 것)를 한 번 흘려 넣어
+        IndicatorState를 만든다. 이후에는 append_bars로 새 봉만 반영한다.
+        """
+        df_prices = self.price_history if df_prices is None else df_prices
+        return IndicatorState.from_arrays(df_prices['High'], df_prices['Low'], df_prices['Close'],
+                                          df_prices['Volume'], ta_version=PANDAS_TA_04)
+
+    def append_bars(self, df_features, state, end=None):
+        """
+        df_features(process() 결과)의 마지막 날 이후에 나온 봉만 받아서 행을 붙인다.
+        - 기술 지표: state(IndicatorState)를 봉 하나씩 갱신 (히스토리 전체를 다시 계산하지 않음)
+        - VIX: 그날 값이 없으면 직전 값
+        - ROA / DebtRatio / AnalystRating: process()에서 만든 fundamentals_index의 as-of 값
+          (없으면 직전 값 유지. 새로 공시된 재무 데이터 반영은 process())
+        state는 제자리에서 갱신된다. 새 봉이 없으면 df_features를 그대로 반환.
+        """
+        last_date = df_features.index[-1]
+        start = (last_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        end = end or self.end
+        if start >= end:
+            return df_features
+        try:
+            bars = self.fetch_data(start, end)
+        except RuntimeError as e:
+            print(f"[stream] {start} 이후 새 봉이 없습니다 ({e})")
+            return df_features
+        bars = bars[bars.index > last_date]
+
+        prev = df_features.iloc[-1]
+        rows = []
+        for _, bar in bars.iterrows():
+            ind = state.update(bar['High'], bar['Low'], bar['Close'], bar['Volume'])
+            row = {c: float(bar[c]) for c in ['Close', 'High', 'Low', 'Volume']}
+            row['VIX'] = float(bar['VIX']) if pd.notna(bar['VIX']) else float(prev['VIX'])
+            row.update({k: float(v) for k, v in self._technical_columns(ind, row['Close']).items()})
+            for col in FUNDAMENTAL_COLUMNS:
+                row[col] = float(prev[col])
+            rows.append(row)
+            prev = row
+        new = pd.DataFrame(rows, index=bars.index)
+        if self.fundamentals_index is not None and len(new):
+            fund = self.fundamentals_index.asof(new.index, FUNDAMENTAL_COLUMNS)
+            for col in FUNDAMENTAL_COLUMNS:
+                new[col] = fund[col].to_numpy()
+        if len(new):
+            # 감성 지표는 최근 구간만 있으면 되므로 짧은 tail에만 다시 계산
+            tail = pd.concat([df_features.iloc[-SENTIMENT_LOOKBACK:], new])
+            new = self._add_sentiment_features(tail).iloc[-len(new):]
+
+        new = new.reindex(columns=df_features.columns).dropna()
+        print(f"[stream] 새 봉 {len(new)}개 반영")
+        return pd.concat([df_features, new.astype(df_features.dtypes.to_dict())])
@@ -0,0 +1,165 @@
+# feature_store.py
+"""
+계산이 끝난 지표 행렬을 float32 .npy 파일로 보관하고 memmap으로 여는 저장소.
+
+- 키: (ticker, feature_set, version)
+    <store_dir>/<ticker>__<feature_set>__v<version>.npy        (rows x cols, float32)
+    <store_dir>/<ticker>__<feature_set>__v<version>.dates.npy  (datetime64[ns] → int64)
+    <store_dir>/<ticker>__<feature_set>__v<version>.json       (컬럼 / 원본 지문)
+- 원본 가격(및 재무 데이터)의 지문(fingerprint)이 저장된 것과 같으면
+  지표 계산 없이 memmap만 열어서 DataFrame으로 감싸 돌려준다. (복사 없음)
+- 지문이 다르면(새 봉이 붙었거나 과거 값이 수정됨) 다시 계산해서 덮어쓴다.
+- 지표 계산 로직을 바꾸면 호출하는 쪽의 INDICATOR_VERSION을 올린다.
+
+dtype 규칙: 지표 행렬 → 환경 관측값 → 롤아웃/리플레이 저장 → 모델 입력까지 DTYPE(float32) 하나.
+  (보상/수익률 계산만 float64) 각 단계는 assert로 확인하므로 python -O로 실행하면 검사가 빠진다.
+
+여러 프로세스가 같은 파일을 열면 OS 페이지 캐시를 같이 쓴다.
+돌려준 DataFrame은 읽기 전용이다. 스케일링처럼 값을 바꿀 때는 .copy() 후 사용.
+(a2c_11.29 / marl_3agent / marl_4agent 에 같은 파일을 그대로 둔다.)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 관측값 / 모델 입력 dtype (위 dtype 규칙)
+DTYPE = np.float32
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = threading.Lock()
+        return _locks[path]
+
+
+# ============================================================
+# 1. 지문 / 경로
+# ============================================================
+
+def fingerprint(*objs: Any) -> str:
+    """DataFrame / Series / None 들의 내용(인덱스 포함)으로 만든 해시."""
+    h = hashlib.sha1()
+    for obj in objs:
+        if obj is None:
+            h.update(b"<none>")
+        elif isinstance(obj, (pd.DataFrame, pd.Series)):
+            labels = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+            h.update(repr(list(labels)).encode("utf-8"))
+            h.update(np.ascontiguousarray(pd.util.hash_pandas_object(obj, index=True).to_numpy()).tobytes())
+        else:
+            h.update(repr(obj).encode("utf-8"))
+        h.update(b"|")
+    return h.hexdigest()
+
+
+def _base_path(store_dir: str, ticker: str, feature_set: str, version: Any) -> str:
+    safe = re.sub(r"[^0-9A-Za-z_-]", "_", f"{ticker}__{feature_set}__v{version}")
+    return os.path.join(store_dir, safe)
+
+
+def _paths(base: str) -> Tuple[str, str, str]:
+    return base + ".npy", base + ".dates.npy", base + ".json"
+
+
+# ============================================================
+# 2. 읽기 / 쓰기
+# ============================================================
+
+def _open(base: str, meta: dict) -> pd.DataFrame:
+    mat_path, dates_path, _ = _paths(base)
+    mat = np.load(mat_path, mmap_mode="r")
+    assert mat.dtype == DTYPE, f"{mat_path}: dtype {mat.dtype} (DTYPE {np.dtype(DTYPE)}이어야 함)"
+    dates = np.load(dates_path)
+    index = pd.DatetimeIndex(dates.view("datetime64[ns]"), name=meta.get("index_name"))
+    return pd.DataFrame(mat, index=index, columns=meta["columns"], copy=False)
+
+
+def _write(base: str, df: pd.DataFrame, meta: dict) -> None:
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    mat_path, dates_path, meta_path = _paths(base)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+    mat = np.ascontiguousarray(df.to_numpy(dtype=DTYPE))
+    dates = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+
+    # 다른 프로세스가 반쯤 쓴 파일을 열지 않도록 임시 파일 → rename (meta를 마지막에)
+    for path, arr in ((mat_path, mat), (dates_path, dates)):
+        with open(path + suffix, "wb") as f:
+            np.save(f, arr)
+        os.replace(path + suffix, path)
+    with open(meta_path + suffix, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + suffix, meta_path)
+
+
+def _read_meta(base: str) -> Optional[dict]:
+    mat_path, dates_path, meta_path = _paths(base)
+    if not all(os.path.exists(p) for p in (mat_path, dates_path, meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+# ============================================================
+# 3. 캐시 경유 지표 계산
+# ============================================================
+
+def load_or_build(
+    ticker: str,
+    feature_set: str,
+    version: Any,
+    inputs: Iterable[Any],
+    build_fn: Callable[[], pd.DataFrame],
+    store_dir: Optional[str] = "feature_store",
+) -> pd.DataFrame:
+    """
+    inputs(원본 가격 DataFrame, 재무 데이터 등)의 지문이 저장된 것과 같으면
+    memmap으로 연 지표 행렬을, 아니면 build_fn()으로 새로 계산해서 저장한 뒤
+    memmap으로 다시 열어서 돌려준다. (첫 실행과 이후 실행의 값이 똑같이 float32)
+
+    store_dir가 None이면 저장 없이 build_fn() 결과를 숫자 컬럼만 DTYPE으로 바꿔서 반환.
+    (저장소를 쓸 때와 같은 값) 숫자 컬럼만 저장한다.
+    """
+    if not store_dir:
+        df = build_fn()
+        return df.astype({c: DTYPE for c in df.select_dtypes(include=[np.number]).columns})
+
+    fp = fingerprint(*inputs)
+    base = _base_path(store_dir, ticker, feature_set, version)
+
+    with _lock_for(base):
+        meta = _read_meta(base)
+        if meta is not None and meta.get("fingerprint") == fp:
+            try:
+                return _open(base, meta)
+            except Exception as e:
+                print(f"[feature_store] {os.path.basename(base)} 을(를) 열지 못했습니다({e}). 다시 계산합니다.")
+
+        df = build_fn()
+        df = df.select_dtypes(include=[np.number])
+        meta = {
+            "ticker": ticker,
+            "feature_set": feature_set,
+            "version": version,
+            "fingerprint": fp,
+            "columns": [str(c) for c in df.columns],
+            "index_name": df.index.name,
+            "rows": int(len(df)),
+        }
+        _write(base, df, meta)
+        return _open(base, meta)
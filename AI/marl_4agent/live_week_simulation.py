@@ -183,21 +183,13 @@ def simulate_live_week(model_path='qmix_model.pth', scaler_path='scaler.pkl',
         'cash': initial_capital
     }
     
-    obs_dict, info = sim_env.reset(initial_portfolio=portfolio)
-    
-    # 거래 시작일까지 환경 진행
+    # 거래 시작일 전날에서 끝나는 창으로 바로 이동 (과거를 Hold로 다시 진행하지 않음)
     first_date = sim_dates[0]
     first_idx = sim_features.index.get_loc(first_date)
-    start_idx = max(0, first_idx - WINDOW_SIZE)
-    steps_to_skip = first_idx - start_idx
-    
-    if steps_to_skip > 0:
-        for _ in range(steps_to_skip):
-            actions_dict = {f'agent_{i}': 1 for i in range(N_AGENTS)}
-            obs_dict, _, dones_dict, _, info = sim_env.step(actions_dict)
-            if dones_dict['__all__']:
-                print("경고: 환경이 예상보다 일찍 종료되었습니다.")
-                return
+    if first_idx < WINDOW_SIZE:
+        print(f"경고: 거래 시작일 이전 데이터가 {WINDOW_SIZE}일보다 적습니다.")
+        return
+    obs_dict, info = sim_env.seek(sim_features.index[first_idx - 1], portfolio_state=portfolio)
     
     # 6. 실제 거래 시뮬레이션
     daily_results = []
@@ -4,6 +4,7 @@ import torch.nn.functional as F
 import copy
 import random
 from config import N_AGENTS, LR, TAU, MIXER_EMBED_DIM, BATCH_SIZE, GAMMA
+from feature_store import DTYPE
 
 # --- Q-Network (DQN) ---
 class Q_Net(nn.Module):
@@ -45,7 +46,9 @@ class DQN_Agent:
         self.steps_done += 1
         if random.random() > epsilon:
             with torch.no_grad():
-                obs_tensor = torch.FloatTensor(obs).unsqueeze(0).to(self.dvc)
+                # 환경 관측값은 이미 float32(DTYPE) → 변환 복사 없이 텐서로
+                assert obs.dtype in (DTYPE, torch.float32), f"관측값 dtype은 float32여야 합니다: {obs.dtype}"
+                obs_tensor = torch.as_tensor(obs, device=self.dvc).unsqueeze(0)
                 q_values = self.q_net(obs_tensor)
                 action = q_values.argmax(dim=1).item()
                 return action
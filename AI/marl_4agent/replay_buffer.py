@@ -3,6 +3,7 @@ import torch
 import numpy as np
 from collections import deque, namedtuple
 from config import N_AGENTS
+from feature_store import DTYPE
 
 class ReplayBuffer:
     def __init__(self, buffer_size, batch_size, device):
@@ -14,6 +15,9 @@ class ReplayBuffer:
                                                   "next_global_state", "next_obs", "done"])
 
     def add(self, global_state, obs, actions, reward, next_global_state, next_obs, done):
+        # dtype 규칙: 관측값 / 글로벌 상태는 환경에서 나온 DTYPE(float32) 그대로 저장 (sample에서 다시 변환하지 않음)
+        assert global_state.dtype == DTYPE and next_global_state.dtype == DTYPE, \
+            f"글로벌 상태 dtype은 float32여야 합니다: {global_state.dtype}, {next_global_state.dtype}"
         obs_list = [obs[f'agent_{i}'] for i in range(N_AGENTS)]
         actions_list = [actions[f'agent_{i}'] for i in range(N_AGENTS)]
         next_obs_list = [next_obs[f'agent_{i}'] for i in range(N_AGENTS)]
@@ -25,14 +29,15 @@ class ReplayBuffer:
     def sample(self):
         experiences = random.sample(self.memory, k=self.batch_size)
         
-        global_states = torch.from_numpy(np.vstack([e.global_state for e in experiences])).float().to(self.device)
-        rewards = torch.from_numpy(np.vstack([e.reward for e in experiences])).float().to(self.device)
-        next_global_states = torch.from_numpy(np.vstack([e.next_global_state for e in experiences])).float().to(self.device)
-        dones = torch.from_numpy(np.vstack([e.done for e in experiences]).astype(np.float32)).float().to(self.device)
+        # 저장된 관측값은 이미 float32 → 쌓기만 하고 .float() 변환 없음. 보상/done만 여기서 DTYPE으로
+        global_states = torch.from_numpy(np.stack([e.global_state for e in experiences])).to(self.device)
+        rewards = torch.from_numpy(np.array([[e.reward] for e in experiences], dtype=DTYPE)).to(self.device)
+        next_global_states = torch.from_numpy(np.stack([e.next_global_state for e in experiences])).to(self.device)
+        dones = torch.from_numpy(np.array([[e.done] for e in experiences], dtype=DTYPE)).to(self.device)
         
-        obs_list = [torch.from_numpy(np.vstack([e.obs[i] for e in experiences])).float().to(self.device) for i in range(N_AGENTS)]
+        obs_list = [torch.from_numpy(np.stack([e.obs[i] for e in experiences])).to(self.device) for i in range(N_AGENTS)]
         actions_list = [torch.from_numpy(np.vstack([e.actions[i] for e in experiences])).long().to(self.device) for i in range(N_AGENTS)]
-        next_obs_list = [torch.from_numpy(np.vstack([e.next_obs[i] for e in experiences])).float().to(self.device) for i in range(N_AGENTS)]
+        next_obs_list = [torch.from_numpy(np.stack([e.next_obs[i] for e in experiences])).to(self.device) for i in range(N_AGENTS)]
         
         return (global_states, obs_list, actions_list, rewards, next_global_states, next_obs_list, dones)
 
@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 import yaml
 import warnings
 
+from .market_store import MARKET_STORE
+
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
@@ -56,6 +58,9 @@ class A2CWrapper:
             with open("config.yaml", "r", encoding="utf-8") as f:
                 self.cfg = yaml.safe_load(f)
 
+            # Both models read prices through the shared store, using A2C's data_source
+            MARKET_STORE.set_source(self.cfg.get("data_source"))
+
             # Load Scaler
             scaler_path = os.path.join(self.cfg["report_dir"], "scaler.joblib")
             if os.path.exists(scaler_path):
@@ -103,6 +108,7 @@ class A2CWrapper:
         
         try:
             from data_utils import download_data, add_indicators, FEATURES, build_state
+            from ac_model import _obs_tensor
             
             # Download data from start_date to yesterday (or today to ensure we have enough)
             # We need extra data for windowing
@@ -121,7 +127,8 @@ class A2CWrapper:
                 self.cfg["kospi_ticker"],
                 self.cfg["vix_ticker"],
                 data_start,
-                data_end
+                data_end,
+                source=MARKET_STORE,
             )
             df = add_indicators(raw_df)
             
@@ -157,7 +164,7 @@ class A2CWrapper:
                 
                 # Predict
                 with torch.no_grad():
-                    s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+                    s_t = _obs_tensor(state, self.agent.device).unsqueeze(0)
                     logits, _ = self.agent.ac_net(s_t)
                     probs = torch.nn.functional.softmax(logits, dim=-1).detach().cpu().numpy()[0]
                     action = int(np.argmax(probs))
@@ -215,7 +222,7 @@ class A2CWrapper:
                 state = build_state(prev_window, position_flag=0)
                 
                 with torch.no_grad():
-                    s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+                    s_t = _obs_tensor(state, self.agent.device).unsqueeze(0)
                     logits, _ = self.agent.ac_net(s_t)
                     probs = torch.nn.functional.softmax(logits, dim=-1).detach().cpu().numpy()[0]
                     action = int(np.argmax(probs)) # 0: Long, 1: Short, 2: Hold (Check mapping)
@@ -268,40 +275,28 @@ class A2CWrapper:
         os.chdir(A2C_DIR)
         
         try:
-            from data_utils import download_data, add_indicators, FEATURES, build_state
-            
-            # Download recent data
-            end_dt = datetime.now()
-            start_dt = end_dt - timedelta(days=100) # Enough for window
-            
-            raw_df = download_data(
-                self.cfg["ticker"],
-                self.cfg["kospi_ticker"],
-                self.cfg["vix_ticker"],
-                start_dt.strftime("%Y-%m-%d"),
-                end_dt.strftime("%Y-%m-%d")
+            from data_utils import update_feature_stream, FEATURES, build_state
+            from ac_model import _obs_tensor
+            
+            # Only the bars after the last checkpoint are fetched; indicators are
+            # updated incrementally instead of being recomputed over 100 days.
+            stream = update_feature_stream(
+                self.cfg,
+                path=self.cfg.get("feature_stream_path"),
+                source=MARKET_STORE,
             )
-            df = add_indicators(raw_df)
-            
-            if self.scaler:
-                df[FEATURES] = self.scaler.transform(df[FEATURES])
-                
-            # Use last available window (assuming it ends yesterday/today depending on market close)
-            # If today is trading day and market is open, we might have today's partial data?
-            # Usually we predict for "Tomorrow" using "Today's Close", or "Today" using "Yesterday's Close".
-            # Let's assume we predict for the NEXT step based on LAST available data.
-            
-            window_size = self.cfg["window_size"]
-            if len(df) < window_size:
+            last_window = stream.window()
+            if last_window is None:
                 return None
-                
-            last_window = df.iloc[-window_size:]
-            last_date = df.index[-1]
+            last_date = last_window.index[-1]
+
+            if self.scaler:
+                last_window[FEATURES] = self.scaler.transform(last_window[FEATURES])
             
             state = build_state(last_window, position_flag=0)
             
             with torch.no_grad():
-                s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+                s_t = _obs_tensor(state, self.agent.device).unsqueeze(0)
                 logits, _ = self.agent.ac_net(s_t)
                 probs = torch.nn.functional.softmax(logits, dim=-1).detach().cpu().numpy()[0]
                 action = int(np.argmax(probs))
@@ -327,6 +322,10 @@ class MarlWrapper:
         self.a0_cols = None
         self.a1_cols = None
         self.a2_cols = None
+        # Features and indicator state kept between predict_today calls so that
+        # only new bars have to be fetched and processed.
+        self.features_df = None
+        self.indicator_state = None
         self._setup_path()
 
     def _setup_path(self):
@@ -355,7 +354,7 @@ class MarlWrapper:
             from data_processor import DataProcessor
             # Override end date to today for inference
             today_str = datetime.now().strftime("%Y-%m-%d")
-            self.processor = DataProcessor(end=today_str)
+            self.processor = DataProcessor(end=today_str, source=MARKET_STORE, feature_store_dir=None)
             # We don't want to fetch all data just to load model if possible, 
             # but the model architecture depends on feature counts.
             # Let's do a minimal process or hardcode if we knew.
@@ -369,6 +368,8 @@ class MarlWrapper:
             # For now, let's assume we need to run processor.process() to get dimensions.
             # It downloads data.
             (features_df, prices_df, _, self.a0_cols, self.a1_cols, self.a2_cols) = self.processor.process()
+            self.features_df = features_df
+            self.indicator_state = self.processor.make_indicator_state()
             
             # Load Scaler
             if os.path.exists('scaler.pkl'):
@@ -427,7 +428,7 @@ class MarlWrapper:
             
             # We can create a new processor instance
             from data_processor import DataProcessor
-            processor = DataProcessor(start=data_start, end=data_end)
+            processor = DataProcessor(start=data_start, end=data_end, source=MARKET_STORE, feature_store_dir=None)
             (features_df, original_prices, _, a0, a1, a2) = processor.process()
             
             # Load scalers if not already
@@ -466,15 +467,8 @@ class MarlWrapper:
                     target_date += timedelta(days=1)
                     continue
                 
-                # Set env to this step
-                # MARLStockEnv uses current_step as the START of the window.
-                # We want the window to END at prev_idx (target_date - 1).
-                # Window: [start, start + window_size - 1]
-                # Last index = start + window_size - 1 = prev_idx
-                # start = prev_idx - window_size + 1
-                
-                dummy_env.current_step = prev_idx - WINDOW_SIZE + 1
-                obs_dict, _ = dummy_env._get_obs_and_state()
+                # Jump to the window that ENDS at prev_idx (target_date - 1).
+                obs_dict, _ = dummy_env.seek(norm_features.index[prev_idx])
                 
                 with torch.no_grad():
                     actions = self.learner.select_actions(obs_dict, epsilon=0.0)
@@ -546,24 +540,22 @@ class MarlWrapper:
             from environment import MARLStockEnv
             from utils import convert_joint_action_to_signal
             
-            # Use existing processor which should have latest data if we just loaded
-            # Or re-process if needed. 
-            # For efficiency, let's assume processor has data. 
-            # But if day changed, we might need new data.
-            # Let's re-run process() to be safe.
-            (features_df, prices_df, _, a0, a1, a2) = self.processor.process()
-            norm_features, _ = self.processor.normalize_data(features_df, features_df)
+            # Append only the bars that arrived since the last call. Indicators are
+            # updated from the saved state; fundamentals are refreshed on load_model.
+            today_str = datetime.now().strftime("%Y-%m-%d")
+            self.features_df = self.processor.append_bars(self.features_df, self.indicator_state, end=today_str)
+            recent = self.features_df.iloc[-(WINDOW_SIZE + 1):]
+            norm_features, _ = self.processor.normalize_data(recent, recent)
+            prices_df = recent['Close']
             
-            dummy_env = MARLStockEnv(norm_features, prices_df, a0, a1, a2)
+            dummy_env = MARLStockEnv(norm_features, prices_df, self.a0_cols, self.a1_cols, self.a2_cols)
             
             # Last available window
             if len(norm_features) < WINDOW_SIZE:
                 print(f"Not enough data for MARL prediction. Need {WINDOW_SIZE}, got {len(norm_features)}")
                 return None
                 
-            last_idx = len(norm_features) - WINDOW_SIZE
-            dummy_env.current_step = last_idx
-            obs_dict, _ = dummy_env._get_obs_and_state()
+            obs_dict, _ = dummy_env.seek(norm_features.index[-1])
             
             with torch.no_grad():
                 actions = self.learner.select_actions(obs_dict, epsilon=0.0)
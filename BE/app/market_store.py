@@ -0,0 +1,213 @@
+"""
+Process-wide market data store shared by A2CWrapper and MarlWrapper.
+
+Both wrappers need the same symbols (005930.KS, ^VIX, ...) for overlapping
+date ranges. The store keeps one history per symbol and widens it when a
+request falls outside what it already holds. Concurrent requests for the
+same symbol wait on the fetch that is already in flight instead of starting
+their own.
+
+The store is a market_data.MarketDataSource, so it can be passed as `source=`
+to data_utils.download_data and to DataProcessor. Frames handed out are views
+over read-only arrays, and writing into them raises instead of changing the
+shared copy. Frames the callers build from them (copy/join/...) are normal,
+writable frames.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR))
+A2C_DIR = os.path.join(PROJECT_ROOT, "AI", "a2c_11.29")
+
+# market_data.py / data_cache.py are identical in every AI directory
+if A2C_DIR not in sys.path:
+    sys.path.append(A2C_DIR)
+
+from market_data import MarketDataSource, SourceSpec, make_source  # noqa: E402
+from data_cache import load_history  # noqa: E402
+
+
+class _Entry:
+    """One symbol's history as read-only column arrays."""
+
+    def __init__(self, df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp):
+        self.start = start
+        self.end = end
+        self.fetched_at = time.time()
+        self.index = pd.DatetimeIndex(df.index)
+        self.columns = list(df.columns)
+        self.arrays: Dict[str, np.ndarray] = {}
+        for col in self.columns:
+            arr = np.array(df[col].to_numpy(), copy=True)
+            arr.flags.writeable = False
+            self.arrays[col] = arr
+
+    def view(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        i0 = self.index.searchsorted(start, side="left")
+        i1 = self.index.searchsorted(end, side="left")
+        return pd.DataFrame(
+            {c: self.arrays[c][i0:i1] for c in self.columns},
+            index=self.index[i0:i1],
+            columns=self.columns,
+            copy=False,
+        )
+
+
+class MarketDataStore(MarketDataSource):
+    """
+    In-memory, thread-safe market data store.
+
+    - source: the provider that does the actual fetching (see market_data.make_source)
+    - cache_dir: on-disk cache used under the store when the provider is cacheable
+    - refresh_seconds: how long a history that reaches today is trusted before
+      today's (possibly still moving) bar is fetched again
+    - fundamentals_ttl_seconds: how long fundamentals are kept in memory
+    """
+
+    name = "shared"
+    # the store is its own cache; callers must not wrap it in data_cache again
+    cacheable = False
+
+    def __init__(
+        self,
+        source: SourceSpec = None,
+        cache_dir: Optional[str] = None,
+        refresh_seconds: float = 300.0,
+        fundamentals_ttl_seconds: float = 24 * 3600.0,
+    ):
+        self._spec = source
+        self._source: Optional[MarketDataSource] = None
+        self.cache_dir = cache_dir
+        self.refresh_seconds = refresh_seconds
+        self.fundamentals_ttl_seconds = fundamentals_ttl_seconds
+
+        self._lock = threading.Lock()
+        self._prices: Dict[str, _Entry] = {}
+        self._fundamentals: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+
+    # ---------- provider ----------
+    def set_source(self, source: SourceSpec) -> None:
+        """Switch the underlying provider. Drops everything held so far."""
+        with self._lock:
+            if source == self._spec:
+                return
+            self._spec = source
+            self._source = None
+            self._prices.clear()
+            self._fundamentals.clear()
+
+    def _provider(self) -> MarketDataSource:
+        # created lazily so importing the backend never needs network/yfinance
+        with self._lock:
+            if self._source is None:
+                self._source = make_source(self._spec, yf_kwargs=dict(auto_adjust=False))
+            return self._source
+
+    def clear(self) -> None:
+        with self._lock:
+            self._prices.clear()
+            self._fundamentals.clear()
+
+    # ---------- request coalescing ----------
+    def _coalesced(self, key: Hashable, ready: Callable[[], Any], load: Callable[[], None]) -> Any:
+        """
+        Return ready() if it is not None. Otherwise run load() once for all
+        concurrent callers with the same key, then try ready() again.
+        """
+        while True:
+            with self._lock:
+                result = ready()
+                if result is not None:
+                    return result
+                fut = self._inflight.get(key)
+                owner = fut is None
+                if owner:
+                    fut = Future()
+                    self._inflight[key] = fut
+
+            if not owner:
+                fut.result()  # re-raises the owner's error
+                continue
+
+            try:
+                load()
+            except BaseException as e:
+                with self._lock:
+                    del self._inflight[key]
+                fut.set_exception(e)
+                raise
+            with self._lock:
+                del self._inflight[key]
+            fut.set_result(None)
+
+    # ---------- MarketDataSource ----------
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        today = pd.Timestamp(datetime.now().date())
+        start_ts = pd.Timestamp(start) if start is not None else pd.Timestamp("1990-01-01")
+        end_ts = pd.Timestamp(end) if end is not None else today + timedelta(days=1)
+
+        def ready() -> Optional[pd.DataFrame]:
+            entry = self._prices.get(ticker)
+            if entry is None or start_ts < entry.start or end_ts > entry.end:
+                return None
+            # history reaching past yesterday goes stale while the market is open
+            if end_ts > today and time.time() - entry.fetched_at > self.refresh_seconds:
+                return None
+            return entry.view(start_ts, end_ts)
+
+        def load() -> None:
+            with self._lock:
+                old = self._prices.get(ticker)
+            lo = min(start_ts, old.start) if old is not None else start_ts
+            hi = max(end_ts, old.end) if old is not None else end_ts
+            df = self._load_range(ticker, lo, hi)
+            with self._lock:
+                self._prices[ticker] = _Entry(df, lo, hi)
+
+        return self._coalesced(("prices", ticker), ready, load)
+
+    def _load_range(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        src = self._provider()
+        s, e = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        if self.cache_dir and src.cacheable:
+            df = load_history(ticker, s, e, src.fetch, self.cache_dir)
+        else:
+            df = src.fetch(ticker, s, e)
+        if df is None:
+            df = pd.DataFrame()
+        idx = pd.to_datetime(df.index)
+        if getattr(idx, "tz", None) is not None:
+            idx = idx.tz_localize(None)
+        df = df.set_axis(idx, axis=0)
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    def fundamentals(self, ticker: str, name: str) -> Any:
+        key = (ticker, name)
+
+        def ready() -> Any:
+            hit = self._fundamentals.get(key)
+            if hit is None or time.time() - hit[0] > self.fundamentals_ttl_seconds:
+                return None
+            # wrap so that a provider answering None is still a cache hit
+            return (hit[1],)
+
+        def load() -> None:
+            value = self._provider().fundamentals(ticker, name)
+            with self._lock:
+                self._fundamentals[key] = (time.time(), value)
+
+        return self._coalesced(("fundamentals",) + key, ready, load)[0]
+
+
+MARKET_STORE = MarketDataStore(cache_dir=os.path.join(A2C_DIR, "data_cache"))